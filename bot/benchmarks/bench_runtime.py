@@ -0,0 +1,149 @@
+"""
+⏱️ БЕНЧМАРК: СТАНДАРТНЫЙ РАНТАЙМ ПРОТИВ FAST_RUNTIME (uvloop + orjson)
+
+Гоняет обновления через настоящий путь webhook: aiohttp-сервер,
+QueuedRequestHandler (utils/ingestion.py), разбор JSON кодеком сессии
+aiogram, Update.model_validate, диспетчер и JSON-ответ. Каждый профиль
+запускается в отдельном процессе (политика event loop задаётся до его
+создания) и печатает обновлений в секунду. Отдельно меряется сам кодек
+JSON на типичном обновлении.
+
+Запуск из каталога bot/:
+    python benchmarks/bench_runtime.py --updates 20000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+# Профиль выбирается аргументом, а не окружением пользователя
+os.environ.pop("FAST_RUNTIME", None)
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.types import Message, Update  # noqa: E402
+
+from utils import runtime  # noqa: E402
+from utils.ingestion import QueuedRequestHandler  # noqa: E402
+
+PATH = "/webhook"
+
+
+def make_update(update_id: int) -> dict:
+    """Типичное обновление: сообщение /call из группового чата."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": -1001234567890 - update_id % 50, "type": "supergroup", "title": "Команда проекта"},
+            "from": {
+                "id": 100000 + update_id % 1000, "is_bot": False, "first_name": "Иван",
+                "last_name": "Петров", "username": "ivan_petrov", "language_code": "ru",
+            },
+            "text": "/call@telemost_robot",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 20}],
+        },
+    }
+
+
+def bench_codec(rounds: int) -> float:
+    """Разбор + валидация + сериализация одного обновления, операций в секунду."""
+    body = json.dumps(make_update(1)).encode()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        update = Update.model_validate(runtime.json_loads(body))
+        runtime.json_dumps(update.model_dump(exclude_none=True))
+    return rounds / (time.perf_counter() - started)
+
+
+async def bench_webhook(updates: int, concurrency: int) -> float:
+    """Обновлений в секунду через aiohttp-сервер и диспетчер (от запроса до обработки)."""
+    bot = Bot(token=os.environ["BOT_TOKEN"],
+              session=AiohttpSession(json_loads=runtime.json_loads, json_dumps=runtime.json_dumps))
+    router = Router()
+    handled = 0
+    done = asyncio.Event()
+
+    @router.message()
+    async def on_message(message: Message) -> None:
+        nonlocal handled
+        handled += 1
+        if handled == updates:
+            done.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    app = web.Application()
+    ingestion = QueuedRequestHandler(dispatcher=dp, bot=bot, queue_size=updates)
+    ingestion.register(app, path=PATH)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    url = f"http://127.0.0.1:{port}{PATH}"
+    bodies = [json.dumps(make_update(i)).encode() for i in range(updates)]
+    headers = {"Content-Type": "application/json"}
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        async def client(offset: int) -> None:
+            for i in range(offset, updates, concurrency):
+                async with session.post(url, data=bodies[i], headers=headers) as resp:
+                    await resp.read()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(concurrency)))
+        await done.wait()
+        elapsed = time.perf_counter() - started
+
+    await ingestion.close()
+    await runner.cleanup()
+    await bot.session.close()
+    return updates / elapsed
+
+
+def run_profile(args: argparse.Namespace) -> None:
+    enabled = runtime.enable_fast_runtime(args.profile == "fast")
+    codec = bench_codec(args.codec_rounds)
+    webhook = asyncio.run(bench_webhook(args.updates, args.concurrency))
+    print(json.dumps({"profile": args.profile, **enabled, "codec_ops": codec, "webhook_updates": webhook}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--codec-rounds", type=int, default=20000)
+    parser.add_argument("--profile", choices=("stdlib", "fast"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.profile:
+        run_profile(args)
+        return
+
+    results = {}
+    for profile in ("stdlib", "fast"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--profile", profile, "--updates", str(args.updates),
+             "--concurrency", str(args.concurrency), "--codec-rounds", str(args.codec_rounds)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[profile] = json.loads(out.strip().splitlines()[-1])
+
+    base, fast = results["stdlib"], results["fast"]
+    print(f"fast profile: orjson={fast['orjson']} uvloop={fast['uvloop']}")
+    print(f"{'':<24}{'stdlib':>12}{'fast':>12}{'gain':>9}")
+    for key, title in (("codec_ops", "codec, updates/s"), ("webhook_updates", "webhook, updates/s")):
+        print(f"{title:<24}{base[key]:>12.0f}{fast[key]:>12.0f}{fast[key] / base[key]:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -38,12 +38,73 @@ WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/bot")
 WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
 WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8443"))
 
+# 📥 Приём обновлений webhook:
+#   background — задача на каждое обновление без ограничений (как в aiogram, по умолчанию)
+#   queue      — сразу ответить Telegram, обработать общим пулом воркеров с порядком по чатам
+#   sync       — ответить Telegram только после обработки
+WEBHOOK_INGEST_MODE = os.getenv("WEBHOOK_INGEST_MODE", "background")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+# Сколько последних update_id помнить для отбрасывания повторных доставок
+UPDATE_DEDUP_WINDOW = int(os.getenv("UPDATE_DEDUP_WINDOW", "10000"))
+
+# 🧑‍🏭 Процессы веб-сервера на одном порту (SO_REUSEPORT, см. utils/supervisor.py)
+WEB_PROCESSES = int(os.getenv("WEB_PROCESSES", "1"))  # 1 — один процесс без супервизора
+WEB_SHUTDOWN_TIMEOUT = float(os.getenv("WEB_SHUTDOWN_TIMEOUT", "30"))  # дождаться текущих запросов
+WEB_RESTART_DELAY = float(os.getenv("WEB_RESTART_DELAY", "1"))  # пауза перед перезапуском упавшего
+# ⚡ Быстрый профиль: uvloop и orjson, если установлены (см. utils/runtime.py)
+FAST_RUNTIME = os.getenv("FAST_RUNTIME", "false").lower() in ("1", "true", "yes")
+
+# 🗄️ Общее состояние реплик (см. utils/state.py): memory — в памяти процесса,
+# redis — Redis-совместимый сервер STATE_REDIS_URL, общий для всех реплик и воркеров
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0")  # redis://[:пароль@]хост:порт/база
+STATE_KEY_PREFIX = os.getenv("STATE_KEY_PREFIX", "telemost_bot:")  # общий сервер для нескольких ботов
+STATE_TIMEOUT = float(os.getenv("STATE_TIMEOUT", "2"))  # таймаут одной команды, секунды
+# Сколько секунд общее состояние помнит обработанный update_id (только для redis)
+UPDATE_DEDUP_TTL = float(os.getenv("UPDATE_DEDUP_TTL", "3600"))
+
 # 🌐 Base URL Configuration
 BASE_URL = os.getenv("BASE_URL", "")
 APP_URL = os.getenv("APP_URL", "")
 REDIRECT_URL = os.getenv("REDIRECT_URL", "")
 
 
+# 🎞️ Кэш file_id загруженных в Telegram медиа-файлов (bot/assets)
+ASSET_FILE_ID_STORE = os.getenv("ASSET_FILE_ID_STORE", "./bot/utils/telegram_file_ids.json")
+# Служебный чат для предзагрузки видео при старте (пусто — загрузка при первой отправке)
+ASSET_UPLOAD_CHAT_ID = int(os.getenv("ASSET_UPLOAD_CHAT_ID") or 0) or None
+
+
+# 🚦 Лимиты исходящих запросов к Bot API (см. utils/outbound.py)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # запросов/с на бота
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # сообщений/с в личный чат
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", str(20 / 60)))  # 20 сообщений/мин в группу
+TELEGRAM_GROUP_BURST = float(os.getenv("TELEGRAM_GROUP_BURST", "5"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))  # повторов после 429
+TELEGRAM_MAX_RETRY_AFTER = float(os.getenv("TELEGRAM_MAX_RETRY_AFTER", "60"))  # дольше — не ждём
+
+
+# 💬 Кэш подготовленных inline-сообщений (/api/prepared-message-id)
+PREPARED_MESSAGE_TTL = float(os.getenv("PREPARED_MESSAGE_TTL", "86400"))  # верхняя граница, секунды
+PREPARED_MESSAGE_CACHE_SIZE = int(os.getenv("PREPARED_MESSAGE_CACHE_SIZE", "10000"))
+# Запас до expiration_date от Telegram, чтобы не отдать почти истёкший ID
+PREPARED_MESSAGE_EXPIRY_MARGIN = float(os.getenv("PREPARED_MESSAGE_EXPIRY_MARGIN", "60"))
+
+
+# 🔁 Идемпотентность POST /api/telemost/create (Idempotency-Key)
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))  # окно повтора, секунды
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_KEY_MAX_LENGTH = int(os.getenv("IDEMPOTENCY_KEY_MAX_LENGTH", "128"))
+
+
+# 📬 Фоновая доставка сообщений из HTTP API (см. utils/delivery.py)
+DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", "4"))
+DELIVERY_QUEUE_SIZE = int(os.getenv("DELIVERY_QUEUE_SIZE", "1000"))
+DELIVERY_MAX_ATTEMPTS = int(os.getenv("DELIVERY_MAX_ATTEMPTS", "3"))
+
+
 # 🔗 Telemost (Yandex 360) OAuth2 / API настройки
 TELEMOST_CLIENT_ID = os.getenv("TELEMOST_CLIENT_ID", "")
 TELEMOST_CLIENT_SECRET = os.getenv("TELEMOST_CLIENT_SECRET", "")
@@ -54,9 +115,84 @@ TELEMOST_AUTH_URL = os.getenv("TELEMOST_AUTH_URL", "")  # пример: https://
 TELEMOST_TOKEN_URL = os.getenv("TELEMOST_TOKEN_URL", "")  # пример: https://org-id.360.yandex.ru/oauth/token
 TELEMOST_MEETINGS_URL = os.getenv("TELEMOST_MEETINGS_URL", "")  # пример: https://api.telemost.yandex.net/v1/meetings
 TELEMOST_SCOPE = os.getenv("TELEMOST_SCOPE", "")
+# 🔐 Где хранить OAuth-токен (см. utils/token_store.py): json — файл TELEMOST_TOKEN_STORE,
+# sqlite — база TELEMOST_TOKEN_DB (удобно для нескольких воркеров),
+# state — общее состояние STATE_BACKEND=redis (несколько реплик на разных машинах)
+TELEMOST_TOKEN_BACKEND = os.getenv("TELEMOST_TOKEN_BACKEND", "json")
 TELEMOST_TOKEN_STORE = os.getenv("TELEMOST_TOKEN_STORE", "./bot/utils/telemost_token.json")
+TELEMOST_TOKEN_DB = os.getenv("TELEMOST_TOKEN_DB", "./bot/utils/telemost_tokens.sqlite3")
+# Как часто (секунды) сверять кэш токена в памяти с хранилищем
+TELEMOST_TOKEN_CACHE_TTL = float(os.getenv("TELEMOST_TOKEN_CACHE_TTL", "5"))
+
+# 🏢 Несколько организаций (см. utils/tenants.py; пусто — только организация из TELEMOST_*)
+TELEMOST_TENANTS_FILE = os.getenv("TELEMOST_TENANTS_FILE", "")
+TELEMOST_TENANT_CACHE_SIZE = int(os.getenv("TELEMOST_TENANT_CACHE_SIZE", "32"))  # клиентов в LRU
+TELEMOST_TENANT_POOL_LIMIT = int(os.getenv("TELEMOST_TENANT_POOL_LIMIT", "10"))  # соединений на организацию
 TELEMOST_OAUTH_TOKEN = os.getenv("TELEMOST_OAUTH_TOKEN", "")  # Если уже есть готовый OAuth-токен
 
+# 🔌 Пул HTTP-соединений к Telemost API (одна сессия на всё приложение)
+TELEMOST_HTTP_POOL_LIMIT = int(os.getenv("TELEMOST_HTTP_POOL_LIMIT", "100"))  # всего соединений
+TELEMOST_HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("TELEMOST_HTTP_POOL_LIMIT_PER_HOST", "20"))  # 0 — без лимита
+TELEMOST_HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("TELEMOST_HTTP_KEEPALIVE_TIMEOUT", "60"))  # секунды
+TELEMOST_HTTP_DNS_CACHE_TTL = int(os.getenv("TELEMOST_HTTP_DNS_CACHE_TTL", "300"))  # секунды
+
+# 🔄 За сколько секунд до expires_at обновлять токен в фоне
+TELEMOST_TOKEN_REFRESH_AHEAD = int(os.getenv("TELEMOST_TOKEN_REFRESH_AHEAD", "300"))
+
+# 🛡️ Таймауты, повторы и автомат защиты для API встреч (см. utils/resilience.py)
+TELEMOST_REQUEST_TIMEOUT = float(os.getenv("TELEMOST_REQUEST_TIMEOUT", "20"))  # на одну попытку
+TELEMOST_RETRY_ATTEMPTS = int(os.getenv("TELEMOST_RETRY_ATTEMPTS", "2"))  # повторов после первой попытки
+TELEMOST_RETRY_BASE_DELAY = float(os.getenv("TELEMOST_RETRY_BASE_DELAY", "0.5"))  # секунды, с джиттером
+TELEMOST_BREAKER_FAILURES = int(os.getenv("TELEMOST_BREAKER_FAILURES", "5"))  # сбоев подряд до открытия
+TELEMOST_BREAKER_RECOVERY = float(os.getenv("TELEMOST_BREAKER_RECOVERY", "30"))  # секунды до пробного запроса
+# Общий бюджет времени на обработку /call и HTTP-запроса создания встречи
+UPDATE_DEADLINE = float(os.getenv("UPDATE_DEADLINE", "25"))
+API_DEADLINE = float(os.getenv("API_DEADLINE", "25"))
+
+# 🏊 Пул заранее созданных встреч (0 — выключен)
+TELEMOST_MEETING_POOL_SIZE = int(os.getenv("TELEMOST_MEETING_POOL_SIZE", "0"))  # верхняя граница
+TELEMOST_MEETING_POOL_LOW = int(os.getenv("TELEMOST_MEETING_POOL_LOW", str(TELEMOST_MEETING_POOL_SIZE // 2)))
+TELEMOST_MEETING_POOL_MAX_AGE = float(os.getenv("TELEMOST_MEETING_POOL_MAX_AGE", "3600"))  # секунды
+TELEMOST_MEETING_POOL_CONCURRENCY = int(os.getenv("TELEMOST_MEETING_POOL_CONCURRENCY", "2"))
+
+# 👥 Одна встреча на все /call группового чата в пределах окна (0 — выключено)
+CALL_COALESCE_WINDOW = float(os.getenv("CALL_COALESCE_WINDOW", "0"))  # секунды
+CALL_COALESCE_CACHE_SIZE = int(os.getenv("CALL_COALESCE_CACHE_SIZE", "10000"))  # чатов
+
+# 🗂️ Реестр созданных встреч (SQLite, см. utils/meeting_registry.py; пусто — выключен)
+MEETING_REGISTRY_PATH = os.getenv("MEETING_REGISTRY_PATH", "./bot/utils/meetings.sqlite3")
+# Повторный /call в пределах окна получает недавнюю встречу из реестра (0 — выключено)
+MEETING_REUSE_TTL = float(os.getenv("MEETING_REUSE_TTL", "0"))  # секунды
+MEETING_RECENT_LIMIT = int(os.getenv("MEETING_RECENT_LIMIT", "20"))  # комнат в /api/telemost/rooms
+# Сколько секунд действует подписанная initData Mini App (utils/webapp_auth.py), 0 — без ограничения
+WEBAPP_INIT_DATA_TTL = float(os.getenv("WEBAPP_INIT_DATA_TTL", "86400"))
+
+# 🧹 Фоновая очистка старых встреч по реестру (см. utils/meeting_gc.py)
+MEETING_GC_MAX_AGE = float(os.getenv("MEETING_GC_MAX_AGE", "0"))  # секунды, 0 — выключено
+MEETING_GC_INTERVAL = float(os.getenv("MEETING_GC_INTERVAL", "3600"))  # пауза между проходами
+MEETING_GC_BATCH_SIZE = int(os.getenv("MEETING_GC_BATCH_SIZE", "50"))
+MEETING_GC_CONCURRENCY = int(os.getenv("MEETING_GC_CONCURRENCY", "2"))  # и размер пула соединений
+MEETING_GC_RATE = float(os.getenv("MEETING_GC_RATE", "1"))  # удалений в секунду
+
+# 🚦 Лимиты на /call, send_command и POST /api/telemost/create (см. utils/throttling.py)
+THROTTLE_USER_RATE = float(os.getenv("THROTTLE_USER_RATE", str(1 / 10)))  # действий в секунду, 0 — выключено
+THROTTLE_USER_BURST = float(os.getenv("THROTTLE_USER_BURST", "3"))  # подряд без паузы
+THROTTLE_CHAT_RATE = float(os.getenv("THROTTLE_CHAT_RATE", str(1 / 5)))  # на групповой чат
+THROTTLE_CHAT_BURST = float(os.getenv("THROTTLE_CHAT_BURST", "5"))
+THROTTLE_MAX_KEYS = int(os.getenv("THROTTLE_MAX_KEYS", "100000"))  # отслеживаемых пользователей/чатов
+
+# 🩺 Диагностика (см. utils/diagnostics.py); без ADMIN_TOKEN маршруты /admin/* отвечают 404
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.1"))  # секунды блокировки loop, 0 — выключено
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))  # период пульса, секунды
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))  # максимум для /admin/profile
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # между снимками стеков
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "5"))  # глубина стека в снимках памяти
+MEMORY_SAMPLE_INTERVAL = float(os.getenv("MEMORY_SAMPLE_INTERVAL", "60"))  # замер RSS, 0 — выключено
+# Обход кучи для счёта объектов держит GIL и останавливает loop: 0 — только по /admin/memory?sample=1
+MEMORY_OBJECTS_INTERVAL = float(os.getenv("MEMORY_OBJECTS_INTERVAL", "0"))
+MEMORY_TOP_TYPES = int(os.getenv("MEMORY_TOP_TYPES", "20"))  # типов объектов в метриках
+
 # ✅ Валидация обязательных параметров
 if not BOT_TOKEN:
     raise ValueError(
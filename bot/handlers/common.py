@@ -19,22 +19,59 @@ from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     InputTextMessageContent,
-    FSInputFile,
 )
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramRetryAfter
 import json
+from typing import Tuple
+from utils.call_coalescing import ChatCallCoalescer
 from utils.telemost import TelemostClient
+from utils.assets import AssetRegistry
+from utils.resilience import CircuitOpenError
+from utils.metrics import CALL_REPLIES
+from utils.throttling import CommandThrottle, reject_if_throttled
+from utils.runtime import json_loads
 from config import BASE_URL, APP_URL
 from urllib.parse import quote_plus
 
-
-from pathlib import Path
-
 # Создаем роутер для общих обработчиков
 router = Router()
 
+# Исходы /call на /metrics (метки привязаны заранее)
+REPLY_VIDEO = CALL_REPLIES.labels("video")
+REPLY_TEXT_FALLBACK = CALL_REPLIES.labels("text_fallback")
+REPLY_NOT_CONFIGURED = CALL_REPLIES.labels("not_configured")
+REPLY_UNAVAILABLE = CALL_REPLIES.labels("unavailable")
+
 
-async def send_video_call_message(message: Message):
+def build_video_call_reply(video_call_url: str) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Формирует текст и клавиатуру сообщения о готовой встрече.
+    Используется и командой /call, и фоновой доставкой из HTTP API.
+    """
+    share_text = quote_plus(f"👋 Join my video call!")
+    share_url = f"https://t.me/share/url?text={share_text}&url={quote_plus(video_call_url)}"
+
+    keyboard_inline = InlineKeyboardMarkup(
+        inline_keyboard=[[
+            InlineKeyboardButton(text="▶️ Open Call", url=video_call_url),],[
+            InlineKeyboardButton(text="➕ Invite Friends", url=share_url),
+        ]]
+    )
+
+    video_call_text = (
+        f"✅ Your video call is <a href='{video_call_url}'>ready!</a>\n"
+        f"📢 <a href='{share_url}'>Invite your</a> friends to join.\n"
+    )
+    return video_call_text, keyboard_inline
+
+
+async def send_video_call_message(
+    message: Message,
+    call_coalescer: ChatCallCoalescer,
+    assets: AssetRegistry,
+    telemost: TelemostClient,
+):
     """
       
     Создает виртуальную комнату с интерактивными кнопками.
@@ -42,6 +79,9 @@ async def send_video_call_message(message: Message):
     
     Args:
         message (Message): Контекст сообщения, куда отправить ответ
+        call_coalescer (ChatCallCoalescer): Выдача встреч Telemost (пул + объединение /call в группах)
+        assets (AssetRegistry): Реестр file_id для видео из assets
+        telemost (TelemostClient): Клиент организации этого чата (TenantMiddleware)
         
     Функциональность:
     - Создает InlineKeyboardMarkup с двумя кнопками
@@ -56,13 +96,28 @@ async def send_video_call_message(message: Message):
     # Пытаемся получить реальную ссылку Телемоста
     telemost_url = None
     try:
-        client = TelemostClient()
-        telemost_url = await client.create_conference(title="Telemost Meeting")
+        # В группе /call в пределах окна получают одну и ту же встречу
+        telemost_url = await call_coalescer.acquire(
+            message.chat.id,
+            title="Telemost Meeting",
+            user_id=message.from_user.id if message.from_user else None,
+            client=telemost,
+        )
+    except CircuitOpenError as e:
+        # Telemost недоступен: отвечаем сразу, не дожидаясь таймаута
+        REPLY_UNAVAILABLE.inc()
+        await message.answer(
+            "⏳ <b>Telemost is temporarily unavailable</b>\n\n"
+            f"Please try /call again in {max(int(e.retry_in), 1)} seconds.",
+            parse_mode="HTML",
+        )
+        return
     except Exception:
         telemost_url = None
 
     # Если API недоступен, отправляем инструкцию по настройке
     if not telemost_url:
+        REPLY_NOT_CONFIGURED.inc()
         await message.answer(
             "🔧 <b>Telemost is not configured</b>\n\n"
             "To create video calls, you need to set up integration with Yandex 360:\n\n"
@@ -80,36 +135,24 @@ async def send_video_call_message(message: Message):
         return
 
     # Используем полученную ссылку на встречу
-    video_call_url = telemost_url
-
-    share_text = quote_plus(f"👋 Join my video call!")
-    share_url = f"https://t.me/share/url?text={share_text}&url={quote_plus(video_call_url)}"
-
-    keyboard_inline = InlineKeyboardMarkup(
-        inline_keyboard=[[
-            InlineKeyboardButton(text="▶️ Open Call", url=video_call_url),],[
-            InlineKeyboardButton(text="➕ Invite Friends", url=share_url),
-        ]]
-    )
-
+    video_call_text, keyboard_inline = build_video_call_reply(telemost_url)
     
-    video_call_text = (
-        f"✅ Your video call is <a href='{video_call_url}'>ready!</a>\n"
-        f"📢 <a href='{share_url}'>Invite your</a> friends to join.\n"
-    )
-    
-    video_path = Path(__file__).parent.parent / "assets" / "call.mp4"
     try:
-        if video_path.exists() and video_path.stat().st_size > 0:
-            await message.answer_video(
-                video=FSInputFile(video_path),
+        # Видео отправляется по сохранённому file_id, загрузка — только в первый раз
+        await assets.send_video(
+            "call.mp4",
+            lambda video: message.answer_video(
+                video=video,
                 caption=video_call_text,
                 supports_streaming=True,
                 reply_markup=keyboard_inline,
                 parse_mode="HTML",
-            )
-        else:
-            raise FileNotFoundError("Video file not found or empty")
+            ),
+        )
+        REPLY_VIDEO.inc()
+    except TelegramRetryAfter:
+        # Лимит Telegram исчерпан даже после повторов — текстом тоже не отправить
+        raise
     except Exception:
         # Fallback на текстовое сообщение
         await message.answer(
@@ -117,22 +160,35 @@ async def send_video_call_message(message: Message):
             reply_markup=keyboard_inline,
             parse_mode="HTML",
         )
+        REPLY_TEXT_FALLBACK.inc()
 
 
 
 
-@router.message(Command("call"))
-async def cmd_call(message: Message):
+# Флаг throttle: лимит частоты проверяет ThrottlingMiddleware (utils/middleware.py)
+@router.message(Command("call"), flags={"throttle": True})
+async def cmd_call(
+    message: Message,
+    call_coalescer: ChatCallCoalescer,
+    assets: AssetRegistry,
+    telemost: TelemostClient,
+):
     """
     Команда /call — просто отправляет сообщение с кнопками комнаты
     """
-    await send_video_call_message(message)
+    await send_video_call_message(message, call_coalescer, assets, telemost)
 
 
 
 
 @router.message(F.web_app_data)
-async def handle_web_app_data(message: Message):
+async def handle_web_app_data(
+    message: Message,
+    call_coalescer: ChatCallCoalescer,
+    assets: AssetRegistry,
+    telemost: TelemostClient,
+    throttle: CommandThrottle,
+):
     """
     📱 ОБРАБОТЧИК ДАННЫХ ОТ MINI APP
     
@@ -141,13 +197,17 @@ async def handle_web_app_data(message: Message):
     
     Args:
         message (Message): Сообщение с данными от Mini App
+        call_coalescer (ChatCallCoalescer): Выдача встреч Telemost
+        assets (AssetRegistry): Реестр file_id для видео из assets
+        telemost (TelemostClient): Клиент организации этого чата
+        throttle (CommandThrottle): Лимит частоты для send_command
         
     Поддерживаемые команды:
     - video call: создание видеозвонка
     """
     try:
         # Парсим данные от Mini App
-        data = json.loads(message.web_app_data.data)
+        data = json_loads(message.web_app_data.data)
         command = data.get('command', '').lower()
         action = data.get('action', '')
         
@@ -194,7 +254,10 @@ async def handle_web_app_data(message: Message):
             command = command.lstrip('/')
             
             if command == 'call':
-                await send_video_call_message(message)
+                # Создание встречи дорогое — тот же лимит, что и у /call
+                if await reject_if_throttled(message, throttle):
+                    return
+                await send_video_call_message(message, call_coalescer, assets, telemost)
             else:
                 await message.answer(
                     f"❌ Unknown command: {command}\n\n"
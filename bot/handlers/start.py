@@ -4,12 +4,17 @@ from aiogram.types import (
 )
 from aiogram.filters import CommandStart, Command
 from aiogram.filters.command import CommandObject
-from utils.telemost import TelemostClient
+from utils.telemost import DEFAULT_TENANT, TelemostClient
 
 # Создаем роутер для обработчиков
 router = Router()
 
 
+def tenant_label(tenant_id: str) -> str:
+    """Строка с организацией для ответов команд настройки (пусто для организации по умолчанию)."""
+    return "" if tenant_id == DEFAULT_TENANT else f"🏢 Organization: <code>{tenant_id}</code>\n"
+
+
 @router.message(CommandStart())
 async def cmd_start(message: Message):
     """
@@ -36,28 +41,29 @@ async def cmd_start(message: Message):
 
 
 @router.message(Command("telemost_auth"))
-async def cmd_telemost_auth(message: Message):
+async def cmd_telemost_auth(message: Message, telemost: TelemostClient, tenant_id: str = DEFAULT_TENANT):
     """
     Выдаёт ссылку авторизации OAuth для Telemost.
+    telemost и tenant_id — клиент организации этого чата (TenantMiddleware).
     """
     try:
-        client = TelemostClient()
-        url = client.get_authorization_url()
+        url = telemost.get_authorization_url()
         if not url:
             # Диагностика недостающих параметров
             missing = []
-            if not client.auth_url:
+            if not telemost.auth_url:
                 missing.append("TELEMOST_AUTH_URL")
-            if not client.client_id:
+            if not telemost.client_id:
                 missing.append("TELEMOST_CLIENT_ID")
-            if not client.redirect_uri:
+            if not telemost.redirect_uri:
                 missing.append("TELEMOST_REDIRECT_URI")
             details = ", ".join(missing) if missing else "unknown"
             await message.answer(
-                f"❌ Failed to generate authorization link. Missing: {details}"
+                f"{tenant_label(tenant_id)}❌ Failed to generate authorization link. Missing: {details}"
             )
             return
         await message.answer(
+            f"{tenant_label(tenant_id)}"
             "🔐 Authorization for Telemost access:\n"
             "1) Follow the link and grant access\n"
             "2) After redirect, copy the code parameter from the address bar\n"
@@ -69,39 +75,44 @@ async def cmd_telemost_auth(message: Message):
 
 
 @router.message(Command("telemost_code"))
-async def cmd_telemost_code(message: Message, command: CommandObject):
+async def cmd_telemost_code(
+    message: Message,
+    command: CommandObject,
+    telemost: TelemostClient,
+    tenant_id: str = DEFAULT_TENANT,
+):
     """
-    Обмен кода авторизации на токен и его сохранение.
+    Обмен кода авторизации на токен и его сохранение
+    в хранилище токенов организации этого чата.
     """
     code = (command.args or "").strip()
     if not code:
         await message.answer("❗ Usage: /telemost_code AUTHORIZATION_CODE")
         return
-    client = TelemostClient()
     # Поддержка 2 форматов: code (authorization_code) и готовый access_token (implicit)
     if code.startswith("y0_") or len(code) > 50:
         # Похоже на access_token из implicit flow
-        client.set_access_token(code)
-        await message.answer("✅ Debug token saved. Now /call will return a live link.")
+        await telemost.set_access_token(code)
+        await message.answer(f"{tenant_label(tenant_id)}✅ Debug token saved. Now /call will return a live link.")
         return
-    token = await client.exchange_code(code)
+    token = await telemost.exchange_code(code)
     if token:
-        await message.answer("✅ Telemost access configured. Now /call will return a live link.")
+        await message.answer(f"{tenant_label(tenant_id)}✅ Telemost access configured. Now /call will return a live link.")
         return
     await message.answer("❌ Failed to exchange code/token. Check the data and try again.")
 
 
 @router.message(Command("telemost_reset"))
-async def cmd_telemost_reset(message: Message):
+async def cmd_telemost_reset(message: Message, telemost: TelemostClient, tenant_id: str = DEFAULT_TENANT):
     """
-    Удаляет сохраненный токен Telemost.
+    Удаляет сохраненный токен Telemost организации этого чата.
     """
     try:
-        client = TelemostClient()
-        deleted = client.delete_token()
+        deleted = await telemost.delete_token()
         
         if deleted:
             await message.answer(
+                f"{tenant_label(tenant_id)}"
                 "🗑️ <b>Telemost token deleted</b>\n\n"
                 "✅ Saved token successfully deleted.\n"
                 "🔄 For reconfiguration use:\n"
@@ -112,6 +123,7 @@ async def cmd_telemost_reset(message: Message):
             )
         else:
             await message.answer(
+                f"{tenant_label(tenant_id)}"
                 "ℹ️ <b>Token not found</b>\n\n"
                 "📝 Saved Telemost token not found or already deleted.\n"
                 "🔧 For setup use commands:\n"
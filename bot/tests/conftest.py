@@ -0,0 +1,13 @@
+"""
+Общие настройки тестов: модули бота импортируются из каталога bot/,
+а config.py требует BOT_TOKEN.
+
+Запуск из каталога bot/:
+    python -m pytest tests
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("BOT_TOKEN", "0:tests")
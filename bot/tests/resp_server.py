@@ -0,0 +1,156 @@
+"""
+🧪 ЛОКАЛЬНАЯ ЗАМЕНА REDIS ДЛЯ ТЕСТОВ
+
+Маленький RESP2-сервер на asyncio: ровно те команды, которые отправляет
+RedisStateBackend (utils/state.py) — AUTH, SELECT, PING, GET, SET (PX, NX),
+DEL, PUBLISH, SUBSCRIBE и EVAL скрипта compare-and-set. Lua здесь не
+выполняется: EVAL проверяет, что пришёл именно _CAS_SCRIPT, и повторяет
+его логику по тем же KEYS/ARGV. Чтобы прогнать тесты на настоящем Redis,
+задайте TEST_REDIS_URL.
+
+Пример:
+    server = RespStandIn()
+    await server.start()
+    state = RedisStateBackend(server.url)
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.state import _CAS_SCRIPT
+
+
+class RespStandIn:
+    """Хранилище в памяти процесса, доступное по протоколу Redis."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.subscribers: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self.commands: List[bytes] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        return f"redis://:secret@{self.host}:{self.port}/1"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Порт 0 — первый свободный; при перезапуске сохраняется прежний
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Закрывает сервер и все соединения (как перезапуск Redis)."""
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.subscribers.clear()
+
+    # --- протокол ---
+
+    @staticmethod
+    def _encode(value: object) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, Exception):
+            return b"-ERR %s\r\n" % str(value).encode()
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(RespStandIn._encode(item) for item in value)
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _set(self, key: bytes, value: bytes, ttl_ms: int) -> None:
+        self.data[key] = (value, time.monotonic() + ttl_ms / 1000 if ttl_ms > 0 else None)
+
+    def _execute(self, args: List[bytes], writer: asyncio.StreamWriter) -> object:
+        name = args[0].upper()
+        self.commands.append(name)
+        if name in (b"AUTH", b"SELECT", b"PING"):
+            return "OK"
+        if name == b"GET":
+            return self._get(args[1])
+        if name == b"SET":
+            options = [arg.upper() for arg in args[3:]]
+            if b"NX" in options and self._get(args[1]) is not None:
+                return None
+            ttl_ms = int(args[3 + options.index(b"PX") + 1]) if b"PX" in options else 0
+            self._set(args[1], args[2], ttl_ms)
+            return "OK"
+        if name == b"DEL":
+            return int(self.data.pop(args[1], None) is not None)
+        if name == b"PUBLISH":
+            receivers = self.subscribers.get(args[1], set())
+            for subscriber in list(receivers):
+                subscriber.write(self._encode([b"message", args[1], args[2]]))
+            return len(receivers)
+        if name == b"SUBSCRIBE":
+            for count, channel in enumerate(args[1:], start=1):
+                self.subscribers.setdefault(channel, set()).add(writer)
+                writer.write(self._encode([b"subscribe", channel, count]))
+            return ...
+        if name == b"EVAL":
+            return self._compare_and_set(args)
+        return Exception(f"unknown command {name.decode()}")
+
+    def _compare_and_set(self, args: List[bytes]) -> object:
+        # KEYS[1], ARGV: has_expected, expected, has_value, value, ttl_ms
+        if args[1].decode() != _CAS_SCRIPT or args[2] != b"1":
+            return Exception("unexpected script")
+        key = args[3]
+        has_expected, expected, has_value, value, ttl_ms = args[4:9]
+        current = self._get(key)
+        if (current != expected) if has_expected == b"1" else current is not None:
+            return 0
+        if has_value == b"1":
+            self._set(key, value, int(ttl_ms))
+        else:
+            self.data.pop(key, None)
+        return 1
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                reply = self._execute(args, writer)
+                if reply is not ...:
+                    writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            for receivers in self.subscribers.values():
+                receivers.discard(writer)
+            writer.close()
@@ -0,0 +1,115 @@
+"""
+Тесты ChatCallCoalescer (utils/call_coalescing.py): одновременные /call
+группового чата получают одну встречу, ссылка переиспользуется в пределах
+окна, неудачи не кэшируются, личные чаты не объединяются, а реестр встреч
+возвращает недавнюю встречу пользователя.
+"""
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from utils.call_coalescing import ChatCallCoalescer
+from utils.meeting_pool import MeetingPool
+from utils.meeting_registry import MeetingRegistry
+from utils.telemost import Meeting
+
+GROUP_CHAT = -100123
+
+
+class FakeTelemostClient:
+    """Вместо Telemost: выдаёт встречи с номером вызова, может «падать»."""
+
+    tenant_id = "default"
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.fail = False
+        self.calls = 0
+
+    async def create_meeting(self, title: str = "Telemost Meeting") -> Optional[Meeting]:
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return None
+        return Meeting(join_url=f"https://telemost.yandex.ru/j/{call}", id=str(call), title=title)
+
+
+def _coalescer(client: FakeTelemostClient, **kwargs) -> ChatCallCoalescer:
+    # Пул выключен (size=0): каждая встреча создаётся через client
+    return ChatCallCoalescer(MeetingPool(client, size=0), **{"window": 60, "reuse_ttl": 0, **kwargs})
+
+
+def test_concurrent_group_calls_share_one_meeting() -> None:
+    async def _test() -> None:
+        client = FakeTelemostClient(delay=0.05)
+        coalescer = _coalescer(client)
+        urls = await asyncio.gather(*(coalescer.acquire(GROUP_CHAT, user_id=i) for i in range(5)))
+        assert client.calls == 1
+        assert len(set(urls)) == 1
+        assert coalescer.stats()["joined_in_flight"] == 4
+        # Вызов после создания берёт ссылку из кэша чата
+        assert await coalescer.acquire(GROUP_CHAT, user_id=7) == urls[0]
+        assert client.calls == 1
+        assert coalescer.reused == 1
+        # Другой групповой чат получает свою встречу
+        assert await coalescer.acquire(GROUP_CHAT - 1) != urls[0]
+
+    asyncio.run(_test())
+
+
+def test_new_meeting_after_window() -> None:
+    async def _test() -> None:
+        client = FakeTelemostClient()
+        coalescer = _coalescer(client, window=0.1)
+        first = await coalescer.acquire(GROUP_CHAT)
+        await asyncio.sleep(0.15)
+        assert await coalescer.acquire(GROUP_CHAT) != first
+        assert client.calls == 2
+
+    asyncio.run(_test())
+
+
+def test_private_chats_and_disabled_window_are_not_coalesced() -> None:
+    async def _test() -> None:
+        client = FakeTelemostClient()
+        coalescer = _coalescer(client)
+        await coalescer.acquire(42)
+        await coalescer.acquire(42)
+        assert client.calls == 2
+        disabled = _coalescer(client, window=0)
+        await disabled.acquire(GROUP_CHAT)
+        await disabled.acquire(GROUP_CHAT)
+        assert client.calls == 4
+
+    asyncio.run(_test())
+
+
+def test_failure_is_not_cached() -> None:
+    async def _test() -> None:
+        client = FakeTelemostClient(delay=0.05)
+        client.fail = True
+        coalescer = _coalescer(client)
+        assert await asyncio.gather(coalescer.acquire(GROUP_CHAT), coalescer.acquire(GROUP_CHAT)) == [None, None]
+        assert client.calls == 1
+        client.fail = False
+        assert await coalescer.acquire(GROUP_CHAT) is not None
+        assert client.calls == 2
+
+    asyncio.run(_test())
+
+
+def test_registry_returns_recent_meeting_of_user(tmp_path: Path) -> None:
+    async def _test() -> None:
+        client = FakeTelemostClient()
+        registry = MeetingRegistry(str(tmp_path / "meetings.db"))
+        coalescer = _coalescer(client, registry=registry, window=0, reuse_ttl=60)
+        first = await coalescer.acquire(42, user_id=1)
+        assert await coalescer.acquire(42, user_id=1) == first
+        assert coalescer.reused_from_registry == 1
+        # Другой пользователь или другой чат — новая встреча
+        assert await coalescer.acquire(42, user_id=2) != first
+        assert await coalescer.acquire(43, user_id=1) != first
+        assert client.calls == 3
+
+    asyncio.run(_test())
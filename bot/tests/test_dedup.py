@@ -0,0 +1,47 @@
+"""
+Тесты UpdateDedupMiddleware (utils/middleware.py): повтор отбрасывается,
+упавшее обновление можно доставить заново, окно не больше capacity.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from aiogram.types import Update
+
+from utils.middleware import UpdateDedupMiddleware
+
+
+def test_duplicates_dropped_and_failed_update_redelivered() -> None:
+    async def _test() -> None:
+        dedup = UpdateDedupMiddleware(capacity=3)
+        handled: List[int] = []
+        fail_once = {2}
+
+        async def handler(event: Update, data: Dict[str, Any]) -> None:
+            if event.update_id in fail_once:
+                fail_once.discard(event.update_id)
+                raise RuntimeError("handler failed")
+            handled.append(event.update_id)
+
+        await dedup(handler, Update(update_id=1), {})
+        await dedup(handler, Update(update_id=1), {})
+        with pytest.raises(RuntimeError):
+            await dedup(handler, Update(update_id=2), {})
+        # Повторная доставка упавшего обновления обрабатывается
+        await dedup(handler, Update(update_id=2), {})
+        assert handled == [1, 2]
+        assert dedup.duplicates == 1
+        # Окно и множество согласованы: id в окне ровно один раз
+        assert list(dedup._ring) == [1, 2]
+        assert dedup._seen == {1, 2}
+
+        for update_id in (3, 4, 5):
+            await dedup(handler, Update(update_id=update_id), {})
+        # capacity=3: в окне последние три, и все они отбрасываются как повторы
+        assert list(dedup._ring) == [3, 4, 5]
+        assert dedup._seen == {3, 4, 5}
+        for update_id in (3, 4, 5):
+            await dedup(handler, Update(update_id=update_id), {})
+        assert handled == [1, 2, 3, 4, 5]
+
+    asyncio.run(_test())
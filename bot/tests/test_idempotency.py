@@ -0,0 +1,145 @@
+"""
+Тесты IdempotencyStore (utils/idempotency.py): повтор ключа получает
+сохранённый ответ, одновременные запросы с одним ключом ждут первый, ответ
+истекает через ttl, число ключей ограничено, ошибки не сохраняются. С
+общим состоянием (tests/resp_server.py) то же работает между репликами.
+"""
+import asyncio
+from typing import List, Tuple
+
+from resp_server import RespStandIn
+from utils.idempotency import IdempotencyStore, StoredResponse
+from utils.state import RedisStateBackend
+
+
+class CountingHandler:
+    """Хендлер, который считает вызовы и отвечает номером вызова."""
+
+    def __init__(self, delay: float = 0.0, status: int = 200) -> None:
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+
+    async def __call__(self) -> StoredResponse:
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        return self.status, {"ok": self.status == 200, "call": call}
+
+
+def test_repeated_key_replays_stored_response() -> None:
+    async def _test() -> None:
+        store = IdempotencyStore(maxsize=10, ttl=60)
+        handler = CountingHandler()
+        first = await store.run(("1", "key"), handler)
+        assert not await store.has_response(("1", "other"))
+        assert await store.has_response(("1", "key"))
+        second = await store.run(("1", "key"), handler)
+        assert first == second == (200, {"ok": True, "call": 1})
+        assert handler.calls == 1
+        assert store.stats()["replayed"] == 1
+        # Ключ другого пользователя — другой запрос
+        await store.run(("2", "key"), handler)
+        assert handler.calls == 2
+
+    asyncio.run(_test())
+
+
+def test_concurrent_requests_wait_for_in_flight() -> None:
+    async def _test() -> None:
+        store = IdempotencyStore(maxsize=10, ttl=60)
+        handler = CountingHandler(delay=0.1)
+        first = asyncio.ensure_future(store.run(("1", "key"), handler))
+        await asyncio.sleep(0)
+        # Пока первый запрос выполняется, повтор уже считается повтором
+        assert await store.has_response(("1", "key"))
+        results = await asyncio.gather(first, *(store.run(("1", "key"), handler) for _ in range(4)))
+        assert handler.calls == 1
+        assert all(result == (200, {"ok": True, "call": 1}) for result in results)
+        assert store.stats()["joined_in_flight"] == 4
+
+    asyncio.run(_test())
+
+
+def test_stored_response_expires() -> None:
+    async def _test() -> None:
+        store = IdempotencyStore(maxsize=10, ttl=0.1)
+        handler = CountingHandler()
+        await store.run(("1", "key"), handler)
+        await asyncio.sleep(0.15)
+        assert not await store.has_response(("1", "key"))
+        assert (await store.run(("1", "key"), handler))[1]["call"] == 2
+
+    asyncio.run(_test())
+
+
+def test_size_bound_evicts_oldest_key() -> None:
+    async def _test() -> None:
+        store = IdempotencyStore(maxsize=2, ttl=60)
+        handler = CountingHandler()
+        for key in ("a", "b", "c"):
+            await store.run(("1", key), handler)
+        assert store.stats()["size"] == 2
+        # "a" вытеснен: выполняется заново; "c" — ещё в кэше
+        assert (await store.run(("1", "a"), handler))[1]["call"] == 4
+        assert (await store.run(("1", "c"), handler))[1]["call"] == 3
+
+    asyncio.run(_test())
+
+
+def test_error_responses_are_not_stored() -> None:
+    async def _test() -> None:
+        store = IdempotencyStore(maxsize=10, ttl=60)
+        failing = CountingHandler(status=503)
+        assert (await store.run(("1", "key"), failing))[0] == 503
+        assert not await store.has_response(("1", "key"))
+        ok = CountingHandler()
+        assert (await store.run(("1", "key"), ok))[0] == 200
+
+    asyncio.run(_test())
+
+
+def test_shared_state_runs_once_across_replicas() -> None:
+    async def _test() -> None:
+        server = RespStandIn()
+        await server.start()
+        states: List[RedisStateBackend] = [RedisStateBackend(server.url) for _ in range(2)]
+        try:
+            replicas = [IdempotencyStore(maxsize=10, ttl=60, state=state, wait_timeout=2.0) for state in states]
+            handler = CountingHandler(delay=0.3)
+            results: Tuple[StoredResponse, ...] = await asyncio.gather(
+                *(replica.run(("1", "key"), handler) for replica in replicas)
+            )
+            assert handler.calls == 1
+            assert results[0] == results[1]
+            assert replicas[0].stats()["replayed_shared"] + replicas[1].stats()["replayed_shared"] == 1
+            # Третья реплика видит сохранённый ответ сразу
+            late = IdempotencyStore(maxsize=10, ttl=60, state=states[0])
+            assert await late.has_response(("1", "key"))
+        finally:
+            for state in states:
+                await state.close()
+            await server.stop()
+
+    asyncio.run(_test())
+
+
+def test_shared_state_wait_timeout_returns_409() -> None:
+    async def _test() -> None:
+        server = RespStandIn()
+        await server.start()
+        states = [RedisStateBackend(server.url) for _ in range(2)]
+        try:
+            slow, impatient = (IdempotencyStore(state=state, wait_timeout=0.2) for state in states)
+            handler = CountingHandler(delay=0.5)
+            first = asyncio.ensure_future(slow.run(("1", "key"), handler))
+            await asyncio.sleep(0.05)
+            assert await impatient.run(("1", "key"), handler) == (409, {"ok": False, "error": "request_in_progress"})
+            assert (await first)[0] == 200
+            assert handler.calls == 1
+        finally:
+            for state in states:
+                await state.close()
+            await server.stop()
+
+    asyncio.run(_test())
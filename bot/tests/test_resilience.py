@@ -0,0 +1,104 @@
+"""
+Тесты CircuitBreaker (utils/resilience.py): автомат открывается после серии
+сбоев, в half_open пропускает ровно один пробный запрос, закрывается после
+его успеха и снова открывается после неудачи. Время подменяется, чтобы не
+ждать recovery_timeout.
+"""
+import pytest
+
+from utils import resilience
+from utils.resilience import CircuitBreaker, CircuitOpenError
+from utils.telemost import ROLE_BACKGROUND, ROLE_INTERACTIVE, breaker_for
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake)
+    return fake
+
+
+def _opened() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold_and_rejects(clock: FakeClock) -> None:
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.check()
+    assert error.value.retry_in == pytest.approx(20)
+    assert breaker.stats()["opened"] == 1
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_half_open_allows_single_probe(clock: FakeClock) -> None:
+    breaker = _opened()
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    # Пока пробный запрос не завершился, остальные отклоняются
+    assert not breaker.allow()
+    assert not breaker.allow()
+    assert breaker.rejected == 2
+
+
+def test_successful_probe_closes(clock: FakeClock) -> None:
+    breaker = _opened()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert all(breaker.allow() for _ in range(5))
+    # Счётчик сбоев сброшен: для нового открытия снова нужна серия
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens(clock: FakeClock) -> None:
+    breaker = _opened()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 2
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_stuck_probe_is_replaced(clock: FakeClock) -> None:
+    breaker = _opened()
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 29
+    assert not breaker.allow()
+    # Пробный запрос завис дольше recovery_timeout — пропускаем новый
+    clock.now += 2
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_breaker_for_isolates_tenant_and_role() -> None:
+    interactive = breaker_for("tenant-a", ROLE_INTERACTIVE)
+    assert breaker_for("tenant-a", ROLE_INTERACTIVE) is interactive
+    assert breaker_for("tenant-a", ROLE_BACKGROUND) is not interactive
+    assert breaker_for("tenant-b", ROLE_INTERACTIVE) is not interactive
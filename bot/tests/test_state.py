@@ -0,0 +1,244 @@
+"""
+Тесты RedisStateBackend (utils/state.py) против локальной замены Redis
+(tests/resp_server.py) или настоящего Redis из TEST_REDIS_URL: команды и
+их конвейер, скрипт compare-and-set, инвалидация через pub/sub в
+SharedCache и StateTokenStore, переподключение после перезапуска сервера.
+"""
+import asyncio
+import json
+import os
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+import pytest
+
+from resp_server import RespStandIn
+from utils.state import RedisStateBackend, SharedCache, StateError
+from utils.token_store import StateTokenStore
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+def _replicas(server: Optional[RespStandIn], count: int = 2) -> List[RedisStateBackend]:
+    url = TEST_REDIS_URL or server.url
+    # Свой префикс на тест: на настоящем Redis тесты не видят чужих ключей
+    prefix = f"test:{uuid.uuid4().hex}:"
+    return [RedisStateBackend(url, prefix=prefix, timeout=1.0) for _ in range(count)]
+
+
+async def _wait_subscribed(*states: RedisStateBackend) -> None:
+    for _ in range(100):
+        if all(state.stats()["subscribed"] for state in states):
+            # SUBSCRIBE уже отправлен, даём серверу его обработать
+            await asyncio.sleep(0.05)
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("subscriber did not connect")
+
+
+async def _eventually(check: Callable[[], Awaitable[bool]], timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await check():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.02)
+
+
+def run_with_server(test: Callable[[Optional[RespStandIn]], Awaitable[None]]) -> None:
+    async def _main() -> None:
+        server = None
+        if not TEST_REDIS_URL:
+            server = RespStandIn()
+            await server.start()
+        try:
+            await test(server)
+        finally:
+            if server is not None:
+                await server.stop()
+
+    asyncio.run(_main())
+
+
+def test_get_set_ttl_and_nx() -> None:
+    async def _test(server: Optional[RespStandIn]) -> None:
+        a, b = _replicas(server)
+        try:
+            assert await a.set("key", "value", ttl=0.2)
+            assert await b.get("key") == "value"
+            assert not await b.set("key", "other", only_if_absent=True)
+            await asyncio.sleep(0.3)
+            assert await b.get("key") is None
+            assert await b.set("key", "other", only_if_absent=True)
+            await a.delete("key")
+            assert await b.get("key") is None
+        finally:
+            await a.close()
+            await b.close()
+
+    run_with_server(_test)
+
+
+def test_pipelined_commands_keep_order() -> None:
+    async def _test(server: Optional[RespStandIn]) -> None:
+        a, b = _replicas(server)
+        try:
+            await asyncio.gather(*(a.set(f"p{i}", str(i)) for i in range(200)))
+            values = await asyncio.gather(*(b.get(f"p{i}") for i in range(200)))
+            assert values == [str(i) for i in range(200)]
+        finally:
+            await a.close()
+            await b.close()
+
+    run_with_server(_test)
+
+
+def test_compare_and_set_script() -> None:
+    async def _test(server: Optional[RespStandIn]) -> None:
+        a, b = _replicas(server)
+        try:
+            # expected=None — ключа не должно быть
+            assert await a.compare_and_set("cas", None, "1")
+            assert not await b.compare_and_set("cas", None, "2")
+            # Устаревшее ожидание проигрывает
+            assert await b.compare_and_set("cas", "1", "2")
+            assert not await a.compare_and_set("cas", "1", "3")
+            assert await a.get("cas") == "2"
+            # value=None — удалить
+            assert await a.compare_and_set("cas", "2", None)
+            assert await b.get("cas") is None
+            # TTL передаётся в SET PX
+            assert await a.compare_and_set("cas", None, "4", ttl=0.2)
+            await asyncio.sleep(0.3)
+            assert await b.get("cas") is None
+            if server is not None:
+                assert b"EVAL" in server.commands
+        finally:
+            await a.close()
+            await b.close()
+
+    run_with_server(_test)
+
+
+def test_shared_cache_invalidation() -> None:
+    async def _test(server: Optional[RespStandIn]) -> None:
+        a, b = _replicas(server)
+        cache_a = SharedCache(a, "prepared", maxsize=100, ttl=60)
+        cache_b = SharedCache(b, "prepared", maxsize=100, ttl=60)
+        a.start()
+        b.start()
+        try:
+            await _wait_subscribed(a, b)
+            await cache_a.set("user", "msg-1", ttl=30)
+            assert await cache_b.get("user") == "msg-1"
+            assert cache_b.remote_hits == 1
+            # Новая запись сбрасывает копию в L1 другой реплики
+            await cache_a.set("user", "msg-2", ttl=30)
+
+            async def _invalidated() -> bool:
+                return cache_b.invalidations == 1
+
+            await _eventually(_invalidated)
+            assert await cache_b.get("user") == "msg-2"
+            # Свои сообщения реплика пропускает
+            assert cache_a.invalidations == 0
+        finally:
+            await a.close()
+            await b.close()
+
+    run_with_server(_test)
+
+
+def test_state_token_store_concurrent_updates() -> None:
+    async def _test(server: Optional[RespStandIn]) -> None:
+        a, b = _replicas(server)
+        store_a = StateTokenStore(a, cache_ttl=100)
+        store_b = StateTokenStore(b, cache_ttl=100)
+        a.start()
+        b.start()
+        try:
+            await _wait_subscribed(a, b)
+            assert await store_b.load() is None
+            await store_a.save({"access_token": "t1"})
+
+            async def _seen() -> bool:
+                token = await store_b.load()
+                return token is not None and token["access_token"] == "t1"
+
+            # Без сообщения об инвалидации store_b вернул бы None из кэша 100 секунд
+            await _eventually(_seen)
+            assert store_b.invalidations == 1
+
+            def _increment(current: Optional[dict]) -> dict:
+                current = current or {}
+                return {**current, "n": current.get("n", 0) + 1}
+
+            await asyncio.gather(*(
+                (store_a if i % 2 else store_b).update(_increment) for i in range(20)
+            ))
+            token = json.loads(await a.get("telemost_token:default"))
+            # Ни одно обновление не потеряно, хотя реплики писали одновременно
+            assert token["n"] == 20
+            assert await store_b.delete()
+            assert not await store_a.delete()
+        finally:
+            await a.close()
+            await b.close()
+
+    run_with_server(_test)
+
+
+@pytest.mark.skipif(bool(TEST_REDIS_URL), reason="перезапуск нужен только локальной замене")
+def test_reconnect_and_resubscribe() -> None:
+    async def _test(server: Optional[RespStandIn]) -> None:
+        a, b = _replicas(server)
+        cache_a = SharedCache(a, "prepared", maxsize=10, ttl=60)
+        cache_b = SharedCache(b, "prepared", maxsize=10, ttl=60)
+        a.start()
+        b.start()
+        try:
+            await _wait_subscribed(a, b)
+            assert await a.set("before", "1")
+            await server.stop()
+            with pytest.raises(StateError):
+                await a.get("before")
+            await server.start()
+
+            async def _reconnected() -> bool:
+                try:
+                    return await a.set("after", "1") and a.stats()["subscribed"] and b.stats()["subscribed"]
+                except StateError:
+                    return False
+
+            await _eventually(_reconnected, timeout=5.0)
+            assert a.stats()["reconnects"] >= 1
+            await asyncio.sleep(0.05)
+            # После переподписки инвалидация снова доходит
+            await cache_b.set("user", "old", ttl=30)
+            await cache_a.set("user", "new", ttl=30)
+
+            async def _invalidated() -> bool:
+                return cache_b.invalidations == 1
+
+            await _eventually(_invalidated)
+        finally:
+            await a.close()
+            await b.close()
+
+    run_with_server(_test)
+
+
+def test_unreachable_server_raises_state_error() -> None:
+    async def _test() -> None:
+        server = RespStandIn()
+        await server.start()
+        url = server.url
+        await server.stop()
+        state = RedisStateBackend(url, timeout=0.5)
+        try:
+            with pytest.raises(StateError):
+                await state.get("key")
+            assert state.stats()["errors"] >= 1
+        finally:
+            await state.close()
+
+    asyncio.run(_test())
@@ -0,0 +1,38 @@
+"""
+Тесты файловых хранилищ токена (utils/token_store.py): update(fn), который
+не меняет токен, ничего не записывает и не сбрасывает кэш других процессов.
+"""
+import asyncio
+import os
+from pathlib import Path
+
+from utils.token_store import JsonTokenStore, SqliteTokenStore
+
+
+def test_sqlite_noop_update_keeps_version(tmp_path: Path) -> None:
+    async def _test() -> None:
+        store = SqliteTokenStore(str(tmp_path / "tokens.db"), cache_ttl=0)
+        await store.save({"access_token": "a"})
+        version = store._signature_now()
+        assert await store.update(lambda current: current) == {"access_token": "a"}
+        assert store._signature_now() == version
+        await store.save({"access_token": "b"})
+        assert store._signature_now() == version + 1
+        # Удаление отсутствующего токена тоже не пишет
+        other = SqliteTokenStore(str(tmp_path / "tokens.db"), key="other", cache_ttl=0)
+        assert not await other.delete()
+        assert other._signature_now() is None
+
+    asyncio.run(_test())
+
+
+def test_json_noop_update_keeps_file(tmp_path: Path) -> None:
+    async def _test() -> None:
+        path = tmp_path / "token.json"
+        store = JsonTokenStore(str(path), cache_ttl=0)
+        await store.save({"access_token": "a"})
+        inode = os.stat(path).st_ino
+        await store.update(lambda current: current)
+        assert os.stat(path).st_ino == inode
+
+    asyncio.run(_test())
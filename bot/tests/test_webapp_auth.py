@@ -0,0 +1,53 @@
+"""
+Тесты проверки initData Mini App (utils/webapp_auth.py): пользователь
+берётся только из строки с верной подписью Telegram и не старше TTL.
+"""
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+from aiohttp.test_utils import make_mocked_request
+
+from utils.webapp_auth import webapp_user_id
+
+TOKEN = "42:test-token"
+
+
+def _init_data(user_id: int, auth_date: Optional[float] = None, token: str = TOKEN) -> str:
+    fields = {
+        "auth_date": str(int(auth_date if auth_date is not None else time.time())),
+        "query_id": "AAE",
+        "user": json.dumps({"id": user_id, "first_name": "Test"}),
+    }
+    check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret, check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def _request(headers: Dict[str, str]):
+    return make_mocked_request("GET", "/api/telemost/rooms", headers=headers)
+
+
+def test_signed_init_data_gives_user() -> None:
+    assert webapp_user_id(_request({"Authorization": f"tma {_init_data(7)}"}), TOKEN) == 7
+    assert webapp_user_id(_request({"X-Telegram-Init-Data": _init_data(8)}), TOKEN) == 8
+
+
+def test_missing_or_forged_init_data_is_rejected() -> None:
+    assert webapp_user_id(_request({}), TOKEN) is None
+    # Подписано другим ботом
+    assert webapp_user_id(_request({"Authorization": f"tma {_init_data(7, token='1:other')}"}), TOKEN) is None
+    # Подмена пользователя ломает подпись
+    forged = _init_data(7).replace("%22id%22%3A+7", "%22id%22%3A+8")
+    assert forged != _init_data(7)
+    assert webapp_user_id(_request({"Authorization": f"tma {forged}"}), TOKEN) is None
+
+
+def test_expired_init_data_is_rejected() -> None:
+    old = _init_data(7, auth_date=time.time() - 7200)
+    assert webapp_user_id(_request({"Authorization": f"tma {old}"}), TOKEN, max_age=3600) is None
+    assert webapp_user_id(_request({"Authorization": f"tma {old}"}), TOKEN, max_age=0) == 7
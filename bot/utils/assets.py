@@ -0,0 +1,305 @@
+"""
+🎞️ РЕЕСТР МЕДИА-ФАЙЛОВ TELEGRAM (file_id)
+
+Telegram позволяет повторно отправлять уже загруженный файл по его file_id
+без повторной загрузки. Реестр загружает каждый файл из bot/assets один раз,
+запоминает выданный file_id и дальше отправляет файл только по нему.
+
+Принцип работы:
+- ключ кэша — SHA-256 содержимого файла, поэтому замена файла на диске
+  автоматически приводит к новой загрузке
+- соответствие «хэш -> file_id» хранится в JSON (ASSET_FILE_ID_STORE)
+  и переживает перезапуск бота. Файл общий для воркеров (WEB_PROCESSES):
+  изменение применяется под fcntl-блокировкой к свежепрочитанному файлу и
+  записывается атомарно (временный файл + fsync + os.replace), как в
+  JsonTokenStore (utils/token_store.py)
+- пока идёт первая загрузка файла, остальные отправки ждут её и
+  используют полученный file_id вместо параллельных загрузок
+- если Telegram отклоняет сохранённый file_id (ошибка называет неверный
+  идентификатор файла), файл загружается заново; остальные ошибки
+  (чат не найден, подпись, клавиатура) пробрасываются, и кэш не трогается
+- при заданном ASSET_UPLOAD_CHAT_ID все файлы загружаются заранее (warmup).
+  friends.mp4 уходит только в inline-результатах, а они не умеют загружать
+  файлы: без warmup он отправляется по URL
+- превью (friends-thumb.jpg) реестр не кэширует: Telegram не позволяет
+  повторно использовать загруженные превью по file_id, а inline-результаты
+  получают превью по thumbnail_url
+
+Пример:
+    assets = AssetRegistry(Path(__file__).parent / "assets")
+    await assets.send_video(
+        "call.mp4",
+        lambda video: message.answer_video(video=video, caption=text),
+    )
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки нет, работает один процесс
+    fcntl = None  # type: ignore[assignment]
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from config import ASSET_FILE_ID_STORE, ASSET_UPLOAD_CHAT_ID
+from utils.outbound import bulk_priority
+
+
+logger = logging.getLogger(__name__)
+
+# Функция отправки: получает file_id (str) или файл для загрузки
+VideoSender = Callable[[Union[str, FSInputFile]], Awaitable[Message]]
+
+# Файлы, которые реестр знает заранее (для warmup)
+DEFAULT_VIDEO_ASSETS = ("call.mp4", "friends.mp4")
+
+# Так Telegram сообщает о неверном или чужом file_id
+_FILE_ID_ERRORS = ("file identifier", "file_id", "wrong file", "wrong remote file")
+
+
+def is_stale_file_id_error(error: TelegramBadRequest) -> bool:
+    """Отклонён ли именно идентификатор файла (а не чат, подпись или клавиатура)."""
+    text = str(error.message).lower()
+    return any(marker in text for marker in _FILE_ID_ERRORS)
+
+
+class AssetRegistry:
+    """Кэш file_id для файлов из каталога assets."""
+
+    def __init__(
+        self,
+        assets_dir: Path,
+        store_path: str = ASSET_FILE_ID_STORE,
+        upload_chat_id: Optional[int] = ASSET_UPLOAD_CHAT_ID,
+        videos: Tuple[str, ...] = DEFAULT_VIDEO_ASSETS,
+    ) -> None:
+        self.assets_dir = Path(assets_dir)
+        self.store_path = store_path
+        self.lock_path = f"{store_path}.lock"
+        # Блокировка между потоками одного процесса (flock — между процессами)
+        self._store_lock = threading.Lock()
+        self.upload_chat_id = upload_chat_id
+        self.videos = videos
+        # имя файла -> (mtime_ns, size, sha256)
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        # sha256 -> file_id
+        self._file_ids: Optional[Dict[str, str]] = None
+        # sha256 -> идущая первая загрузка
+        self._uploads: Dict[str, "asyncio.Future[None]"] = {}
+        # 📊 Счётчики
+        self.hits = 0
+        self.uploads = 0
+        self.stale = 0
+
+    def path(self, name: str) -> Path:
+        return self.assets_dir / name
+
+    def _read_store(self) -> Dict[str, str]:
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("[Assets] не удалось прочитать %s: %s", self.store_path, e)
+            return {}
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._store_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_store(self, data: Dict[str, str]) -> None:
+        directory = os.path.dirname(self.store_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".file-ids-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.store_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _update_store(self, key: str, file_id: Optional[str]) -> Dict[str, str]:
+        """
+        Под блокировкой перечитывает файл, меняет одну запись (None — удалить)
+        и записывает результат. Возвращает содержимое файла после изменения.
+        """
+        with self._locked():
+            # Записи, добавленные другими воркерами, не затираются
+            data = self._read_store()
+            if file_id is None:
+                data.pop(key, None)
+            else:
+                data[key] = file_id
+            self._write_store(data)
+            return data
+
+    async def _load_store(self) -> Dict[str, str]:
+        if self._file_ids is None:
+            data = await asyncio.to_thread(self._read_store)
+            # Параллельная загрузка могла успеть раньше — её словарь главнее
+            if self._file_ids is None:
+                self._file_ids = data
+        return self._file_ids
+
+    async def _persist(self, key: str, file_id: Optional[str]) -> None:
+        try:
+            data = await asyncio.to_thread(self._update_store, key, file_id)
+        except Exception as e:
+            logger.warning("[Assets] не удалось сохранить %s: %s", self.store_path, e)
+            return
+        # Заодно подхватываем file_id, сохранённые другими воркерами
+        for other_key, other_id in data.items():
+            self._file_ids.setdefault(other_key, other_id)
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def content_hash(self, name: str) -> str:
+        """
+        SHA-256 содержимого файла. Пересчитывается только если
+        у файла изменились размер или время модификации.
+        """
+        path = self.path(name)
+        st = await asyncio.to_thread(path.stat)
+        if st.st_size == 0:
+            raise FileNotFoundError(f"Asset {name} is empty")
+        cached = self._hashes.get(name)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        digest = await asyncio.to_thread(self._hash_file, path)
+        self._hashes[name] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    async def file_id(self, name: str) -> Optional[str]:
+        """Сохранённый file_id файла или None, если файл ещё не загружался."""
+        try:
+            key = await self.content_hash(name)
+        except OSError:
+            return None
+        return (await self._load_store()).get(key)
+
+    async def _remember(self, key: str, file_id: str) -> None:
+        file_ids = await self._load_store()
+        if file_ids.get(key) != file_id:
+            file_ids[key] = file_id
+            await self._persist(key, file_id)
+
+    async def _forget(self, key: str) -> None:
+        file_ids = await self._load_store()
+        if file_ids.pop(key, None) is not None:
+            await self._persist(key, None)
+
+    async def send_video(self, name: str, send: VideoSender) -> Message:
+        """
+        Отправляет видео из assets через send(): по file_id, если он известен,
+        иначе загружает файл и запоминает выданный file_id.
+
+        Raises:
+            FileNotFoundError: файла нет или он пустой
+        """
+        key = await self.content_hash(name)
+        file_ids = await self._load_store()
+
+        # Первая загрузка уже идёт — дождёмся её file_id
+        pending = self._uploads.get(key)
+        if pending is not None and key not in file_ids:
+            try:
+                await asyncio.shield(pending)
+            except Exception:
+                pass
+
+        file_id = self._file_ids.get(key)
+        if file_id:
+            try:
+                message = await send(file_id)
+                self.hits += 1
+                return message
+            except TelegramBadRequest as e:
+                if not is_stale_file_id_error(e):
+                    raise
+                # file_id устарел (например, сменился токен бота) — загружаем заново
+                logger.warning("[Assets] file_id для %s отклонён: %s", name, e)
+                self.stale += 1
+                await self._forget(key)
+
+        return await self._upload(name, key, send)
+
+    async def _upload(self, name: str, key: str, send: VideoSender) -> Message:
+        future = asyncio.get_running_loop().create_future()
+        self._uploads.setdefault(key, future)
+        try:
+            message = await send(FSInputFile(self.path(name)))
+            self.uploads += 1
+            if message.video:
+                await self._remember(key, message.video.file_id)
+            return message
+        finally:
+            if self._uploads.get(key) is future:
+                del self._uploads[key]
+            future.set_result(None)
+
+    async def warmup(self, bot: Bot) -> None:
+        """
+        Заранее загружает известные видео в служебный чат ASSET_UPLOAD_CHAT_ID,
+        чтобы даже первая отправка пользователю шла по file_id.
+        """
+        if not self.upload_chat_id:
+            return
+        for name in self.videos:
+            try:
+                if await self.file_id(name) or not self.path(name).exists():
+                    continue
+                # Предзагрузка не должна тормозить ответы пользователям
+                with bulk_priority():
+                    await self.send_video(
+                        name,
+                        lambda video: bot.send_video(
+                            chat_id=self.upload_chat_id,
+                            video=video,
+                            disable_notification=True,
+                        ),
+                    )
+            except Exception as e:
+                logger.warning("[Assets] не удалось предзагрузить %s: %s", name, e)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "known": len(self._file_ids or {}),
+            "hits": self.hits,
+            "uploads": self.uploads,
+            "stale": self.stale,
+        }
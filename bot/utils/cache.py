@@ -0,0 +1,86 @@
+"""
+🗃️ ОГРАНИЧЕННЫЙ КЭШ С TTL И LRU-ВЫТЕСНЕНИЕМ
+
+Небольшой кэш в памяти для результатов дорогих вызовов (Bot API, Telemost):
+- каждая запись живёт не дольше своего TTL
+- при превышении maxsize вытесняется давно не использованная запись (LRU)
+- все операции — O(1)
+- stats() отдаёт попадания, промахи, вытеснения и истечения
+
+Пример:
+    cache = TTLCache(maxsize=10_000, ttl=3600)
+    value = cache.get(key)
+    if value is None:
+        value = await compute()
+        cache.set(key, value)
+
+Модуль не зависит от config.py: его импортирует и FastAPI-приложение
+(from ..bot.utils.cache import TTLCache в logic/main.py).
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """LRU-кэш с временем жизни записей."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = max(maxsize, 1)
+        self.ttl = ttl
+        # ключ -> (monotonic-время истечения, значение); порядок — от давних к свежим
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        # 📊 Счётчики
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
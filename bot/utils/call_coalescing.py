@@ -0,0 +1,127 @@
+"""
+👥 ОБЪЕДИНЕНИЕ /call В ГРУППОВЫХ ЧАТАХ
+
+В активных группах несколько участников часто отправляют /call с разницей
+в пару секунд, и каждый вызов создаёт свою встречу. ChatCallCoalescer
+объединяет такие вызовы: все /call одного группового чата в пределах окна
+получают одну и ту же встречу.
+
+Принцип работы:
+- пока встреча для чата создаётся, остальные вызовы ждут её (utils/singleflight.py)
+- созданная ссылка живёт в кэше чата `window` секунд (utils/cache.py)
+- неудачное создание не кэшируется: следующий /call попробует снова
+- личные чаты (chat_id > 0) не объединяются
+- при window <= 0 объединение выключено, вызовы идут прямо в MeetingPool
+
+Реестр встреч (utils/meeting_registry.py):
+- каждая созданная встреча записывается вместе с user_id и chat_id
+- при MEETING_REUSE_TTL > 0 повторный /call пользователя в том же чате
+  получает его недавнюю встречу из реестра без запроса к Telemost
+
+Настройки (config.py):
+- CALL_COALESCE_WINDOW: окно объединения в секундах (0 — выключено)
+- MEETING_REUSE_TTL: окно повторного использования встречи (0 — выключено)
+"""
+from typing import Dict, Optional
+
+from config import CALL_COALESCE_WINDOW, CALL_COALESCE_CACHE_SIZE, MEETING_REUSE_TTL
+from utils.cache import TTLCache
+from utils.meeting_pool import MeetingPool
+from utils.meeting_registry import MeetingRegistry
+from utils.singleflight import SingleFlight
+from utils.telemost import TelemostClient
+
+
+class ChatCallCoalescer:
+    """Выдаёт одну встречу на все /call группового чата в пределах окна."""
+
+    def __init__(
+        self,
+        meeting_pool: MeetingPool,
+        registry: Optional[MeetingRegistry] = None,
+        window: float = CALL_COALESCE_WINDOW,
+        maxsize: int = CALL_COALESCE_CACHE_SIZE,
+        reuse_ttl: float = MEETING_REUSE_TTL,
+    ) -> None:
+        self.meeting_pool = meeting_pool
+        self.registry = registry
+        self.window = window
+        self.reuse_ttl = reuse_ttl
+        self._recent: TTLCache[str] = TTLCache(maxsize=maxsize, ttl=max(window, 0.0))
+        self._flights = SingleFlight()
+        # 📊 Счётчики
+        self.requests = 0
+        self.created = 0
+        self.reused = 0
+        self.reused_from_registry = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def _create(
+        self,
+        chat_id: Optional[int],
+        user_id: Optional[int],
+        title: str,
+        client: Optional[TelemostClient],
+    ) -> Optional[str]:
+        if client is None or client is self.meeting_pool.client:
+            meeting = await self.meeting_pool.acquire_meeting(title=title)
+        else:
+            # Другая организация (utils/tenants.py): пул встреч есть только у основной
+            meeting = await client.create_meeting(title=title)
+        if not meeting:
+            return None
+        if self.registry is not None:
+            tenant_id = (client or self.meeting_pool.client).tenant_id
+            await self.registry.record(meeting, user_id=user_id, chat_id=chat_id, tenant_id=tenant_id)
+        return meeting.join_url
+
+    async def acquire(
+        self,
+        chat_id: Optional[int],
+        title: str = "Telemost Meeting",
+        user_id: Optional[int] = None,
+        client: Optional[TelemostClient] = None,
+    ) -> Optional[str]:
+        """
+        Ссылка на встречу для /call пользователя user_id в чате chat_id.
+        client — клиент организации чата (по умолчанию — клиент пула встреч).
+        """
+        if self.registry is not None and self.reuse_ttl > 0 and user_id is not None:
+            active = await self.registry.find_active(user_id, chat_id, self.reuse_ttl)
+            if active:
+                self.reused_from_registry += 1
+                return active["join_url"]
+
+        if not self.enabled or chat_id is None or chat_id > 0:
+            return await self._create(chat_id, user_id, title, client)
+
+        self.requests += 1
+        url = self._recent.get(chat_id)
+        if url is not None:
+            self.reused += 1
+            return url
+
+        async def _create_for_chat() -> Optional[str]:
+            created = await self._create(chat_id, user_id, title, client)
+            if created:
+                self.created += 1
+                self._recent.set(chat_id, created)
+            return created
+
+        return await self._flights.do(chat_id, _create_for_chat)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "window": self.window,
+            "requests": self.requests,
+            "created": self.created,
+            "reused": self.reused,
+            "joined_in_flight": self._flights.collapsed,
+            "reuse_ttl": self.reuse_ttl,
+            "reused_from_registry": self.reused_from_registry,
+            "chats": len(self._recent),
+        }
@@ -0,0 +1,184 @@
+"""
+📬 ФОНОВАЯ ОЧЕРЕДЬ ДОСТАВКИ СООБЩЕНИЙ
+
+HTTP-обработчики (например, /api/telemost/create) не должны ждать отправки
+сообщения в Telegram: загрузка видео может занимать секунды. Вместо этого
+обработчик ставит задачу в очередь и сразу отвечает клиенту, а ограниченный
+пул воркеров выполняет задачи в фоне.
+
+Принцип работы:
+- submit() кладёт задачу в ограниченную очередь за O(1); если очередь
+  переполнена, задача отбрасывается и учитывается в счётчике dropped
+- accepting() — проверка до начала дорогой работы: если очередь полна,
+  HTTP-обработчик сразу отвечает 503 с retry_after() (счётчик rejected)
+- воркеры выполняют задачи; при ошибке задача перезапускается с
+  экспоненциальной задержкой (TelegramRetryAfter — через retry_after)
+- ошибки, которые не исправятся повтором (бот заблокирован, неверный запрос),
+  не повторяются
+- stats() отдаёт глубину очереди, задержку выполнения и счётчики ошибок
+
+Настройки (config.py):
+- DELIVERY_WORKERS: количество воркеров
+- DELIVERY_QUEUE_SIZE: максимальная длина очереди
+- DELIVERY_MAX_ATTEMPTS: максимальное число попыток на задачу
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from config import DELIVERY_WORKERS, DELIVERY_QUEUE_SIZE, DELIVERY_MAX_ATTEMPTS
+
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+# Ошибки, которые повтор не исправит
+PERMANENT_ERRORS = (TelegramForbiddenError, TelegramBadRequest)
+
+
+@dataclass
+class DeliveryJob:
+    name: str
+    run: Job
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempt: int = 1
+
+
+class DeliveryQueue:
+    """Ограниченная очередь фоновых задач доставки с пулом воркеров."""
+
+    def __init__(
+        self,
+        workers: int = DELIVERY_WORKERS,
+        maxsize: int = DELIVERY_QUEUE_SIZE,
+        max_attempts: int = DELIVERY_MAX_ATTEMPTS,
+    ) -> None:
+        self.workers = max(workers, 1)
+        self.max_attempts = max(max_attempts, 1)
+        self._queue: "asyncio.Queue[DeliveryJob]" = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+        # Задачи, ожидающие повтора (ещё не вернулись в очередь)
+        self._delayed: Dict[int, asyncio.TimerHandle] = {}
+        # 📊 Счётчики
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(), name=f"delivery-worker-{i}")
+                for i in range(self.workers)
+            ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Даёт воркерам дослать очередь (не дольше timeout) и останавливает их."""
+        for handle in self._delayed.values():
+            handle.cancel()
+        self._delayed.clear()
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("[Delivery] не успели доставить %s задач", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, name: str, run: Job) -> bool:
+        """Ставит задачу в очередь. Возвращает False, если очередь переполнена."""
+        return self._put(DeliveryJob(name=name, run=run), new=True)
+
+    def accepting(self) -> bool:
+        """Есть ли место для новой задачи. Отказ учитывается в счётчике rejected."""
+        if not self._queue.full():
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self) -> float:
+        """Оценка в секундах, через сколько воркеры разберут текущую очередь."""
+        latency = self.latency_total / self.completed if self.completed else 1.0
+        return max(self._queue.qsize() * latency / self.workers, 1.0)
+
+    def _put(self, job: DeliveryJob, new: bool = False) -> bool:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("[Delivery] очередь переполнена, задача %s отброшена", job.name)
+            return False
+        if new:
+            self.submitted += 1
+        return True
+
+    def _retry_later(self, job: DeliveryJob, delay: float) -> None:
+        job.attempt += 1
+        self.retried += 1
+        key = id(job)
+
+        def _requeue() -> None:
+            self._delayed.pop(key, None)
+            self._put(job)
+
+        self._delayed[key] = asyncio.get_running_loop().call_later(delay, _requeue)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await job.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._handle_failure(job, e)
+            else:
+                self.completed += 1
+                latency = time.monotonic() - job.enqueued_at
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+            finally:
+                self._queue.task_done()
+
+    def _handle_failure(self, job: DeliveryJob, error: Exception) -> None:
+        if isinstance(error, PERMANENT_ERRORS) or job.attempt >= self.max_attempts:
+            self.failed += 1
+            logger.warning(
+                "[Delivery] задача %s не выполнена после %s попыток: %s",
+                job.name, job.attempt, error,
+            )
+            return
+        if isinstance(error, TelegramRetryAfter):
+            delay: Union[int, float] = error.retry_after
+        else:
+            # Экспоненциальная задержка с джиттером: ~1, 2, 4... секунд
+            delay = min(2 ** (job.attempt - 1), 60) * random.uniform(0.5, 1.5)
+        logger.info("[Delivery] повтор задачи %s через %.1fs: %s", job.name, delay, error)
+        self._retry_later(job, delay)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "depth": self._queue.qsize(),
+            "delayed": len(self._delayed),
+            "workers": len(self._tasks),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "latency_avg": self.latency_total / self.completed if self.completed else None,
+            "latency_max": self.latency_max,
+        }
@@ -0,0 +1,470 @@
+"""
+🩺 ДИАГНОСТИКА ПРОИЗВОДИТЕЛЬНОСТИ (ТОЛЬКО ДЛЯ АДМИНИСТРАТОРА)
+
+Контейнер бота упирается в лимит CPU (docker-compose.yml), и без
+профилировщика не видно почему. Модуль даёт:
+
+SamplingProfiler — выборочный профилировщик по запросу:
+- отдельный поток раз в interval секунд снимает стеки всех потоков через
+  sys._current_frames(); код бота не меняется и не замедляется, пока
+  профилирование не запущено
+- результат — collapsed stacks («корень;...;лист количество» на строку),
+  формат flamegraph.pl / speedscope / inferno
+- одновременно идёт только одно профилирование
+
+LoopLagMonitor — постоянный сторож event loop:
+- корутина-«пульс» просыпается каждые interval секунд и отмечает время;
+  опоздание пульса — задержка loop, она попадает в гистограмму /metrics
+- поток-сторож видит, что пульса нет дольше threshold, и снимает стек
+  потока event loop прямо во время блокировки: в логе будет именно тот
+  синхронный вызов, который держит loop (чтение файла, тяжёлый json и т.п.)
+- последние события с их стеками отдаёт stats()
+
+MemoryDiagnostics — снимки tracemalloc по запросу:
+- первый снимок включает tracemalloc (у него есть накладные расходы, поэтому
+  по умолчанию трассировка выключена) и становится базовым
+- diff сравнивает новый снимок с базовым и показывает места, где выделенная
+  память выросла сильнее всего: так видно, какой кэш или хендлер растёт
+- снимки и сравнение — в отдельном потоке, event loop не блокируется
+
+MemorySampler — периодический замер в /metrics:
+- RSS процесса (/proc/self/statm, иначе пиковый ru_maxrss) — дёшево,
+  каждые MEMORY_SAMPLE_INTERVAL секунд
+- число объектов по типам (самые многочисленные типы из gc) и живые
+  aiohttp.ClientSession (и сколько из них не закрыто) и TCPConnector: рост
+  этих чисел — верный признак утечки сессий. Обход кучи (gc.get_objects)
+  держит GIL всё время обхода, и event loop стоит, даже если обход идёт в
+  другом потоке, поэтому по расписанию он только по явной настройке
+  (MEMORY_OBJECTS_INTERVAL) и не чаще, а по запросу — /admin/memory?sample=1
+
+admin_only — декоратор aiohttp-хендлеров: доступ по заголовку
+Authorization: Bearer <ADMIN_TOKEN> (или X-Admin-Token). Пока ADMIN_TOKEN
+не задан, административные маршруты отвечают 404.
+
+Настройки (config.py): ADMIN_TOKEN, LOOP_LAG_THRESHOLD (0 — сторож выключен),
+LOOP_LAG_INTERVAL, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL,
+TRACEMALLOC_FRAMES, MEMORY_SAMPLE_INTERVAL (0 — замеры выключены),
+MEMORY_OBJECTS_INTERVAL (0 — обход кучи только по запросу), MEMORY_TOP_TYPES.
+"""
+import asyncio
+import functools
+import gc
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter, deque
+from types import CodeType, FrameType
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from config import (
+    ADMIN_TOKEN,
+    LOOP_LAG_THRESHOLD,
+    LOOP_LAG_INTERVAL,
+    PROFILE_MAX_SECONDS,
+    PROFILE_SAMPLE_INTERVAL,
+    TRACEMALLOC_FRAMES,
+    MEMORY_SAMPLE_INTERVAL,
+    MEMORY_TOP_TYPES,
+    MEMORY_OBJECTS_INTERVAL,
+)
+from utils.metrics import LOOP_LAG, LOOP_BLOCKED, PROCESS_RSS, GC_OBJECTS, AIOHTTP_OBJECTS
+
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+def admin_only(handler: Handler) -> Handler:
+    """Пускает только запросы с ADMIN_TOKEN; без настроенного токена — 404."""
+
+    @functools.wraps(handler)
+    async def wrapper(request: web.Request) -> web.StreamResponse:
+        if not ADMIN_TOKEN:
+            raise web.HTTPNotFound()
+        supplied = request.headers.get("X-Admin-Token", "")
+        authorization = request.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            supplied = authorization[len("Bearer "):]
+        # Сравнение за постоянное время: токен не подбирается по времени ответа
+        if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+            raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+        return await handler(request)
+
+    return wrapper
+
+
+class ProfilerBusyError(Exception):
+    """Профилирование уже запущено."""
+
+
+class SamplingProfiler:
+    """Выборочный профилировщик стеков всех потоков."""
+
+    def __init__(
+        self,
+        interval: float = PROFILE_SAMPLE_INTERVAL,
+        max_seconds: float = PROFILE_MAX_SECONDS,
+    ) -> None:
+        self.interval = max(interval, 0.001)
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        # Подписи функций по code object: строка собирается один раз
+        self._labels: Dict[CodeType, str] = {}
+        # 📊 Счётчики
+        self.runs = 0
+        self.samples = 0
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = (
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            )
+        return label
+
+    def _stack(self, frame: Optional[FrameType], thread_name: str) -> str:
+        labels: List[str] = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name)
+        labels.reverse()
+        return ";".join(labels)
+
+    def profile(self, seconds: float, thread_ident: Optional[int] = None) -> "Counter[str]":
+        """
+        Снимает стеки seconds секунд (синхронно — вызывать через asyncio.to_thread).
+        thread_ident — профилировать только этот поток (например, поток event loop).
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("profiling is already running")
+        try:
+            seconds = min(max(seconds, self.interval), self.max_seconds)
+            own = threading.get_ident()
+            stacks: "Counter[str]" = Counter()
+            until = time.monotonic() + seconds
+            while time.monotonic() < until:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own or (thread_ident is not None and ident != thread_ident):
+                        continue
+                    stacks[self._stack(frame, names.get(ident, f"thread-{ident}"))] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+            self.runs += 1
+            return stacks
+        finally:
+            # Подписи нужны только на время одного профилирования: code objects
+            # перезагруженного или динамического кода не копятся между запусками
+            self._labels.clear()
+            self._lock.release()
+
+    @staticmethod
+    def collapse(stacks: "Counter[str]") -> str:
+        """Формат collapsed stacks: «кадр;кадр;... количество» на строку."""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._lock.locked(),
+            "runs": self.runs,
+            "samples": self.samples,
+        }
+
+
+class LoopLagMonitor:
+    """Пульс event loop и поток-сторож, который ловит стек блокирующего вызова."""
+
+    def __init__(
+        self,
+        threshold: float = LOOP_LAG_THRESHOLD,
+        interval: float = LOOP_LAG_INTERVAL,
+        keep_events: int = 20,
+    ) -> None:
+        self.threshold = threshold
+        self.interval = max(interval, 0.01)
+        self._beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread: Optional[int] = None
+        # Пульс, о котором уже сообщили (одна блокировка — одна запись в лог)
+        self._reported_beat: Optional[float] = None
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=keep_events)
+        # 📊 Счётчики
+        self.max_lag = 0.0
+        self.blocked = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._pulse(), name="loop-lag-pulse")
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, self.interval * 2)
+            self._thread = None
+
+    async def _pulse(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(now - expected, 0.0)
+            LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self) -> None:
+        # Выполняется в отдельном потоке: loop может быть занят
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled <= self.threshold or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+            self.blocked += 1
+            LOOP_BLOCKED.inc()
+            self.events.append({"at": time.time(), "stalled": round(stalled, 3), "stack": stack})
+            logger.warning("[LoopLag] event loop заблокирован дольше %.3f с, стек:\n%s", stalled, stack)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "max_lag": round(self.max_lag, 4),
+            "blocked": self.blocked,
+        }
+
+
+# Служебные кадры, которые не интересны в отчёте tracemalloc
+_TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryDiagnostics:
+    """Снимки tracemalloc и сравнение с базовым снимком."""
+
+    def __init__(self, frames: int = TRACEMALLOC_FRAMES) -> None:
+        self.frames = max(frames, 1)
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Включает трассировку (если выключена) и запоминает базовый снимок."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            self._baseline = self._take()
+            self._baseline_at = time.time()
+            return self.stats()
+
+    def diff(self, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """
+        Места выделения памяти, выросшие сильнее всего с базового снимка.
+        group_by: lineno | filename | traceback.
+        """
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                raise LookupError("no baseline snapshot, take one first")
+            current = self._take()
+            changes = current.compare_to(self._baseline, group_by)
+        top = [
+            {
+                "site": stat.traceback.format(limit=self.frames),
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in changes[:max(limit, 1)]
+        ]
+        return {
+            **self.stats(),
+            "total_size_diff": sum(stat.size_diff for stat in changes),
+            "top": top,
+        }
+
+    def stop(self) -> None:
+        with self._lock:
+            self._baseline = None
+            self._baseline_at = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "baseline_at": self._baseline_at,
+            "traced_current": current,
+            "traced_peak": peak,
+        }
+
+
+def _read_rss() -> int:
+    """Текущий RSS процесса в байтах."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Не Linux: доступен только пиковый RSS (на macOS — в байтах, на Linux — в КБ)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemorySampler:
+    """Периодический замер RSS, числа объектов по типам и живых сессий aiohttp."""
+
+    def __init__(
+        self,
+        interval: float = MEMORY_SAMPLE_INTERVAL,
+        top_types: int = MEMORY_TOP_TYPES,
+        objects_interval: float = MEMORY_OBJECTS_INTERVAL,
+    ) -> None:
+        self.interval = interval
+        # 0 — обход кучи только по запросу (sample(objects=True))
+        self.objects_interval = objects_interval
+        self._objects_at: Optional[float] = None
+        self.top_types = max(top_types, 1)
+        self._task: Optional[asyncio.Task] = None
+        self.last: Dict[str, Any] = {}
+        # Типы, уже выведенные в метрики: выпавшие из топа обновляются тоже
+        self._known_types: Dict[str, Any] = {}
+        self._rss = PROCESS_RSS
+        self._sessions_live = AIOHTTP_OBJECTS.labels("ClientSession", "live")
+        self._sessions_open = AIOHTTP_OBJECTS.labels("ClientSession", "open")
+        self._connectors_live = AIOHTTP_OBJECTS.labels("TCPConnector", "live")
+        # 📊 Счётчики
+        self.samples = 0
+        self.object_samples = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop(), name="memory-sampler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.sample(objects=self._objects_due())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[Memory] ошибка замера памяти: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def _objects_due(self) -> bool:
+        if self.objects_interval <= 0:
+            return False
+        return self._objects_at is None or time.monotonic() - self._objects_at >= self.objects_interval
+
+    @staticmethod
+    def _count_objects() -> Tuple[Counter, int, int, int]:
+        # Поток не спасает loop: обход держит GIL от начала до конца (см. MEMORY_OBJECTS_INTERVAL)
+        by_type: Counter = Counter()
+        sessions = open_sessions = connectors = 0
+        for obj in gc.get_objects():
+            cls = type(obj)
+            by_type[cls.__qualname__] += 1
+            if isinstance(obj, aiohttp.ClientSession):
+                sessions += 1
+                if not obj.closed:
+                    open_sessions += 1
+            elif isinstance(obj, aiohttp.TCPConnector):
+                connectors += 1
+        return by_type, sessions, open_sessions, connectors
+
+    async def sample(self, objects: bool = True) -> Dict[str, Any]:
+        """
+        Один замер; значения пишутся в метрики и в self.last.
+        objects=False — только RSS, объекты остаются из прошлого обхода кучи.
+        """
+        rss = _read_rss()
+        self._rss.set(rss)
+        self.samples += 1
+        self.last = {**self.last, "at": time.time(), "rss": rss}
+        if not objects:
+            return self.last
+        by_type, sessions, open_sessions, connectors = await asyncio.to_thread(self._count_objects)
+        self._objects_at = time.monotonic()
+        self._sessions_live.set(sessions)
+        self._sessions_open.set(open_sessions)
+        self._connectors_live.set(connectors)
+        top = by_type.most_common(self.top_types)
+        for name, _ in top:
+            if name not in self._known_types:
+                self._known_types[name] = GC_OBJECTS.labels(name)
+        for name, gauge in self._known_types.items():
+            gauge.set(by_type.get(name, 0))
+        self.object_samples += 1
+        self.last.update({
+            "objects_at": time.time(),
+            "client_sessions": sessions,
+            "client_sessions_open": open_sessions,
+            "tcp_connectors": connectors,
+            "top_types": dict(top),
+        })
+        return self.last
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "samples": self.samples,
+            "object_samples": self.object_samples,
+            "objects_interval": self.objects_interval,
+            "rss": self.last.get("rss"),
+            "client_sessions_open": self.last.get("client_sessions_open"),
+            "tcp_connectors": self.last.get("tcp_connectors"),
+        }
@@ -0,0 +1,158 @@
+"""
+🔁 ИДЕМПОТЕНТНОСТЬ HTTP-ЗАПРОСОВ
+
+Двойное нажатие в Mini App или сетевой повтор не должны создавать вторую
+встречу и отправлять второе видео. Клиент передаёт ключ идемпотентности
+(заголовок Idempotency-Key или поле idempotency_key), и в течение окна
+повторный запрос с тем же ключом получает сохранённый ответ.
+
+Принцип работы:
+- успешные ответы хранятся в ограниченном TTL/LRU-кэше (utils/cache.py)
+- если первый запрос с ключом ещё выполняется, повторные ждут его
+  результата (utils/singleflight.py), а не запускают работу заново
+- ответы с ошибкой не сохраняются: после неудачи запрос можно повторить
+- с общим состоянием (STATE_BACKEND=redis, utils/state.py) ответ ещё и
+  записывается туда, а выполнение «занимается» блокировкой SET NX с TTL:
+  повтор, попавший на другую реплику, ждёт и получает тот же ответ.
+  Если хранилище недоступно, работает только локальная защита
+
+Пример:
+    status, body = await store.run(key, create_and_notify)
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from config import IDEMPOTENCY_TTL, IDEMPOTENCY_CACHE_SIZE, API_DEADLINE
+from utils.cache import TTLCache
+from utils.singleflight import SingleFlight
+from utils.state import StateBackend, StateError
+
+
+logger = logging.getLogger(__name__)
+
+# (HTTP-статус, JSON-тело ответа)
+StoredResponse = Tuple[int, Dict[str, Any]]
+
+# Как часто реплика, ждущая чужой запрос, проверяет общее состояние
+_POLL_INTERVAL = 0.1
+
+
+class IdempotencyStore:
+    """Хранилище ответов по ключам идемпотентности."""
+
+    def __init__(
+        self,
+        maxsize: int = IDEMPOTENCY_CACHE_SIZE,
+        ttl: float = IDEMPOTENCY_TTL,
+        state: Optional[StateBackend] = None,
+        wait_timeout: float = API_DEADLINE,
+    ) -> None:
+        self.ttl = ttl
+        self._responses: TTLCache[StoredResponse] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._flights = SingleFlight()
+        self.state = state if state is not None and state.shared else None
+        # Сколько ждать ответа запроса, выполняющегося на другой реплике
+        self.wait_timeout = wait_timeout
+        self._origin = uuid.uuid4().hex
+        # 📊 Счётчики
+        self.replayed = 0
+        self.replayed_shared = 0
+        self.state_errors = 0
+
+    async def run(self, key: Hashable, handler: Callable[[], Awaitable[StoredResponse]]) -> StoredResponse:
+        """
+        Выполняет handler() не больше одного раза на ключ в пределах окна
+        и возвращает его ответ всем запросам с этим ключом.
+        """
+        stored = self._responses.get(key)
+        if stored is not None:
+            self.replayed += 1
+            return stored
+
+        async def _run() -> StoredResponse:
+            response = await handler()
+            if 200 <= response[0] < 300:
+                self._responses.set(key, response)
+            return response
+
+        if self.state is None:
+            return await self._flights.do(key, _run)
+        return await self._flights.do(key, lambda: self._run_shared(key, _run))
+
+    async def has_response(self, key: Hashable) -> bool:
+        """Повторит ли run() для ключа сохранённый или выполняющийся ответ."""
+        if self._responses.get(key) is not None or self._flights.in_flight(key):
+            return True
+        if self.state is None:
+            return False
+        try:
+            return await self.state.get(self._state_key(key)) is not None
+        except StateError:
+            self.state_errors += 1
+            return False
+
+    def _state_key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return "idempotency:" + json.dumps([str(p) for p in parts], ensure_ascii=False)
+
+    async def _stored(self, state_key: str, key: Hashable) -> Optional[StoredResponse]:
+        raw = await self.state.get(state_key)
+        if raw is None:
+            return None
+        status, body = json.loads(raw)
+        response = (status, body)
+        self._responses.set(key, response)
+        self.replayed_shared += 1
+        return response
+
+    async def _run_shared(self, key: Hashable, run: Callable[[], Awaitable[StoredResponse]]) -> StoredResponse:
+        state_key = self._state_key(key)
+        lock_key = f"{state_key}:lock"
+        try:
+            stored = await self._stored(state_key, key)
+            if stored is not None:
+                return stored
+            deadline = time.monotonic() + self.wait_timeout
+            # Блокировка переживает зависшую реплику не дольше wait_timeout
+            while not await self.state.set(lock_key, self._origin, ttl=self.wait_timeout, only_if_absent=True):
+                # Запрос выполняется на другой реплике — ждём её ответ
+                await asyncio.sleep(_POLL_INTERVAL)
+                stored = await self._stored(state_key, key)
+                if stored is not None:
+                    return stored
+                if time.monotonic() >= deadline:
+                    return 409, {"ok": False, "error": "request_in_progress"}
+        except StateError as e:
+            self.state_errors += 1
+            logger.warning("[Idempotency] общее состояние недоступно, только локальная защита: %s", e)
+            return await run()
+
+        try:
+            response = await run()
+            if 200 <= response[0] < 300:
+                try:
+                    await self.state.set(state_key, json.dumps(response, ensure_ascii=False), ttl=self.ttl)
+                except StateError as e:
+                    # Ответ уже получен, не сохранился только общий кэш
+                    self.state_errors += 1
+                    logger.warning("[Idempotency] не удалось сохранить ответ: %s", e)
+            return response
+        finally:
+            try:
+                await self.state.compare_and_set(lock_key, self._origin, None)
+            except StateError:
+                self.state_errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._responses.stats(),
+            "replayed": self.replayed,
+            "replayed_shared": self.replayed_shared,
+            "joined_in_flight": self._flights.collapsed,
+            "shared": self.state is not None,
+            "state_errors": self.state_errors,
+        }
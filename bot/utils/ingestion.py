@@ -0,0 +1,206 @@
+"""
+📥 ОЧЕРЕДЬ ВХОДЯЩИХ WEBHOOK-ОБНОВЛЕНИЙ
+
+Обработка /call может занимать десятки секунд (создание встречи, загрузка
+видео). Telegram не должен ждать этого: QueuedRequestHandler сразу отвечает
+на webhook, а обновление кладёт во внутреннюю очередь.
+
+Принцип работы:
+- у каждого чата своя очередь обновлений (deque), а чаты, в которых есть
+  работа, стоят в общей очереди готовых чатов
+- общий пул воркеров берёт чат из очереди готовых и обрабатывает одно его
+  обновление; пока оно выполняется, чата в очереди нет, поэтому порядок
+  внутри чата сохраняется. Если у чата есть ещё обновления, он встаёт в
+  конец очереди готовых — медленный /call в одном чате занимает один
+  воркер и не задерживает остальные чаты
+- ёмкость ограничена и в сумме, и на один чат; если места нет, webhook
+  получает 503, и Telegram повторит доставку позже (backpressure)
+- при остановке воркеры дорабатывают очередь (не дольше drain_timeout)
+- stats() отдаёт глубину очередей и задержку (lag) от приёма до обработки
+
+Режим включается явно (WEBHOOK_INGEST_MODE=queue); по умолчанию обновления
+обрабатываются фоновыми задачами aiogram, как раньше.
+
+Настройки (config.py):
+- WEBHOOK_WORKERS: количество воркеров (одновременно обрабатываемых чатов)
+- WEBHOOK_QUEUE_SIZE: общая ёмкость очереди; одному чату — не больше
+  WEBHOOK_QUEUE_SIZE / WEBHOOK_WORKERS обновлений
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+from config import WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+# (время приёма по monotonic, обновление)
+_QueuedUpdate = Tuple[float, Update]
+
+
+def update_chat_id(update: Update) -> Optional[int]:
+    """Чат (или пользователь), к которому относится обновление."""
+    try:
+        event = update.event
+    except Exception:
+        return None
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        # callback_query: чат лежит в исходном сообщении
+        message = getattr(event, "message", None)
+        chat = getattr(message, "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else None
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Webhook-обработчик с ограниченной очередью, порядком по чатам и общим пулом воркеров."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int = WEBHOOK_WORKERS,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+        drain_timeout: float = 10.0,
+        **data: Any,
+    ) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=False, **data)
+        self.workers = max(workers, 1)
+        self.drain_timeout = drain_timeout
+        self.queue_size = max(queue_size, 1)
+        self.chat_queue_size = max(queue_size // self.workers, 1)
+        # Очереди обновлений по чатам; чат есть в словаре, пока у него есть работа
+        self._chats: Dict[Hashable, Deque[_QueuedUpdate]] = {}
+        # Чаты, готовые к обработке (каждый не больше одного раза)
+        self._ready: "asyncio.Queue[Hashable]" = asyncio.Queue()
+        self._depth = 0
+        self._tasks: List[asyncio.Task] = []
+        # 📊 Счётчики
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.errors = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        app.on_startup.append(self._handle_start)
+        super().register(app, path=path, **kwargs)
+
+    async def _handle_start(self, *a: Any, **kw: Any) -> None:
+        self.start()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(), name=f"webhook-worker-{i}")
+                for i in range(self.workers)
+            ]
+
+    async def close(self) -> None:
+        """Дорабатывает очередь, останавливает воркеры и закрывает сессию бота."""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._ready.join(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("[Webhook] не успели обработать %s обновлений", self.depth())
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        await super().close()
+
+    def _enqueue(self, update: Update) -> bool:
+        """Ставит обновление в очередь его чата. False — места нет."""
+        chat_id = update_chat_id(update)
+        # Обновления без чата независимы — у каждого своя очередь
+        key: Hashable = chat_id if chat_id is not None else ("update", update.update_id)
+        pending = self._chats.get(key)
+        if self._depth >= self.queue_size or (pending is not None and len(pending) >= self.chat_queue_size):
+            return False
+        self._depth += 1
+        if pending is None:
+            self._chats[key] = deque([(time.monotonic(), update)])
+            self._ready.put_nowait(key)
+        else:
+            # Чат уже в очереди готовых или обрабатывается — воркер дойдёт до обновления сам
+            pending.append((time.monotonic(), update))
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        try:
+            update = Update.model_validate(
+                # Байты тела сразу в кодек сессии (orjson разбирает их без декодирования в str)
+                bot.session.json_loads(await request.read()),
+                context={"bot": bot},
+            )
+        except Exception as e:
+            logger.warning("[Webhook] некорректное обновление: %s", e)
+            return web.Response(body="Bad Request", status=400)
+
+        if not self._enqueue(update):
+            # Telegram повторит доставку этого обновления позже
+            self.rejected += 1
+            return web.Response(body="Queue is full", status=503)
+        self.accepted += 1
+        return web.Response(body=b"{}", content_type="application/json")
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            pending = self._chats[key]
+            received_at, update = pending.popleft()
+            self._depth -= 1
+            lag = time.monotonic() - received_at
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+            try:
+                result = await self.dispatcher.feed_update(self.bot, update, **self.data)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.exception("[Webhook] ошибка обработки обновления %s: %s", update.update_id, e)
+            finally:
+                if pending:
+                    # Следующее обновление чата — в конец очереди, после других чатов
+                    self._ready.put_nowait(key)
+                else:
+                    del self._chats[key]
+                self._ready.task_done()
+
+    def depth(self) -> int:
+        return self._depth
+
+    def stats(self) -> dict:
+        started = self.processed + self.errors
+        return {
+            "depth": self.depth(),
+            "chats": len(self._chats),
+            "max_chat_depth": max((len(pending) for pending in self._chats.values()), default=0),
+            "workers": len(self._tasks),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "errors": self.errors,
+            "lag_avg": self.lag_total / started if started else None,
+            "lag_max": self.lag_max,
+        }
@@ -0,0 +1,182 @@
+"""
+🧹 ФОНОВАЯ ОЧИСТКА УСТАРЕВШИХ ВСТРЕЧ TELEMOST
+
+Каждый /call оставляет в организации конференцию, которую никто не удаляет.
+MeetingGarbageCollector периодически проходит по реестру встреч
+(utils/meeting_registry.py) и удаляет в Telemost встречи старше max_age.
+
+Принцип работы:
+- обход идёт порциями по batch_size записей в порядке id; после каждой
+  порции позиция (checkpoint) сохраняется в реестре, поэтому после
+  перезапуска обход продолжается с того же места
+- удаления выполняются не более чем по `concurrency` одновременно и не
+  чаще `rate` в секунду (token bucket из utils/outbound.py)
+- у очистки своя маленькая HTTP-сессия (отдельный TelemostClient), поэтому
+  она не занимает соединения из пула, которым пользуется /call
+- и свой автомат защиты (роль background): пачка неудачных или 429
+  удалений открывает только его, а /call продолжает создавать встречи
+- пока основной клиент создаёт встречи (interactive.in_flight > 0),
+  очистка ждёт и не расходует квоту API
+- неудачные удаления не помечаются, и встреча попадёт в следующий проход
+- удаляются только встречи организации interactive-клиента: токенов других
+  организаций (utils/tenants.py) у очистки нет
+- stats() отдаёт прогресс: просмотрено, удалено, ошибки, позиция обхода
+
+Настройки (config.py):
+- MEETING_GC_MAX_AGE: возраст встречи для удаления в секундах (0 — выключено)
+- MEETING_GC_INTERVAL, MEETING_GC_BATCH_SIZE, MEETING_GC_CONCURRENCY, MEETING_GC_RATE
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from config import (
+    MEETING_GC_MAX_AGE,
+    MEETING_GC_INTERVAL,
+    MEETING_GC_BATCH_SIZE,
+    MEETING_GC_CONCURRENCY,
+    MEETING_GC_RATE,
+)
+from utils.meeting_registry import MeetingRegistry
+from utils.outbound import TokenBucket
+from utils.resilience import CircuitOpenError
+from utils.telemost import ROLE_BACKGROUND, TelemostClient
+
+
+logger = logging.getLogger(__name__)
+
+# Ключ позиции обхода в таблице gc_state реестра
+CHECKPOINT_KEY = "meeting_gc_cursor"
+# Как часто проверять, закончились ли интерактивные запросы
+_YIELD_POLL_INTERVAL = 0.2
+
+
+class MeetingGarbageCollector:
+    """Фоновая задача удаления старых встреч из реестра."""
+
+    def __init__(
+        self,
+        registry: MeetingRegistry,
+        interactive: TelemostClient,
+        max_age: float = MEETING_GC_MAX_AGE,
+        interval: float = MEETING_GC_INTERVAL,
+        batch_size: int = MEETING_GC_BATCH_SIZE,
+        concurrency: int = MEETING_GC_CONCURRENCY,
+        rate: float = MEETING_GC_RATE,
+    ) -> None:
+        self.registry = registry
+        self.interactive = interactive
+        self.max_age = max_age
+        self.interval = max(interval, 1.0)
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = max(concurrency, 1)
+        # Отдельная сессия с пулом на `concurrency` соединений и отдельный автомат защиты
+        self.client = TelemostClient(
+            pool_limit=self.concurrency,
+            pool_limit_per_host=self.concurrency,
+            tenant_id=interactive.tenant_id,
+            role=ROLE_BACKGROUND,
+        )
+        self._bucket = TokenBucket(rate=max(rate, 0.01), capacity=1.0, now=time.monotonic())
+        self._bucket_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.cursor = 0
+        # 📊 Счётчики
+        self.passes = 0
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+        self.yields = 0
+        self.last_pass_at: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age > 0 and self.registry.enabled
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop(), name="meeting-gc")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.client.close()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[MeetingGC] ошибка прохода очистки: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def _wait_turn(self) -> None:
+        """Ждёт, пока /call не закончит запросы, и токен лимита скорости."""
+        while self.interactive.in_flight > 0:
+            self.yields += 1
+            await asyncio.sleep(_YIELD_POLL_INTERVAL)
+        async with self._bucket_lock:
+            delay = self._bucket.delay(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._bucket.take(time.monotonic())
+
+    async def _delete(self, semaphore: asyncio.Semaphore, meeting: Dict[str, Any]) -> Optional[int]:
+        async with semaphore:
+            await self._wait_turn()
+            try:
+                deleted = await self.client.delete_meeting(meeting["meeting_id"])
+            except CircuitOpenError:
+                # Автомат очистки открыт: встреча останется до следующего прохода
+                deleted = False
+            if deleted:
+                self.deleted += 1
+                return meeting["id"]
+            self.failed += 1
+            return None
+
+    async def run_once(self) -> None:
+        """Один полный проход по реестру, начиная с сохранённой позиции."""
+        saved = await self.registry.get_state(CHECKPOINT_KEY)
+        self.cursor = int(saved) if saved else 0
+        created_before = time.time() - self.max_age
+        semaphore = asyncio.Semaphore(self.concurrency)
+        while True:
+            batch = await self.registry.stale_batch(
+                created_before, self.cursor, self.batch_size, tenant_id=self.interactive.tenant_id
+            )
+            if not batch:
+                break
+            self.scanned += len(batch)
+            results: List[Optional[int]] = await asyncio.gather(
+                *(self._delete(semaphore, meeting) for meeting in batch)
+            )
+            await self.registry.mark_deleted([row_id for row_id in results if row_id is not None])
+            self.cursor = batch[-1]["id"]
+            await self.registry.set_state(CHECKPOINT_KEY, str(self.cursor))
+        # Проход завершён: следующий начнётся сначала и повторит неудачные удаления
+        self.cursor = 0
+        await self.registry.set_state(CHECKPOINT_KEY, "0")
+        self.passes += 1
+        self.last_pass_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_age": self.max_age,
+            "cursor": self.cursor,
+            "passes": self.passes,
+            "scanned": self.scanned,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "yields": self.yields,
+            "last_pass_at": self.last_pass_at,
+        }
@@ -0,0 +1,228 @@
+"""
+🏊 ПУЛ ЗАРАНЕЕ СОЗДАННЫХ ВСТРЕЧ TELEMOST
+
+Создание встречи через Telemost API может занимать до 20 секунд.
+Пул держит наготове несколько встреч, созданных с настройками по умолчанию
+(см. TelemostClient.create_conference), и выдаёт их мгновенно.
+
+Принцип работы:
+- acquire() берёт готовую ссылку из начала очереди за O(1)
+- если пул пуст — встреча создаётся синхронно, как раньше (промах)
+- когда в пуле остаётся не больше low_watermark ссылок, фоновая задача
+  досоздаёт их до high_watermark с ограниченной параллельностью
+- ссылки старше max_age выбрасываются, чтобы не раздавать «протухшие» встречи;
+  сами встречи фоновая задача удаляет в Telemost, а если удалить не
+  удалось — записывает в реестр (utils/meeting_registry.py) без
+  пользователя, и их удалит очистка старых встреч (utils/meeting_gc.py)
+- при остановке невыданные встречи тоже записываются в реестр
+
+Все встречи пула создаются с одинаковым заголовком (title), поэтому
+заголовок, переданный в acquire(), используется только при промахе.
+
+Настройки (config.py):
+- TELEMOST_MEETING_POOL_SIZE: верхняя граница пула, 0 — пул выключен
+- TELEMOST_MEETING_POOL_LOW: нижняя граница, при которой начинается пополнение
+- TELEMOST_MEETING_POOL_MAX_AGE: максимальный возраст ссылки в секундах
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import (
+    TELEMOST_MEETING_POOL_SIZE,
+    TELEMOST_MEETING_POOL_LOW,
+    TELEMOST_MEETING_POOL_MAX_AGE,
+    TELEMOST_MEETING_POOL_CONCURRENCY,
+)
+from utils.meeting_registry import MeetingRegistry
+from utils.telemost import Meeting, TelemostClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class MeetingPool:
+    """Фоновый пул готовых ссылок на встречи Telemost."""
+
+    def __init__(
+        self,
+        client: TelemostClient,
+        size: int = TELEMOST_MEETING_POOL_SIZE,
+        low_watermark: int = TELEMOST_MEETING_POOL_LOW,
+        max_age: float = TELEMOST_MEETING_POOL_MAX_AGE,
+        concurrency: int = TELEMOST_MEETING_POOL_CONCURRENCY,
+        title: str = "Telemost Meeting",
+        registry: Optional[MeetingRegistry] = None,
+    ) -> None:
+        self.client = client
+        self.registry = registry
+        self.high_watermark = max(size, 0)
+        self.low_watermark = min(max(low_watermark, 0), self.high_watermark)
+        self.max_age = max_age
+        self.concurrency = max(concurrency, 1)
+        self.title = title
+        # (время создания по monotonic, встреча)
+        self._meetings: Deque[Tuple[float, Meeting]] = deque()
+        # Устаревшие встречи, которые ещё нужно удалить в Telemost
+        self._retired: List[Meeting] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # 📊 Счётчики
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.expired = 0
+        self.expired_deleted = 0
+        self.handed_to_gc = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.high_watermark > 0
+
+    def start(self) -> None:
+        """Запускает фоновое наполнение пула (если пул включён)."""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        # Невыданные встречи остаются в Telemost — пусть их удалит очистка
+        leftover = self._retired + [meeting for _, meeting in self._meetings]
+        self._retired = []
+        self._meetings.clear()
+        for meeting in leftover:
+            await self._hand_to_gc(meeting)
+
+    def _drop_expired(self) -> None:
+        deadline = time.monotonic() - self.max_age
+        # Очередь упорядочена по времени создания — старые ссылки в начале
+        while self._meetings and self._meetings[0][0] < deadline:
+            self._retired.append(self._meetings.popleft()[1])
+            self.expired += 1
+        if self._retired:
+            self._wakeup.set()
+
+    async def _hand_to_gc(self, meeting: Meeting) -> None:
+        if self.registry is not None and meeting.id:
+            if await self.registry.record(meeting, None, None, tenant_id=self.client.tenant_id) is not None:
+                self.handed_to_gc += 1
+
+    async def _delete_one(self, meeting: Meeting) -> None:
+        try:
+            deleted = bool(meeting.id) and await self.client.delete_meeting(meeting.id)
+        except Exception as e:
+            logger.warning("[MeetingPool] ошибка удаления устаревшей встречи: %s", e)
+            deleted = False
+        if deleted:
+            self.expired_deleted += 1
+        else:
+            await self._hand_to_gc(meeting)
+
+    async def _delete_expired(self) -> None:
+        """Удаляет устаревшие встречи пулами по concurrency штук."""
+        while self._retired:
+            batch, self._retired = self._retired[:self.concurrency], self._retired[self.concurrency:]
+            await asyncio.gather(*(self._delete_one(meeting) for meeting in batch))
+
+    def take(self) -> Optional[Meeting]:
+        """Забирает готовую встречу из пула за O(1) или возвращает None."""
+        self._drop_expired()
+        meeting = self._meetings.popleft()[1] if self._meetings else None
+        if len(self._meetings) <= self.low_watermark:
+            self._wakeup.set()
+        return meeting
+
+    async def acquire_meeting(self, title: str = "Telemost Meeting") -> Optional[Meeting]:
+        """
+        Возвращает встречу: из пула, а при промахе — созданную
+        напрямую через TelemostClient.
+        """
+        if self.enabled:
+            meeting = self.take()
+            if meeting:
+                self.hits += 1
+                return meeting
+            self.misses += 1
+        return await self.client.create_meeting(title=title)
+
+    async def acquire(self, title: str = "Telemost Meeting") -> Optional[str]:
+        """Возвращает только ссылку на встречу (см. acquire_meeting)."""
+        meeting = await self.acquire_meeting(title=title)
+        return meeting.join_url if meeting else None
+
+    async def _create_one(self) -> bool:
+        try:
+            meeting = await self.client.create_meeting(title=self.title)
+        except Exception as e:
+            logger.warning("[MeetingPool] ошибка создания встречи: %s", e)
+            meeting = None
+        if not meeting:
+            self.failures += 1
+            return False
+        self._meetings.append((time.monotonic(), meeting))
+        self.created += 1
+        return True
+
+    async def _refill(self) -> bool:
+        """Досоздаёт встречи до high_watermark. Возвращает False при ошибках."""
+        ok = True
+        while ok and len(self._meetings) < self.high_watermark:
+            batch = min(self.concurrency, self.high_watermark - len(self._meetings))
+            results = await asyncio.gather(*(self._create_one() for _ in range(batch)))
+            ok = all(results)
+        return ok
+
+    async def _refill_loop(self) -> None:
+        backoff = 5.0
+        self._wakeup.set()
+        while True:
+            try:
+                timeout: Optional[float] = None
+                if self._meetings:
+                    # Проснёмся, когда самая старая ссылка устареет
+                    timeout = max(self._meetings[0][0] + self.max_age - time.monotonic(), 0.0)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                self._drop_expired()
+                await self._delete_expired()
+                if len(self._meetings) > self.low_watermark:
+                    continue
+                if await self._refill():
+                    backoff = 5.0
+                else:
+                    # Telemost недоступен или не настроен — не долбим API
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 300.0)
+                    self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[MeetingPool] ошибка фонового пополнения: %s", e)
+                await asyncio.sleep(backoff)
+                self._wakeup.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._meetings),
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "expired": self.expired,
+            "expired_deleted": self.expired_deleted,
+            "handed_to_gc": self.handed_to_gc,
+            "failures": self.failures,
+        }
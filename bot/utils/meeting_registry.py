@@ -0,0 +1,248 @@
+"""
+🗂️ РЕЕСТР СОЗДАННЫХ ВСТРЕЧ (SQLite)
+
+Telemost возвращает при создании встречи её id и итоговые настройки, но
+раньше из ответа сохранялась только ссылка. Реестр записывает каждую
+выданную встречу: кто и в каком чате её получил, когда она создана и когда
+использовалась последний раз.
+
+Зачем:
+- режим повторного использования: повторный /call пользователя в том же
+  чате в пределах MEETING_REUSE_TTL отвечает ссылкой из реестра без
+  запроса к Telemost
+- список последних комнат пользователя для Mini App (/api/telemost/rooms)
+- очистка устаревших встреч (utils/meeting_gc.py): удалённые в Telemost
+  встречи помечаются deleted_at, позиция обхода хранится в gc_state
+
+Принцип работы:
+- одна SQLite-база в режиме WAL, индексы по (user_id, created_at),
+  (chat_id, created_at) и created_at — все выборки идут по индексу
+- запросы выполняются в отдельном потоке (asyncio.to_thread), event loop
+  не блокируется; одно соединение защищено threading.Lock
+- время хранится как Unix time, поэтому реестр переживает перезапуск бота
+
+Настройки (config.py):
+- MEETING_REGISTRY_PATH: путь к базе (пусто — реестр выключен)
+- MEETING_REUSE_TTL: окно повторного использования в секундах (0 — выключено)
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import MEETING_REGISTRY_PATH
+from utils.telemost import DEFAULT_TENANT, Meeting
+
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS meetings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        meeting_id TEXT,
+        join_url TEXT NOT NULL,
+        title TEXT NOT NULL DEFAULT '',
+        settings TEXT NOT NULL DEFAULT '{}',
+        user_id INTEGER,
+        chat_id INTEGER,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        deleted_at REAL,
+        tenant_id TEXT NOT NULL DEFAULT 'default'
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS gc_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_meetings_user_created ON meetings (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_meetings_chat_created ON meetings (chat_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_meetings_created ON meetings (created_at)",
+)
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    data = dict(row)
+    try:
+        data["settings"] = json.loads(data.get("settings") or "{}")
+    except ValueError:
+        data["settings"] = {}
+    return data
+
+
+class MeetingRegistry:
+    """Хранилище выданных встреч с выборками по пользователю и чату."""
+
+    def __init__(self, path: str = MEETING_REGISTRY_PATH) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # 📊 Счётчики
+        self.recorded = 0
+        self.reused = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(meetings)")}
+            if "deleted_at" not in columns:
+                # База создана до появления очистки встреч
+                conn.execute("ALTER TABLE meetings ADD COLUMN deleted_at REAL")
+            if "tenant_id" not in columns:
+                # База создана до появления нескольких организаций
+                conn.execute("ALTER TABLE meetings ADD COLUMN tenant_id TEXT NOT NULL DEFAULT 'default'")
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> Tuple[List[sqlite3.Row], Optional[int]]:
+        with self._lock:
+            cursor = self._connect().execute(sql, params)
+            return cursor.fetchall(), cursor.lastrowid
+
+    async def _run(self, sql: str, params: tuple = ()) -> Tuple[List[sqlite3.Row], Optional[int]]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def record(
+        self,
+        meeting: Meeting,
+        user_id: Optional[int],
+        chat_id: Optional[int],
+        tenant_id: str = DEFAULT_TENANT,
+    ) -> Optional[int]:
+        """Сохраняет выданную встречу. Возвращает id записи или None при ошибке."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            _, row_id = await self._run(
+                "INSERT INTO meetings"
+                " (meeting_id, join_url, title, settings, user_id, chat_id, created_at, last_used_at, tenant_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    meeting.id,
+                    meeting.join_url,
+                    meeting.title,
+                    json.dumps(meeting.settings, ensure_ascii=False),
+                    user_id,
+                    chat_id,
+                    now,
+                    now,
+                    tenant_id,
+                ),
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning("[MeetingRegistry] не удалось сохранить встречу: %s", e)
+            return None
+        self.recorded += 1
+        return row_id
+
+    async def find_active(self, user_id: int, chat_id: Optional[int], max_age: float) -> Optional[Dict[str, Any]]:
+        """
+        Последняя встреча пользователя в чате, созданная не раньше max_age
+        секунд назад. Найденная встреча помечается использованной.
+        """
+        if not self.enabled or max_age <= 0:
+            return None
+        now = time.time()
+        try:
+            rows, _ = await self._run(
+                "SELECT * FROM meetings WHERE user_id = ? AND created_at >= ? AND chat_id IS ?"
+                " AND deleted_at IS NULL ORDER BY created_at DESC LIMIT 1",
+                (user_id, now - max_age, chat_id),
+            )
+            if not rows:
+                return None
+            meeting = _row_to_dict(rows[0])
+            await self._run("UPDATE meetings SET last_used_at = ? WHERE id = ?", (now, meeting["id"]))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("[MeetingRegistry] ошибка поиска активной встречи: %s", e)
+            return None
+        meeting["last_used_at"] = now
+        self.reused += 1
+        return meeting
+
+    async def recent_for_user(self, user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        """Последние встречи пользователя, от новых к старым."""
+        if not self.enabled:
+            return []
+        rows, _ = await self._run(
+            "SELECT * FROM meetings WHERE user_id = ? AND deleted_at IS NULL"
+            " ORDER BY created_at DESC LIMIT ?",
+            (user_id, max(limit, 1)),
+        )
+        return [_row_to_dict(row) for row in rows]
+
+    async def stale_batch(
+        self,
+        created_before: float,
+        after_id: int,
+        limit: int,
+        tenant_id: str = DEFAULT_TENANT,
+    ) -> List[Dict[str, Any]]:
+        """
+        Следующая порция неудалённых встреч организации, созданных раньше
+        created_before, с id больше after_id (по возрастанию id).
+        """
+        if not self.enabled:
+            return []
+        rows, _ = await self._run(
+            "SELECT id, meeting_id, created_at FROM meetings"
+            " WHERE id > ? AND created_at < ? AND deleted_at IS NULL AND meeting_id IS NOT NULL"
+            " AND tenant_id = ? ORDER BY id LIMIT ?",
+            (after_id, created_before, tenant_id, max(limit, 1)),
+        )
+        return [dict(row) for row in rows]
+
+    async def mark_deleted(self, ids: List[int]) -> None:
+        if not self.enabled or not ids:
+            return
+        placeholders = ",".join("?" * len(ids))
+        await self._run(
+            f"UPDATE meetings SET deleted_at = ? WHERE id IN ({placeholders})",
+            (time.time(), *ids),
+        )
+
+    async def get_state(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        rows, _ = await self._run("SELECT value FROM gc_state WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else None
+
+    async def set_state(self, key: str, value: str) -> None:
+        if not self.enabled:
+            return
+        await self._run(
+            "INSERT INTO gc_state (key, value) VALUES (?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "recorded": self.recorded,
+            "reused": self.reused,
+            "errors": self.errors,
+        }
@@ -0,0 +1,321 @@
+"""
+📈 МЕТРИКИ В ФОРМАТЕ PROMETHEUS
+
+Лёгкая замена prometheus_client без зависимостей: счётчики, gauge и
+гистограммы, которые отдаются на GET /metrics в текстовом формате 0.0.4.
+
+Принцип работы:
+- весь бот работает в одном event loop, поэтому обновление метрики —
+  обычное сложение без блокировок
+- labels(...) создаёт дочернюю метрику один раз и кэширует её; на горячих
+  путях дочерние метрики привязываются заранее (при импорте или при первом
+  обращении), и запрос не создаёт объектов меток
+- строка меток для вывода тоже готовится один раз при создании дочерней метрики
+- гистограмма хранит счётчики по корзинам (поиск корзины — bisect),
+  накопительные значения считаются только при выводе
+- http_metrics_middleware — латентность HTTP-запросов по маршрутам и число
+  запросов в работе
+- add_collector() подключает существующие stats() компонентов: при каждом
+  опросе числовые поля выводятся как gauge (вложенные словари разворачиваются)
+
+Пример:
+    TELEMOST_LATENCY.labels("POST", "201").observe(0.35)
+    CALL_REPLY_VIDEO = CALL_REPLIES.labels("video")   # привязка заранее
+    CALL_REPLY_VIDEO.inc()
+"""
+import math
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from aiohttp import web
+
+
+# Префикс всех метрик бота
+NAMESPACE = "telemost_bot"
+
+# Корзины латентности по умолчанию, секунды
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание и кэш дочерних метрик по меткам."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = f"{NAMESPACE}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        # Быстрый поиск по значениям меток как они переданы (201 и "201" — одна метрика)
+        self._lookup: Dict[Tuple[Any, ...], Any] = {}
+        # Метрика без меток — одна дочерняя с пустой строкой меток
+        self._default = self._new_child("") if not self.labelnames else None
+
+    def _new_child(self, labels: str) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any) -> Any:
+        """Дочерняя метрика для значений меток (создаётся один раз)."""
+        child = self._lookup.get(values)
+        if child is not None:
+            return child
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child(_format_labels(self.labelnames, key))
+        self._lookup[values] = child
+        return child
+
+    def _all_children(self) -> Iterable[Any]:
+        if self._default is not None:
+            yield self._default
+        yield from self._children.values()
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for child in self._all_children():
+            child.render(self.name, lines)
+
+
+class _ValueChild:
+    __slots__ = ("labels", "value")
+
+    def __init__(self, labels: str) -> None:
+        self.labels = labels
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self, name: str, lines: List[str]) -> None:
+        lines.append(f"{name}{self.labels} {_format_value(self.value)}")
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = "counter"
+
+    def _new_child(self, labels: str) -> _ValueChild:
+        return _ValueChild(labels)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.value += amount
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и убывать (например, запросы в работе)."""
+
+    kind = "gauge"
+
+    def _new_child(self, labels: str) -> _ValueChild:
+        return _ValueChild(labels)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.value -= amount
+
+    def set(self, value: float) -> None:
+        self._default.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("labels", "upper", "counts", "sum")
+
+    def __init__(self, labels: str, upper: Tuple[float, ...]) -> None:
+        self.labels = labels
+        self.upper = upper
+        # Последняя корзина — +Inf
+        self.counts = [0] * (len(upper) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, lines: List[str]) -> None:
+        # le добавляется к уже готовой строке меток
+        prefix = self.labels[:-1] + "," if self.labels else "{"
+        cumulative = 0
+        for bound, count in zip((*self.upper, math.inf), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{prefix}le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{self.labels} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{self.labels} {cumulative}")
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (латентность)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self, labels: str) -> _HistogramChild:
+        return _HistogramChild(labels, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+
+def _flatten(prefix: str, value: Any, out: List[Tuple[str, float]]) -> None:
+    if isinstance(value, bool):
+        out.append((prefix, 1.0 if value else 0.0))
+    elif isinstance(value, (int, float)):
+        out.append((prefix, float(value)))
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}_{_INVALID_NAME_CHARS.sub('_', str(key))}", item, out)
+
+
+class MetricsRegistry:
+    """Набор метрик и сборщиков stats(), которые выводятся на /metrics."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def add_collector(self, prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Числовые поля collect() выводятся при опросе как gauge с именем <prefix>_<поле>."""
+        self._collectors = [(p, c) for p, c in self._collectors if p != prefix]
+        self._collectors.append((_INVALID_NAME_CHARS.sub("_", prefix), collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            metric.render(lines)
+        for prefix, collect in self._collectors:
+            samples: List[Tuple[str, float]] = []
+            try:
+                _flatten(f"{NAMESPACE}_{prefix}", collect(), samples)
+            except Exception:
+                continue
+            for name, value in samples:
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+# Общий реестр процесса
+REGISTRY = MetricsRegistry()
+
+# 📊 Метрики горячих путей
+HANDLER_LATENCY = REGISTRY.histogram(
+    "handler_duration_seconds", "Time spent in aiogram handlers.", ["handler"]
+)
+UPDATES_IN_FLIGHT = REGISTRY.gauge(
+    "updates_in_flight", "Telegram updates currently being handled."
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time spent serving HTTP requests.", ["route"]
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."
+)
+TELEMOST_LATENCY = REGISTRY.histogram(
+    "telemost_request_duration_seconds",
+    "Telemost API request latency per attempt (status: HTTP code, error or timeout).",
+    ["method", "status"],
+)
+BOT_API_LATENCY = REGISTRY.histogram(
+    "bot_api_request_duration_seconds", "Telegram Bot API request latency.", ["method"]
+)
+CALL_REPLIES = REGISTRY.counter(
+    "call_replies_total", "Replies to /call by outcome (video, text_fallback, not_configured, unavailable).",
+    ["outcome"],
+)
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the event loop heartbeat woke up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+LOOP_BLOCKED = REGISTRY.counter(
+    "event_loop_blocked_total", "Times the event loop was blocked longer than LOOP_LAG_THRESHOLD."
+)
+PROCESS_RSS = REGISTRY.gauge(
+    "process_resident_memory_bytes", "Resident set size of the bot process (sampled)."
+)
+GC_OBJECTS = REGISTRY.gauge(
+    "gc_objects", "Objects tracked by gc for the most common types (sampled).", ["type"]
+)
+AIOHTTP_OBJECTS = REGISTRY.gauge(
+    "aiohttp_objects", "Live aiohttp ClientSession and TCPConnector objects (sampled).", ["type", "state"]
+)
+
+
+@web.middleware
+async def http_metrics_middleware(
+    request: web.Request, handler: Callable[[web.Request], Awaitable[web.StreamResponse]]
+) -> web.StreamResponse:
+    """aiohttp-middleware: HTTP_LATENCY по шаблону маршрута и HTTP_IN_FLIGHT."""
+    resource = request.match_info.route.resource
+    # Шаблон, а не фактический путь: /assets/{filename}, а не имя каждого файла
+    route = resource.canonical if resource is not None else "unmatched"
+    HTTP_IN_FLIGHT.inc()
+    started = time.monotonic()
+    try:
+        return await handler(request)
+    finally:
+        HTTP_LATENCY.labels(route).observe(time.monotonic() - started)
+        HTTP_IN_FLIGHT.dec()
@@ -0,0 +1,236 @@
+"""
+🧩 MIDDLEWARE ДИСПЕТЧЕРА AIOGRAM
+
+DeadlineMiddleware — задаёт общий бюджет времени на обработку обновления.
+Вызовы Telemost внутри хендлера видят остаток через contextvar
+(utils/resilience.py) и не ждут дольше, чем осталось.
+
+TenantMiddleware — определяет организацию Яндекс 360 по чату/пользователю
+(utils/tenants.py) и подставляет в хендлеры её клиент `telemost` и
+`tenant_id`. Поиск — два обращения к словарю в памяти.
+
+ThrottlingMiddleware — лимит частоты для дорогих команд (utils/throttling.py).
+Действует только на хендлеры с флагом throttle, остальные сообщения
+проходят без проверки.
+
+MetricsMiddleware — время работы каждого хендлера и число обновлений в
+обработке для /metrics (utils/metrics.py).
+
+UpdateDedupMiddleware — отбрасывает повторно доставленные обновления.
+Если обработка затягивается, Telegram присылает то же обновление ещё раз,
+и без фильтра /call создал бы вторую встречу и отправил второе видео.
+
+Принцип работы:
+- запоминаются последние `capacity` значений update_id
+  (кольцевой буфер + множество: проверка и вставка за O(1), память постоянна)
+- обновление с уже виденным update_id не доходит до хендлеров
+- если обработка упала с ошибкой, update_id забывается, чтобы повторная
+  доставка от Telegram могла быть обработана
+- с общим состоянием (STATE_BACKEND=redis, utils/state.py) обновление
+  дополнительно «занимается» атомарным SET NX на UPDATE_DEDUP_TTL: повтор,
+  пришедший на другую реплику, тоже отбрасывается. Если хранилище
+  недоступно, остаётся локальная проверка
+
+Регистрация:
+    dp.update.outer_middleware(DeadlineMiddleware())
+    dp.update.outer_middleware(TenantMiddleware(tenants))
+    dp.update.outer_middleware(UpdateDedupMiddleware(state=get_state_backend()))
+    dp.message.middleware(ThrottlingMiddleware(throttle))
+    MetricsMiddleware().register(dp)
+"""
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message, TelegramObject, Update
+
+from config import UPDATE_DEDUP_WINDOW, UPDATE_DEDUP_TTL, UPDATE_DEADLINE
+from utils.metrics import HANDLER_LATENCY, UPDATES_IN_FLIGHT
+from utils.resilience import deadline
+from utils.state import StateBackend, StateError
+from utils.tenants import TenantRegistry
+from utils.throttling import CommandThrottle, reject_if_throttled
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineMiddleware(BaseMiddleware):
+    """Outer-middleware для dp.update: дедлайн на обработку обновления."""
+
+    def __init__(self, timeout: float = UPDATE_DEADLINE) -> None:
+        self.timeout = timeout
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with deadline(self.timeout):
+            return await handler(event, data)
+
+
+class TenantMiddleware(BaseMiddleware):
+    """Outer-middleware для dp.update: клиент Telemost организации чата."""
+
+    def __init__(self, tenants: TenantRegistry) -> None:
+        self.tenants = tenants
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # event_chat/event_from_user заполняет встроенная middleware aiogram
+        chat = data.get("event_chat")
+        user = data.get("event_from_user")
+        tenant_id = self.tenants.resolve(chat.id if chat else None, user.id if user else None)
+        data["tenant_id"] = tenant_id
+        data["telemost"] = self.tenants.client(tenant_id)
+        return await handler(event, data)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Inner-middleware для dp.message: лимит частоты для хендлеров с флагом throttle."""
+
+    def __init__(self, throttle: CommandThrottle) -> None:
+        self.throttle = throttle
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # Флаги хендлера видны только inner-middleware (хендлер уже выбран)
+        if not get_flag(data, "throttle") or not isinstance(event, Message):
+            return await handler(event, data)
+        if await reject_if_throttled(event, self.throttle):
+            return None
+        return await handler(event, data)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Inner-middleware для всех типов событий: латентность по хендлерам."""
+
+    # Наблюдатели без пользовательских хендлеров
+    SKIP_OBSERVERS = frozenset({"update", "error"})
+
+    def register(self, dp: Dispatcher) -> None:
+        for name, observer in dp.observers.items():
+            if name not in self.SKIP_OBSERVERS:
+                observer.middleware(self)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        UPDATES_IN_FLIGHT.inc()
+        started = time.monotonic()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_LATENCY.labels(name).observe(time.monotonic() - started)
+            UPDATES_IN_FLIGHT.dec()
+
+
+class UpdateDedupMiddleware(BaseMiddleware):
+    """Outer-middleware для dp.update: пропускает каждый update_id один раз."""
+
+    def __init__(
+        self,
+        capacity: int = UPDATE_DEDUP_WINDOW,
+        state: Optional[StateBackend] = None,
+        ttl: float = UPDATE_DEDUP_TTL,
+    ) -> None:
+        self.capacity = max(capacity, 1)
+        self._ring: Deque[int] = deque()
+        self._seen: Set[int] = set()
+        # Локального окна достаточно, если состояние не общее
+        self.state = state if state is not None and state.shared else None
+        self.ttl = ttl
+        # 📊 Счётчики
+        self.duplicates = 0
+        self.shared_duplicates = 0
+        self.state_errors = 0
+
+    def _remember(self, update_id: int) -> None:
+        if len(self._ring) >= self.capacity:
+            self._seen.discard(self._ring.popleft())
+        self._ring.append(update_id)
+        self._seen.add(update_id)
+
+    def _forget(self, update_id: int) -> None:
+        """Убирает id из окна целиком: повторная доставка будет обработана заново."""
+        if update_id not in self._seen:
+            return
+        self._seen.discard(update_id)
+        # Упавшее обновление почти всегда последнее в окне — O(1); иначе линейный поиск
+        if self._ring and self._ring[-1] == update_id:
+            self._ring.pop()
+        else:
+            self._ring.remove(update_id)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        update_id = event.update_id
+        if update_id in self._seen:
+            self.duplicates += 1
+            logger.info("[Dedup] повторное обновление %s отброшено", update_id)
+            return None
+        self._remember(update_id)
+        claimed = await self._claim(update_id)
+        if claimed is False:
+            self.shared_duplicates += 1
+            logger.info("[Dedup] обновление %s уже обработано другой репликой", update_id)
+            return None
+        try:
+            return await handler(event, data)
+        except Exception:
+            self._forget(update_id)
+            if claimed:
+                await self._release(update_id)
+            raise
+
+    async def _claim(self, update_id: int) -> Optional[bool]:
+        """Занимает update_id в общем состоянии; None — общего состояния нет или оно недоступно."""
+        if self.state is None:
+            return None
+        try:
+            return await self.state.set(f"update:{update_id}", "1", ttl=self.ttl, only_if_absent=True)
+        except StateError as e:
+            self.state_errors += 1
+            logger.warning("[Dedup] общее состояние недоступно, только локальная проверка: %s", e)
+            return None
+
+    async def _release(self, update_id: int) -> None:
+        try:
+            await self.state.delete(f"update:{update_id}")
+        except StateError as e:
+            self.state_errors += 1
+            logger.warning("[Dedup] не удалось освободить обновление %s: %s", update_id, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window": self.capacity,
+            "tracked": len(self._seen),
+            "duplicates": self.duplicates,
+            "shared": self.state is not None,
+            "shared_duplicates": self.shared_duplicates,
+            "state_errors": self.state_errors,
+        }
@@ -0,0 +1,353 @@
+"""
+🚦 ПЛАНИРОВЩИК ИСХОДЯЩИХ ЗАПРОСОВ К BOT API
+
+Telegram ограничивает частоту отправки: около 30 сообщений в секунду на бота,
+около 1 сообщения в секунду в личный чат и 20 сообщений в минуту в группу.
+При превышении Bot API отвечает 429 (TelegramRetryAfter).
+
+OutboundScheduler — request-middleware сессии aiogram. Все вызовы Bot API
+(message.answer_video, bot.send_message, save_prepared_inline_message ...)
+проходят через него:
+- глобальный token bucket ограничивает общую частоту запросов
+- token bucket на каждый чат ограничивает частоту в конкретный чат
+  (для групп — отдельный, более строгий лимит)
+- запросы ждут в очередях по приоритетам: интерактивные ответы
+  обслуживаются раньше фоновых (bulk) отправок
+- на TelegramRetryAfter чат (или весь бот) «замораживается» на retry_after
+  секунд, и запрос автоматически повторяется
+- stats() отдаёт задержку по методам и состояние очередей
+
+Приоритет задаётся контекстом вызова:
+    with bulk_priority():
+        await bot.send_video(...)
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config import (
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_GROUP_RATE,
+    TELEGRAM_GROUP_BURST,
+    TELEGRAM_MAX_RETRIES,
+    TELEGRAM_MAX_RETRY_AFTER,
+)
+from utils.metrics import BOT_API_LATENCY
+
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+
+
+send_priority: ContextVar[Priority] = ContextVar("send_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def bulk_priority() -> Iterator[None]:
+    """Помечает отправки внутри блока как фоновые (низкий приоритет)."""
+    token = send_priority.set(Priority.BULK)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+# Служебные методы, которые не относятся к отправке сообщений и не лимитируются
+UNTHROTTLED_METHODS = frozenset({
+    "getMe",
+    "getUpdates",
+    "setWebhook",
+    "deleteWebhook",
+    "getWebhookInfo",
+    "getFile",
+})
+
+
+class TokenBucket:
+    """Классический token bucket: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 — доступен сейчас)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def block(self, until: float) -> None:
+        self.blocked_until = max(self.blocked_until, until)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+@dataclass
+class MethodStats:
+    calls: int = 0
+    errors: int = 0
+    retry_after: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+    # Гистограмма латентности метода на /metrics (привязывается при первом вызове)
+    histogram: Any = field(default=None, repr=False)
+
+
+# (chat_id, future, время постановки в очередь)
+_Waiter = Tuple[Optional[int], "asyncio.Future[None]", float]
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """Request-middleware aiogram с лимитами Telegram и приоритетами."""
+
+    # Как часто выбрасывать неиспользуемые bucket'ы чатов (секунды)
+    SWEEP_INTERVAL = 60.0
+    # Сколько ожидающих просматривать за проход в поисках свободного чата
+    SCAN_LIMIT = 256
+
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = TELEGRAM_CHAT_RATE,
+        chat_burst: float = TELEGRAM_CHAT_BURST,
+        group_rate: float = TELEGRAM_GROUP_RATE,
+        group_burst: float = TELEGRAM_GROUP_BURST,
+        max_retries: int = TELEGRAM_MAX_RETRIES,
+        max_retry_after: float = TELEGRAM_MAX_RETRY_AFTER,
+    ) -> None:
+        now = time.monotonic()
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self._global = TokenBucket(global_rate, global_rate, now)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._waiters: List[Deque[_Waiter]] = [deque() for _ in Priority]
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._last_sweep = now
+        # 📊 Метрики
+        self.methods: Dict[str, MethodStats] = {}
+        self.queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    # --- Лимиты -------------------------------------------------------------
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательные id — группы и каналы
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst, now)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _delay(self, chat_id: Optional[int], now: float) -> float:
+        delay = self._global.delay(now)
+        if chat_id is not None:
+            delay = max(delay, self._chat_bucket(chat_id, now).delay(now))
+        return delay
+
+    def _take(self, chat_id: Optional[int], now: float) -> None:
+        self._global.take(now)
+        if chat_id is not None:
+            self._chat_bucket(chat_id, now).take(now)
+
+    def _sweep(self, now: float) -> None:
+        if now - self._last_sweep < self.SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        waiting = {w[0] for queue in self._waiters for w in queue}
+        for chat_id in [c for c, b in self._chats.items() if c not in waiting and b.idle(now)]:
+            del self._chats[chat_id]
+
+    # --- Очередь ------------------------------------------------------------
+
+    def _has_waiters(self) -> bool:
+        return any(self._waiters)
+
+    async def acquire(self, chat_id: Optional[int], priority: Priority = Priority.INTERACTIVE) -> None:
+        """Дожидается разрешения на один запрос в chat_id."""
+        now = time.monotonic()
+        if not self._has_waiters() and self._delay(chat_id, now) == 0.0:
+            self._take(chat_id, now)
+            return
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append((chat_id, future, now))
+        self.queued += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._wakeup.set()
+        await future
+
+    def _grant_next(self, now: float) -> float:
+        """
+        Выдаёт токен первому ожидающему, чей чат не упёрся в лимит.
+        Возвращает 0, если токен выдан, иначе — сколько стоит подождать.
+        """
+        min_delay = float("inf")
+        for queue in self._waiters:
+            scanned = 0
+            for index, (chat_id, future, queued_at) in enumerate(queue):
+                if future.done():
+                    # Ожидающий отменён — просто выбрасываем
+                    del queue[index]
+                    return 0.0
+                delay = self._delay(chat_id, now)
+                if delay == 0.0:
+                    del queue[index]
+                    self._take(chat_id, now)
+                    waited = now - queued_at
+                    self.wait_total += waited
+                    self.wait_max = max(self.wait_max, waited)
+                    future.set_result(None)
+                    return 0.0
+                min_delay = min(min_delay, delay)
+                scanned += 1
+                if scanned >= self.SCAN_LIMIT:
+                    break
+        return min_delay
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._sweep(now)
+            if not self._has_waiters():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._global.delay(now)
+            if delay == 0.0:
+                delay = self._grant_next(now)
+                if delay == 0.0:
+                    continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._dispatcher = None
+
+    # --- Middleware ---------------------------------------------------------
+
+    @staticmethod
+    def _target_chat(method: TelegramMethod[Any]) -> Optional[int]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            chat_id = getattr(method, "user_id", None)
+        # @username каналов лимитируем только глобально
+        return chat_id if isinstance(chat_id, int) else None
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        if api_method in UNTHROTTLED_METHODS:
+            return await make_request(bot, method)
+
+        chat_id = self._target_chat(method)
+        stats = self.methods.get(api_method)
+        if stats is None:
+            stats = self.methods[api_method] = MethodStats(histogram=BOT_API_LATENCY.labels(api_method))
+        priority = send_priority.get()
+
+        attempt = 0
+        while True:
+            await self.acquire(chat_id, priority)
+            started = time.monotonic()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                stats.retry_after += 1
+                until = time.monotonic() + e.retry_after
+                # Flood control на конкретный чат — замораживаем чат, иначе весь бот
+                if chat_id is not None:
+                    self._chat_bucket(chat_id, started).block(until)
+                else:
+                    self._global.block(until)
+                attempt += 1
+                if attempt > self.max_retries or e.retry_after > self.max_retry_after:
+                    stats.errors += 1
+                    raise
+                logger.info("[Outbound] %s: flood control, повтор через %ss", api_method, e.retry_after)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                latency = time.monotonic() - started
+                stats.calls += 1
+                stats.latency_total += latency
+                stats.latency_max = max(stats.latency_max, latency)
+                stats.histogram.observe(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waiting": {p.name.lower(): len(self._waiters[p]) for p in Priority},
+            "queued": self.queued,
+            "wait_avg": self.wait_total / self.queued if self.queued else None,
+            "wait_max": self.wait_max,
+            "chats": len(self._chats),
+            "methods": {
+                name: {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "retry_after": s.retry_after,
+                    "latency_avg": s.latency_total / s.calls if s.calls else None,
+                    "latency_max": s.latency_max,
+                }
+                for name, s in self.methods.items()
+            },
+        }
@@ -0,0 +1,164 @@
+"""
+🛡️ УСТОЙЧИВОСТЬ К СБОЯМ ВНЕШНИХ API
+
+Если Telemost API тормозит или лежит, каждый /call раньше ждал полный
+таймаут, и обработчики копились в очереди. Модуль даёт три инструмента:
+
+CircuitBreaker — автомат «закрыт / открыт / полуоткрыт»:
+- closed: запросы идут как обычно, подряд идущие сбои считаются
+- open: после failure_threshold сбоев подряд запросы сразу отклоняются
+  (CircuitOpenError) в течение recovery_timeout секунд
+- half_open: по истечении паузы пропускается один пробный запрос;
+  успех закрывает автомат, сбой снова открывает
+
+Дедлайны запроса — contextvar request_deadline:
+- обработчик HTTP или middleware обновления задаёт общий бюджет времени
+  (with deadline(15): ...), и все вложенные вызовы видят остаток через
+  time_left(); задачи, запущенные внутри, наследуют дедлайн
+
+retry_delay() — экспоненциальная задержка с полным джиттером для повторов.
+
+Пример:
+    with deadline(10):
+        url = await telemost.create_conference()
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Момент (по time.monotonic), к которому текущий запрос должен завершиться
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Ограничивает оставшееся время текущего запроса (вложенный дедлайн не продлевает внешний)."""
+    until = time.monotonic() + seconds
+    current = request_deadline.get()
+    if current is not None:
+        until = min(until, current)
+    token = request_deadline.set(until)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
+
+
+def time_left(default: float) -> float:
+    """Сколько секунд осталось до дедлайна, но не больше default."""
+    until = request_deadline.get()
+    if until is None:
+        return default
+    return min(default, until - time.monotonic())
+
+
+def retry_delay(attempt: int, base: float, cap: float) -> float:
+    """Задержка перед повтором номер attempt (с нуля): full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitOpenError(Exception):
+    """Автомат открыт: внешний API считается недоступным."""
+
+    def __init__(self, name: str, retry_in: float) -> None:
+        super().__init__(f"{name}: circuit is open, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Автомат защиты для одного внешнего API."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float) -> None:
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # Когда запущен пробный запрос в half_open (None — ещё не запущен)
+        self._probe_at: Optional[float] = None
+        # 📊 Счётчики
+        self.opened = 0
+        self.rejected = 0
+        self.successes = 0
+        self.total_failures = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() >= self._opened_at + self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_at = None
+        return self._state
+
+    def retry_in(self) -> float:
+        return max(self._opened_at + self.recovery_timeout - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """Можно ли выполнить запрос сейчас."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            now = time.monotonic()
+            # Пробный запрос один; зависший пробный не блокирует автомат навсегда
+            if self._probe_at is None or now - self._probe_at > self.recovery_timeout:
+                self._probe_at = now
+                return True
+        self.rejected += 1
+        return False
+
+    def check(self) -> None:
+        """Как allow(), но при отказе бросает CircuitOpenError."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def record_success(self) -> None:
+        self.successes += 1
+        self._failures = 0
+        if self._state != self.CLOSED:
+            logger.info("[Breaker] %s: закрыт, API снова отвечает", self.name)
+            self._state = self.CLOSED
+            self._probe_at = None
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self._failures += 1
+        if self._state == self.HALF_OPEN or (
+            self._state == self.CLOSED and self._failures >= self.failure_threshold
+        ):
+            logger.warning("[Breaker] %s: открыт на %.0f с после %s сбоев", self.name, self.recovery_timeout, self._failures)
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_at = None
+            self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self._failures,
+            "retry_in": self.retry_in() if state == self.OPEN else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "successes": self.successes,
+            "failures": self.total_failures,
+        }
+
+
+async def sleep_within_deadline(delay: float) -> bool:
+    """Спит delay секунд, если это укладывается в дедлайн. Возвращает False, если нет."""
+    if time_left(delay + 1.0) <= delay:
+        return False
+    await asyncio.sleep(delay)
+    return True
@@ -0,0 +1,110 @@
+"""
+⚡ БЫСТРЫЙ ПРОФИЛЬ РАНТАЙМА: UVLOOP И ORJSON
+
+Каждое обновление и каждый ответ API проходят через JSON, а все
+корутины — через event loop. Стандартные json и asyncio работают везде,
+но uvloop (event loop на libuv) и orjson (JSON на Rust) заметно быстрее.
+Профиль включается явно (FAST_RUNTIME=1); если пакетов нет, остаётся
+стандартная библиотека и пишется предупреждение.
+
+Принцип работы:
+- enable_fast_runtime() вызывается один раз до создания event loop:
+  ставит политику uvloop и переключает кодек JSON на orjson
+- json_loads / json_dumps — кодек для всего бота: AiohttpSession aiogram
+  (ответы Bot API и тела обновлений webhook), aiohttp.ClientSession
+  Telemost, request.json() в хендлерах HTTP API, web_app_data
+- json_response() / json_dumps_bytes() — как web.json_response, но с
+  orjson тело сразу собирается в bytes без промежуточной строки
+- orjson не сериализует, например, int больше 64 бит: тогда json_dumps
+  повторяет попытку стандартным json, поведение не меняется
+- модуль не читает config.py: его импортирует и FastAPI-приложение
+  logic/main.py (from ..bot.utils.runtime import ...)
+
+Пример:
+    enable_fast_runtime(FAST_RUNTIME)
+    session = AiohttpSession(json_loads=json_loads, json_dumps=json_dumps)
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Mapping, Optional, Union
+
+from aiohttp import web
+
+try:
+    import orjson
+except ImportError:  # быстрый профиль недоступен, используется json
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None  # type: ignore[assignment]
+
+
+logger = logging.getLogger(__name__)
+
+# orjson, когда быстрый профиль включён, иначе None (стандартный json)
+_orjson: Any = None
+_uvloop = False
+
+
+def enable_fast_runtime(enabled: bool = True) -> Dict[str, bool]:
+    """
+    Включает uvloop и orjson, если они установлены. Вызывать до запуска
+    event loop (до web.run_app / uvicorn.run). Возвращает, что включено.
+    """
+    global _orjson, _uvloop
+    if not enabled:
+        if _uvloop:
+            asyncio.set_event_loop_policy(None)
+        _orjson, _uvloop = None, False
+        return stats()
+    if orjson is None or uvloop is None:
+        missing = [name for name, module in (("orjson", orjson), ("uvloop", uvloop)) if module is None]
+        logger.warning("[Runtime] FAST_RUNTIME: не установлены %s, для них используется стандартная библиотека",
+                       ", ".join(missing))
+    _orjson = orjson
+    if uvloop is not None and not _uvloop:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        _uvloop = True
+    logger.info("[Runtime] быстрый профиль: %s", stats())
+    return stats()
+
+
+def json_loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> str:
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj)
+
+
+def json_dumps_bytes(obj: Any) -> bytes:
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_response(
+    data: Any,
+    *,
+    status: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> web.Response:
+    """web.json_response с кодеком профиля."""
+    return web.Response(body=json_dumps_bytes(data), status=status, headers=headers, content_type="application/json")
+
+
+def stats() -> Dict[str, bool]:
+    return {"orjson": _orjson is not None, "uvloop": _uvloop}
@@ -0,0 +1,69 @@
+"""
+🔀 SINGLE-FLIGHT: ОБЪЕДИНЕНИЕ КОНКУРЕНТНЫХ ВЫЗОВОВ
+
+Если несколько корутин одновременно запрашивают результат по одному и тому же
+ключу, реальная работа выполняется один раз, а остальные ждут её результата.
+
+Пример:
+    flights = SingleFlight()
+    token = await flights.do("refresh", lambda: refresh_token())
+
+Особенности:
+- Общая задача защищена asyncio.shield: отмена одного ожидающего
+  не отменяет работу для остальных
+- Исключение общей задачи получают все ожидающие
+- Счётчики calls/collapsed показывают эффективность объединения
+
+Модуль не зависит от config.py: его импортирует и FastAPI-приложение
+(from ..bot.utils.singleflight import SingleFlight в logic/main.py).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Выполняет не более одной задачи на ключ одновременно."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        # Сколько раз реально запускалась работа
+        self.calls = 0
+        # Сколько вызовов присоединились к уже идущей работе
+        self.collapsed = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Возвращает результат factory() для ключа, запуская её только если
+        по этому ключу ещё нет работы в полёте.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.collapsed += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        self.calls += 1
+
+        def _forget(done: "asyncio.Future[Any]") -> None:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            # Помечаем исключение полученным, даже если все ожидающие отменены
+            if not done.cancelled():
+                done.exception()
+
+        future.add_done_callback(_forget)
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._inflight),
+        }
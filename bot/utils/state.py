@@ -0,0 +1,557 @@
+"""
+🗄️ ОБЩЕЕ СОСТОЯНИЕ ДЛЯ НЕСКОЛЬКИХ РЕПЛИК БОТА
+
+Пока состояние живёт в памяти процесса (кэш подготовленных сообщений,
+дедупликация обновлений, ответы по ключам идемпотентности, токен в
+локальном файле), за upstream nginx нельзя поставить больше одной реплики:
+каждая повторяет работу остальных. StateBackend — общий интерфейс
+хранилища «ключ — строка» с двумя реализациями:
+
+- MemoryStateBackend — в памяти процесса (TTLCache из utils/cache.py);
+  поведение как раньше, для одной реплики
+- RedisStateBackend — сетевое хранилище по протоколу Redis (RESP2):
+  Redis, Valkey, KeyDB или любой совместимый сервер. Свой минимальный
+  клиент на asyncio streams, без внешних зависимостей
+
+Операции:
+- get / set с TTL (и only_if_absent — SET NX), delete
+- compare_and_set — атомарная замена значения, если оно не изменилось
+  (в Redis — Lua-скрипт через EVAL)
+- publish / subscribe — рассылка между репликами (для Redis — отдельное
+  соединение в режиме подписки с переподключением)
+
+Клиент Redis:
+- одно соединение для команд с конвейером: запросы пишутся сразу, ответы
+  приходят по порядку и разбираются одной задачей-читателем
+- таймаут каждой команды — STATE_TIMEOUT; ошибка соединения или
+  таймаут дают StateError, и вызывающий код решает, как работать без
+  общего состояния
+- после обрыва соединение восстанавливается при следующей команде
+
+SharedCache — кэш поверх бэкенда: локальный TTLCache (L1) плюс общий
+бэкенд (L2) и инвалидация L1 на других репликах через pub/sub. С
+MemoryStateBackend работает только L1.
+
+Настройки (config.py): STATE_BACKEND (memory | redis), STATE_REDIS_URL,
+STATE_KEY_PREFIX, STATE_TIMEOUT.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote, urlparse
+
+from config import STATE_BACKEND, STATE_REDIS_URL, STATE_KEY_PREFIX, STATE_TIMEOUT
+from utils.cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+# Обработчик сообщения pub/sub: получает текст сообщения
+Subscriber = Callable[[str], None]
+
+# Пауза перед переподключением подписки, секунды (растёт до максимума)
+_RESUBSCRIBE_DELAY = 0.5
+_RESUBSCRIBE_DELAY_MAX = 10.0
+
+
+class StateError(Exception):
+    """Общее хранилище недоступно или вернуло ошибку."""
+
+
+class StateBackend(ABC):
+    """Хранилище «ключ — строка» с TTL, compare-and-set и pub/sub."""
+
+    # Видят ли это состояние другие процессы и реплики
+    shared = False
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Значение ключа или None."""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        """Записывает значение (ttl в секундах). only_if_absent — только если ключа нет; False — не записано."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Удаляет ключ. True — ключ существовал."""
+
+    @abstractmethod
+    async def compare_and_set(
+        self, key: str, expected: Optional[str], value: Optional[str], ttl: Optional[float] = None
+    ) -> bool:
+        """
+        Атомарно: если текущее значение равно expected (None — ключа нет),
+        записывает value (None — удаляет ключ) и возвращает True.
+        """
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> None:
+        """Отправляет сообщение всем подписчикам канала (включая этот процесс)."""
+
+    def subscribe(self, channel: str, callback: Subscriber) -> None:
+        """Регистрирует обработчик канала; вызывается в event loop без ожидания."""
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def _dispatch(self, channel: str, message: str) -> None:
+        for callback in self._subscribers.get(channel, ()):
+            try:
+                callback(message)
+            except Exception as e:
+                logger.warning("[State] ошибка обработчика канала %s: %s", channel, e)
+
+    def start(self) -> None:
+        """Запускает фоновые задачи (подписки); вызывается при старте приложения."""
+
+    async def close(self) -> None:
+        """Закрывает соединения."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для /health."""
+
+
+class MemoryStateBackend(StateBackend):
+    """Состояние в памяти процесса; TTL и LRU — как у TTLCache."""
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        super().__init__()
+        self._data: TTLCache[str] = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        # 📊 Счётчики
+        self.published = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        if only_if_absent and self._data.get(key) is not None:
+            return False
+        self._data.set(key, value, ttl=ttl)
+        return True
+
+    async def delete(self, key: str) -> bool:
+        return self._data.pop(key) is not None
+
+    async def compare_and_set(
+        self, key: str, expected: Optional[str], value: Optional[str], ttl: Optional[float] = None
+    ) -> bool:
+        # Между get и set нет await: в одном event loop это атомарно
+        if self._data.get(key) != expected:
+            return False
+        if value is None:
+            self._data.pop(key)
+        else:
+            self._data.set(key, value, ttl=ttl)
+        return True
+
+    async def publish(self, channel: str, message: str) -> None:
+        self.published += 1
+        asyncio.get_running_loop().call_soon(self._dispatch, channel, message)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "keys": len(self._data),
+            "published": self.published,
+            "channels": len(self._subscribers),
+        }
+
+
+# --- протокол Redis (RESP2) ---
+
+RespValue = Union[None, int, str, List[Any]]
+
+
+class RespError(StateError):
+    """Ответ сервера с ошибкой (-ERR ...)."""
+
+
+def _encode_command(args: Tuple[Any, ...]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> RespValue:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed by state server")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body.decode("utf-8")
+    if prefix == b"-":
+        return RespError(body.decode("utf-8", "replace"))  # type: ignore[return-value]
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        size = int(body)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2].decode("utf-8")
+    if prefix == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(count)]
+    raise ConnectionError(f"unexpected reply from state server: {line[:40]!r}")
+
+
+# Атомарная замена: ARGV = [есть ли expected, expected, есть ли value, value, ttl в мс]
+_CAS_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if ARGV[1] == '1' then
+  if current ~= ARGV[2] then return 0 end
+elseif current then
+  return 0
+end
+if ARGV[3] == '1' then
+  if tonumber(ARGV[5]) > 0 then
+    redis.call('SET', KEYS[1], ARGV[4], 'PX', ARGV[5])
+  else
+    redis.call('SET', KEYS[1], ARGV[4])
+  end
+else
+  redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+
+def _discard_result(future: "asyncio.Future[RespValue]") -> None:
+    # Ответ на брошенную команду никому не нужен, в том числе ошибка
+    if not future.cancelled():
+        future.exception()
+
+
+def _ttl_ms(ttl: Optional[float]) -> int:
+    return max(int(ttl * 1000), 1) if ttl is not None else 0
+
+
+class RedisStateBackend(StateBackend):
+    """Состояние в Redis-совместимом сервере; минимальный клиент RESP2."""
+
+    shared = True
+
+    def __init__(
+        self,
+        url: str = STATE_REDIS_URL,
+        prefix: str = STATE_KEY_PREFIX,
+        timeout: float = STATE_TIMEOUT,
+    ) -> None:
+        super().__init__()
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported STATE_REDIS_URL scheme: {parsed.scheme!r}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.ssl = parsed.scheme == "rediss"
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Deque["asyncio.Future[RespValue]"] = deque()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._sub_task: Optional[asyncio.Task] = None
+        self._sub_writer: Optional[asyncio.StreamWriter] = None
+        self._closed = False
+        # 📊 Счётчики
+        self.commands = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.messages = 0
+
+    # --- соединение для команд ---
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl or None), self.timeout
+        )
+        try:
+            if self.password is not None:
+                auth = ("AUTH", self.username, self.password) if self.username else ("AUTH", self.password)
+                await self._handshake(reader, writer, auth)
+            if self.db:
+                await self._handshake(reader, writer, ("SELECT", self.db))
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, args: Tuple[Any, ...]) -> None:
+        writer.write(_encode_command(args))
+        reply = await asyncio.wait_for(_read_reply(reader), self.timeout)
+        if isinstance(reply, RespError):
+            raise reply
+
+    async def _connection(self) -> asyncio.StreamWriter:
+        if self._writer is not None and not self._writer.is_closing():
+            return self._writer
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return self._writer
+            if self._closed:
+                raise StateError("state backend is closed")
+            self._reader, self._writer = await self._open()
+            self.reconnects += 1
+            self._reader_task = asyncio.create_task(self._read_loop(self._reader), name="state-reader")
+            return self._writer
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        error: BaseException = ConnectionError("state connection closed")
+        try:
+            while True:
+                reply = await _read_reply(reader)
+                future = self._pending.popleft()
+                if not future.done():
+                    if isinstance(reply, RespError):
+                        future.set_exception(reply)
+                    else:
+                        future.set_result(reply)
+        except asyncio.CancelledError:
+            error = ConnectionError("state connection closed")
+            raise
+        except Exception as e:
+            error = e
+            logger.warning("[State] соединение с %s:%s потеряно: %s", self.host, self.port, e)
+        finally:
+            # Ответы на оставшиеся команды уже не придут
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+            while self._pending:
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_exception(StateError(str(error)))
+
+    async def _command(self, *args: Any) -> RespValue:
+        self.commands += 1
+        try:
+            writer = await self._connection()
+            future: "asyncio.Future[RespValue]" = asyncio.get_running_loop().create_future()
+            self._pending.append(future)
+            writer.write(_encode_command(args))
+            # Брошенный по таймауту future остаётся в очереди: порядок ответов не сбивается
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                future.add_done_callback(_discard_result)
+                raise
+        except StateError:
+            self.errors += 1
+            raise
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            self.errors += 1
+            raise StateError(f"{args[0]}: {e!r}") from e
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._command("GET", self._key(key))  # type: ignore[return-value]
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        args: List[Any] = ["SET", self._key(key), value]
+        if ttl is not None:
+            args += ["PX", _ttl_ms(ttl)]
+        if only_if_absent:
+            args.append("NX")
+        return await self._command(*args) == "OK"
+
+    async def delete(self, key: str) -> bool:
+        return bool(await self._command("DEL", self._key(key)))
+
+    async def compare_and_set(
+        self, key: str, expected: Optional[str], value: Optional[str], ttl: Optional[float] = None
+    ) -> bool:
+        reply = await self._command(
+            "EVAL", _CAS_SCRIPT, 1, self._key(key),
+            "1" if expected is not None else "0", expected or "",
+            "1" if value is not None else "0", value or "",
+            _ttl_ms(ttl),
+        )
+        return reply == 1
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self._command("PUBLISH", self._key(channel), message)
+
+    # --- подписки ---
+
+    def subscribe(self, channel: str, callback: Subscriber) -> None:
+        new = channel not in self._subscribers
+        super().subscribe(channel, callback)
+        if new and self._sub_writer is not None and not self._sub_writer.is_closing():
+            self._sub_writer.write(_encode_command(("SUBSCRIBE", self._key(channel))))
+        self._ensure_subscriber()
+
+    def _ensure_subscriber(self) -> None:
+        if self._closed or not self._subscribers or (self._sub_task is not None and not self._sub_task.done()):
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Ещё нет event loop (create_app) — подписка начнётся в start()
+            return
+        self._sub_task = asyncio.create_task(self._subscribe_loop(), name="state-subscriber")
+
+    def start(self) -> None:
+        self._ensure_subscriber()
+
+    async def _subscribe_loop(self) -> None:
+        delay = _RESUBSCRIBE_DELAY
+        while not self._closed:
+            writer: Optional[asyncio.StreamWriter] = None
+            try:
+                reader, writer = await self._open()
+                channels = [self._key(c) for c in self._subscribers]
+                writer.write(_encode_command(("SUBSCRIBE", *channels)))
+                self._sub_writer = writer
+                delay = _RESUBSCRIBE_DELAY
+                prefix_len = len(self.prefix)
+                while True:
+                    reply = await _read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == "message":
+                        self.messages += 1
+                        self._dispatch(reply[1][prefix_len:], reply[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[State] подписка прервана: %s, повтор через %.1f с", e, delay)
+            finally:
+                self._sub_writer = None
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RESUBSCRIBE_DELAY_MAX)
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in (self._sub_task, self._reader_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._sub_task = self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "server": f"{self.host}:{self.port}/{self.db}",
+            "connected": self._writer is not None and not self._writer.is_closing(),
+            "subscribed": self._sub_writer is not None,
+            "commands": self.commands,
+            "errors": self.errors,
+            "reconnects": self.reconnects,
+            "messages": self.messages,
+            "channels": len(self._subscribers),
+        }
+
+
+# Один бэкенд на процесс: его делят хранилище токена, кэши и middleware
+_backend: Optional[StateBackend] = None
+
+
+def get_state_backend(backend: str = STATE_BACKEND) -> StateBackend:
+    """Общий для процесса бэкенд состояния (создаётся при первом обращении)."""
+    global _backend
+    if _backend is None:
+        backend = backend.lower()
+        if backend == "memory":
+            _backend = MemoryStateBackend()
+        elif backend == "redis":
+            _backend = RedisStateBackend()
+        else:
+            raise ValueError(f"Unknown STATE_BACKEND: {backend!r} (expected memory or redis)")
+    return _backend
+
+
+class SharedCache:
+    """
+    Кэш строк: локальный TTLCache и общий бэкенд с инвалидацией через pub/sub.
+    Реплика, записавшая значение, сообщает остальным сбросить свою копию.
+    """
+
+    def __init__(self, state: StateBackend, namespace: str, maxsize: int, ttl: float) -> None:
+        self.state = state
+        self.namespace = namespace
+        self.local: TTLCache[str] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.channel = f"invalidate:{namespace}"
+        # Свои сообщения об инвалидации пропускаются
+        self._origin = uuid.uuid4().hex
+        if state.shared:
+            state.subscribe(self.channel, self._on_invalidate)
+        # 📊 Счётчики
+        self.remote_hits = 0
+        self.invalidations = 0
+        self.state_errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _on_invalidate(self, message: str) -> None:
+        origin, _, key = message.partition(" ")
+        if origin != self._origin and self.local.pop(key) is not None:
+            self.invalidations += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.local.get(key)
+        if value is not None or not self.state.shared:
+            return value
+        try:
+            raw = await self.state.get(self._key(key))
+        except StateError as e:
+            self.state_errors += 1
+            logger.warning("[State] %s: чтение из общего кэша не удалось: %s", self.namespace, e)
+            return None
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        ttl = entry["expires_at"] - time.time()
+        if ttl <= 0:
+            return None
+        self.remote_hits += 1
+        self.local.set(key, entry["value"], ttl=ttl)
+        return entry["value"]
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ttl = self.local.ttl if ttl is None else min(ttl, self.local.ttl)
+        self.local.set(key, value, ttl=ttl)
+        if not self.state.shared or ttl <= 0:
+            return
+        try:
+            entry = json.dumps({"value": value, "expires_at": time.time() + ttl})
+            await self.state.set(self._key(key), entry, ttl=ttl)
+            await self.state.publish(self.channel, f"{self._origin} {key}")
+        except StateError as e:
+            self.state_errors += 1
+            logger.warning("[State] %s: запись в общий кэш не удалась: %s", self.namespace, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.local.stats(),
+            "shared": self.state.shared,
+            "remote_hits": self.remote_hits,
+            "invalidations": self.invalidations,
+            "state_errors": self.state_errors,
+        }
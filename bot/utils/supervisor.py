@@ -0,0 +1,197 @@
+"""
+🧑‍🏭 НЕСКОЛЬКО ПРОЦЕССОВ-ВОРКЕРОВ НА ОДНОМ ПОРТУ
+
+Один процесс web.run_app использует одно ядро CPU. WorkerSupervisor
+запускает WEB_PROCESSES процессов, каждый со своим create_app(); все они
+слушают WEBAPP_HOST:WEBAPP_PORT через SO_REUSEPORT, и ядро ОС само
+распределяет входящие соединения между ними.
+
+Принцип работы:
+- воркеры порождаются fork'ом; номер воркера передаётся в переменной
+  окружения WEB_WORKER_INDEX
+- ведущий воркер — номер 0 (is_leader()): только он выполняет разовую
+  работу — set_webhook (с повторами в фоне), delete_webhook при остановке,
+  очистку старых встреч и предзагрузку видео. После перезапуска воркер
+  получает тот же номер, поэтому ведущий всегда ровно один
+- упавший воркер перезапускается; если он падает сразу после старта,
+  пауза перед перезапуском растёт (до max_restart_delay), чтобы не крутить
+  бесконечный цикл падений
+- SIGTERM/SIGINT супервизору: всем воркерам уходит SIGTERM, aiohttp
+  дорабатывает текущие запросы (не дольше shutdown_timeout) и вызывает
+  on_shutdown; кто не завершился с запасом — получает SIGKILL
+- воркеры живут в своей группе процессов (Ctrl-C получает только
+  супервизор и останавливает их по порядку) и сами завершаются, если
+  супервизор исчез (exit_with_parent)
+
+Общее между процессами состояние — SQLite (реестр встреч, токены) и
+файлы с блокировками. Дедупликация обновлений, идемпотентность и кэш
+подготовленных сообщений общие только при STATE_BACKEND=redis
+(utils/state.py), иначе у каждого воркера свои; лимиты частоты — всегда свои.
+
+Настройки (config.py): WEB_PROCESSES (1 — один процесс, как раньше),
+WEB_SHUTDOWN_TIMEOUT, WEB_RESTART_DELAY.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from multiprocessing.connection import wait
+from typing import Callable, Dict, Optional
+
+from aiohttp import web
+
+from config import WEB_PROCESSES, WEB_SHUTDOWN_TIMEOUT, WEB_RESTART_DELAY
+
+
+logger = logging.getLogger(__name__)
+
+# Номер воркера (0 — ведущий); без супервизора процесс считается ведущим
+WORKER_INDEX_ENV = "WEB_WORKER_INDEX"
+# Как часто воркер проверяет, жив ли супервизор
+_PARENT_POLL_INTERVAL = 1.0
+# Сверх shutdown_timeout: воркеру ещё нужно выполнить on_shutdown
+_SHUTDOWN_MARGIN = 10.0
+
+
+def worker_index() -> int:
+    return int(os.getenv(WORKER_INDEX_ENV, "0"))
+
+
+def is_leader() -> bool:
+    """Выполняет ли этот процесс разовую работу (webhook, фоновые задачи)."""
+    return worker_index() == 0
+
+
+def reuseport_socket(host: str, port: int) -> socket.socket:
+    """Сокет, привязанный к host:port с SO_REUSEPORT (несколько процессов на одном порту)."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT is not supported on this platform, set WEB_PROCESSES=1")
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+
+def exit_with_parent(app: web.Application) -> None:
+    """Воркер сам корректно останавливается, если супервизор завершился."""
+    parent = os.getppid()
+
+    async def _watch() -> None:
+        while os.getppid() == parent:
+            await asyncio.sleep(_PARENT_POLL_INTERVAL)
+        logger.warning("[Supervisor] супервизор завершился, воркер %s останавливается", worker_index())
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    tasks = []
+
+    async def _start(app: web.Application) -> None:
+        tasks.append(asyncio.create_task(_watch()))
+
+    async def _stop(app: web.Application) -> None:
+        for task in tasks:
+            task.cancel()
+
+    app.on_startup.append(_start)
+    app.on_cleanup.append(_stop)
+
+
+class WorkerSupervisor:
+    """Запускает воркеры, перезапускает упавшие и останавливает всех вместе."""
+
+    def __init__(
+        self,
+        target: Callable[[int], None],
+        processes: int = WEB_PROCESSES,
+        shutdown_timeout: float = WEB_SHUTDOWN_TIMEOUT,
+        restart_delay: float = WEB_RESTART_DELAY,
+        max_restart_delay: float = 30.0,
+    ) -> None:
+        self.target = target
+        self.processes = max(processes, 1)
+        self.shutdown_timeout = shutdown_timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._ctx = multiprocessing.get_context("fork")
+        self._workers: Dict[int, multiprocessing.process.BaseProcess] = {}
+        self._started_at: Dict[int, float] = {}
+        self._delays: Dict[int, float] = {}
+        # Номер воркера -> когда его можно перезапустить
+        self._pending: Dict[int, float] = {}
+        self._stopping = False
+        # 📊 Счётчики
+        self.restarts = 0
+
+    def _child(self, index: int) -> None:
+        # Ctrl-C и SIGTERM от терминала получает только супервизор
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        os.environ[WORKER_INDEX_ENV] = str(index)
+        self.target(index)
+
+    def _spawn(self, index: int) -> None:
+        process = self._ctx.Process(target=self._child, args=(index,), name=f"web-worker-{index}")
+        process.start()
+        self._workers[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info("[Supervisor] воркер %s запущен (pid %s)%s", index, process.pid, " — ведущий" if index == 0 else "")
+
+    def _on_signal(self, signum: int, _frame: Optional[object]) -> None:
+        if not self._stopping:
+            logger.info("[Supervisor] получен сигнал %s, останавливаем воркеры", signal.Signals(signum).name)
+        self._stopping = True
+
+    def _schedule_restart(self, index: int, exitcode: Optional[int]) -> None:
+        lived = time.monotonic() - self._started_at[index]
+        # Быстрое падение — пауза растёт, проработал долго — пауза сбрасывается
+        if lived < self.max_restart_delay:
+            delay = min(self._delays.get(index, self.restart_delay / 2) * 2, self.max_restart_delay)
+        else:
+            delay = self.restart_delay
+        self._delays[index] = delay
+        self._pending[index] = time.monotonic() + delay
+        logger.error("[Supervisor] воркер %s завершился с кодом %s, перезапуск через %.1f с", index, exitcode, delay)
+
+    def run(self) -> int:
+        """Блокирует до остановки; возвращает код выхода супервизора."""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        for index in range(self.processes):
+            self._spawn(index)
+
+        while not self._stopping:
+            now = time.monotonic()
+            for index, at in list(self._pending.items()):
+                if at <= now:
+                    del self._pending[index]
+                    self.restarts += 1
+                    self._spawn(index)
+            timeout = min([at - now for at in self._pending.values()] + [1.0])
+            wait([p.sentinel for p in self._workers.values()], timeout=max(timeout, 0.0))
+            for index, process in list(self._workers.items()):
+                if process.exitcode is not None and not self._stopping:
+                    process.join()
+                    del self._workers[index]
+                    self._schedule_restart(index, process.exitcode)
+
+        return self._shutdown()
+
+    def _shutdown(self) -> int:
+        for process in self._workers.values():
+            if process.exitcode is None:
+                process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout + _SHUTDOWN_MARGIN
+        for index, process in self._workers.items():
+            process.join(max(deadline - time.monotonic(), 0.0))
+            if process.exitcode is None:
+                logger.warning("[Supervisor] воркер %s не остановился вовремя, SIGKILL", index)
+                process.kill()
+                process.join()
+        logger.info("[Supervisor] все воркеры остановлены")
+        return 0
@@ -1,8 +1,8 @@
-import json
-import os
+import asyncio
 import time
 import logging
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple
 
 import aiohttp
 
@@ -14,13 +14,98 @@ from config import (
     TELEMOST_TOKEN_URL,
     TELEMOST_MEETINGS_URL,
     TELEMOST_SCOPE,
-    TELEMOST_TOKEN_STORE,
     TELEMOST_OAUTH_TOKEN,
+    TELEMOST_HTTP_POOL_LIMIT,
+    TELEMOST_HTTP_POOL_LIMIT_PER_HOST,
+    TELEMOST_HTTP_KEEPALIVE_TIMEOUT,
+    TELEMOST_HTTP_DNS_CACHE_TTL,
+    TELEMOST_TOKEN_REFRESH_AHEAD,
+    TELEMOST_REQUEST_TIMEOUT,
+    TELEMOST_RETRY_ATTEMPTS,
+    TELEMOST_RETRY_BASE_DELAY,
+    TELEMOST_BREAKER_FAILURES,
+    TELEMOST_BREAKER_RECOVERY,
 )
+from utils.singleflight import SingleFlight
+from utils.token_store import Token, TokenStore, get_token_store
+from utils.metrics import TELEMOST_LATENCY
+from utils.resilience import CircuitBreaker, retry_delay, sleep_within_deadline, time_left
+from utils.runtime import json_dumps, json_loads
 
 
 logger = logging.getLogger(__name__)
 
+# Обновление токена — single-flight на процесс
+_token_flights = SingleFlight()
+# 🛡️ Автоматы защиты на процесс: (организация, роль клиента) -> CircuitBreaker.
+# Ошибки одной организации или фоновой очистки не закрывают /call остальным;
+# клиент организации, пересозданный после вытеснения из LRU, получает прежний автомат
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+# Роли клиентов: запросы пользователей и фоновые задачи (очистка встреч)
+ROLE_INTERACTIVE = "interactive"
+ROLE_BACKGROUND = "background"
+
+# Ответы, после которых запрос заведомо не выполнен и его можно повторить
+_RETRYABLE_STATUSES = frozenset({429, 503})
+
+
+@dataclass
+class Meeting:
+    """Созданная встреча: то, что стоит сохранить из ответа Telemost."""
+    join_url: str
+    id: Optional[str] = None
+    title: str = ""
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class TelemostCredentials:
+    """OAuth-приложение и адреса API одной организации Яндекс 360."""
+    client_id: str = ""
+    client_secret: str = ""
+    redirect_uri: str = ""
+    auth_url: str = ""
+    token_url: str = ""
+    meetings_url: str = ""
+    scope: str = ""
+    oauth_token: str = ""
+
+    @classmethod
+    def from_env(cls) -> "TelemostCredentials":
+        """Настройки организации по умолчанию из TELEMOST_* (config.py)."""
+        return cls(
+            client_id=TELEMOST_CLIENT_ID,
+            client_secret=TELEMOST_CLIENT_SECRET,
+            redirect_uri=TELEMOST_REDIRECT_URI,
+            auth_url=TELEMOST_AUTH_URL,
+            token_url=TELEMOST_TOKEN_URL,
+            meetings_url=TELEMOST_MEETINGS_URL,
+            scope=TELEMOST_SCOPE,
+            oauth_token=TELEMOST_OAUTH_TOKEN,
+        )
+
+
+# Идентификатор организации, настроенной через TELEMOST_* (см. utils/tenants.py)
+DEFAULT_TENANT = "default"
+
+
+def breaker_for(tenant_id: str, role: str = ROLE_INTERACTIVE) -> CircuitBreaker:
+    """Автомат защиты API встреч для организации и роли клиента (один на процесс)."""
+    key = (tenant_id, role)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            f"telemost:{tenant_id}:{role}", TELEMOST_BREAKER_FAILURES, TELEMOST_BREAKER_RECOVERY
+        )
+        _breakers[key] = breaker
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Состояние всех автоматов защиты процесса: "организация/роль" -> stats()."""
+    return {f"{tenant_id}/{role}": breaker.stats() for (tenant_id, role), breaker in _breakers.items()}
+
 
 class TelemostClient:
     """
@@ -28,105 +113,228 @@ class TelemostClient:
     Поддерживает:
       - попытку Client Credentials (если разрешено в организации)
       - использование заранее выданного токена (TELEMOST_OAUTH_TOKEN)
-      - чтение/запись токена в файл (access_token, refresh_token, expires_at)
+      - хранение токена (access_token, refresh_token, expires_at) в TokenStore:
+        JSON-файл или SQLite (utils/token_store.py, TELEMOST_TOKEN_BACKEND)
+      - кэш токена в памяти и single-flight обновление по refresh_token;
+        после start() токен обновляется в фоне до истечения expires_at
+      - запросы к API встреч идут через CircuitBreaker (utils/resilience.py),
+        с повторами при 429/503 и сетевых ошибках и с учётом дедлайна запроса;
+        автомат свой у каждой пары (организация, роль клиента)
+
+    Все запросы идут через одну долгоживущую aiohttp-сессию с пулом
+    keep-alive соединений и DNS-кэшем. Экземпляр клиента создаётся один раз
+    в create_app и закрывается через close() при остановке приложения.
+
+    Клиент обслуживает одну организацию: credentials (по умолчанию — из
+    TELEMOST_*) и токен в хранилище под ключом tenant_id. Клиенты других
+    организаций выдаёт TenantRegistry (utils/tenants.py).
     """
 
-    def __init__(self) -> None:
-        self.client_id = TELEMOST_CLIENT_ID
-        self.client_secret = TELEMOST_CLIENT_SECRET
-        self.redirect_uri = TELEMOST_REDIRECT_URI
-        self.auth_url = TELEMOST_AUTH_URL
-        self.token_url = TELEMOST_TOKEN_URL
-        self.meetings_url = TELEMOST_MEETINGS_URL
-        self.scope = TELEMOST_SCOPE
-        self.token_store = TELEMOST_TOKEN_STORE
-        self.static_token = TELEMOST_OAUTH_TOKEN
+    def __init__(
+        self,
+        pool_limit: int = TELEMOST_HTTP_POOL_LIMIT,
+        pool_limit_per_host: int = TELEMOST_HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = TELEMOST_HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = TELEMOST_HTTP_DNS_CACHE_TTL,
+        credentials: Optional[TelemostCredentials] = None,
+        tenant_id: str = DEFAULT_TENANT,
+        role: str = ROLE_INTERACTIVE,
+    ) -> None:
+        credentials = credentials or TelemostCredentials.from_env()
+        self.tenant_id = tenant_id
+        self.role = role
+        self.client_id = credentials.client_id
+        self.client_secret = credentials.client_secret
+        self.redirect_uri = credentials.redirect_uri
+        self.auth_url = credentials.auth_url
+        self.token_url = credentials.token_url
+        self.meetings_url = credentials.meetings_url
+        self.scope = credentials.scope
+        self.tokens: TokenStore = get_token_store(key=tenant_id)
+        self.static_token = credentials.oauth_token
+        # Параметры пула соединений
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        # Сессия создаётся лениво: ClientSession нужно создавать внутри запущенного event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Фоновое обновление токена (см. start())
+        self.refresh_ahead = TELEMOST_TOKEN_REFRESH_AHEAD
+        self._refresher: Optional[asyncio.Task] = None
+        self._token_changed: Optional[asyncio.Event] = None
+        # Сколько запросов создания встреч сейчас выполняется (фоновые задачи уступают им)
+        self.in_flight = 0
+        # Таймаут и повторы запросов к API встреч
+        self.request_timeout = TELEMOST_REQUEST_TIMEOUT
+        self.retry_attempts = max(TELEMOST_RETRY_ATTEMPTS, 0)
+        self.retry_base_delay = TELEMOST_RETRY_BASE_DELAY
+        self.breaker = breaker_for(tenant_id, role)
         # Telemost client initialized
         # Authorization Code Flow реализуем вручную через OAuth endpoints
 
-    def _load_token(self) -> Optional[Dict[str, Any]]:
-        if self.static_token:
-            # Using static token from env
-            return {"access_token": self.static_token, "expires_at": time.time() + 3600}
-        if os.path.exists(self.token_store):
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая её при первом обращении."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, json_serialize=json_dumps)
+        return self._session
+
+    async def close(self) -> None:
+        """Останавливает фоновое обновление токена и закрывает общую сессию."""
+        if self._refresher is not None:
+            self._refresher.cancel()
             try:
-                with open(self.token_store, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                # Token loaded from file
-                return data
-            except Exception as e:
-                # Failed to read token file
+                await self._refresher
+            except (asyncio.CancelledError, Exception):
                 pass
-        return None
+            self._refresher = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
-    def _save_token(self, token: Dict[str, Any]) -> None:
-        try:
-            os.makedirs(os.path.dirname(self.token_store), exist_ok=True)
-            with open(self.token_store, "w", encoding="utf-8") as f:
-                json.dump(token, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            # Failed to save Telemost token
-            pass
+    def _notify_token_changed(self) -> None:
+        """Будит фоновое обновление: срок действия токена мог измениться."""
+        if self._token_changed is not None:
+            self._token_changed.set()
+
+    async def _save_token(self, token: Token) -> None:
+        await self.tokens.save(token)
+        self._notify_token_changed()
 
-    def delete_token(self) -> bool:
+    async def delete_token(self) -> bool:
         """
         Удаляет сохраненный токен Telemost.
         
         Returns:
-            bool: True если токен был удален, False если файл не существовал
+            bool: True если токен был удален, False если его не было
         """
         try:
-            if os.path.exists(self.token_store):
-                os.remove(self.token_store)
-                # Token deleted from file
-                return True
-            else:
-                # Token file does not exist
-                return False
+            deleted = await self.tokens.delete()
         except Exception as e:
-            # Error deleting token
+            logger.warning("[Telemost] не удалось удалить токен: %s", e)
             return False
+        self._notify_token_changed()
+        return deleted
+
+    async def _get_token(self) -> Optional[Token]:
+        """Возвращает токен из хранилища (с кэшем в памяти, без блокировки event loop)."""
+        if self.static_token:
+            # Using static token from env
+            return {"access_token": self.static_token, "expires_at": time.time() + 3600}
+        try:
+            return await self.tokens.load()
+        except Exception as e:
+            logger.warning("[Telemost] не удалось прочитать токен: %s", e)
+            return None
 
     async def _fetch_token_client_credentials(self, session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
         # Предпочтём Authorization Code Flow через библиотеку YandexOAuth
         # client_credentials не поддерживается на oauth.yandex.ru для большинства организаций
         return None
 
+    def _can_refresh(self, token: Optional[Dict[str, Any]]) -> bool:
+        return bool(
+            token
+            and token.get("refresh_token")
+            and self.token_url
+            and self.client_id
+            and self.client_secret
+        )
+
+    async def _refresh_token(self, session: aiohttp.ClientSession) -> Optional[str]:
+        """
+        Обновляет токен через refresh_token. Single-flight: одновременно идёт
+        не больше одного запроса обновления, остальные ждут его результата.
+        """
+        return await _token_flights.do(("refresh", id(self.tokens)), lambda: self._do_refresh(session))
+
+    async def _do_refresh(self, session: aiohttp.ClientSession) -> Optional[str]:
+        cached = await self._get_token()
+        if not self._can_refresh(cached):
+            return None
+        try:
+            # Updating token via refresh_token
+            data = {
+                "grant_type": "refresh_token",
+                "refresh_token": cached["refresh_token"],
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            }
+            async with session.post(self.token_url, data=data, timeout=20) as resp:
+                text = await resp.text()
+                # Token refresh response received
+                if resp.status == 200:
+                    new_token = json_loads(text)
+                    expires_in = new_token.get("expires_in", 3600)
+                    new_token["expires_at"] = time.time() + int(expires_in) - 30
+                    # Сохраняем новый refresh_token, если пришёл
+                    if not new_token.get("refresh_token") and cached.get("refresh_token"):
+                        new_token["refresh_token"] = cached["refresh_token"]
+
+                    def _adopt(current: Optional[Token]) -> Optional[Token]:
+                        # Другой процесс успел обновить или сбросить токен — его запись главнее
+                        if current is None or current.get("access_token") != cached.get("access_token"):
+                            return current
+                        return new_token
+
+                    stored = await self.tokens.update(_adopt)
+                    self._notify_token_changed()
+                    return stored.get("access_token") if stored else None
+                logger.warning("[Telemost] не удалось обновить токен: %s", resp.status)
+        except Exception as e:
+            # Error refreshing token
+            logger.warning("[Telemost] ошибка обновления токена: %s", e)
+        return None
+
     async def _ensure_token(self, session: aiohttp.ClientSession) -> Optional[str]:
         # Ensuring token validity
-        token = self._load_token()
+        token = await self._get_token()
         if token and token.get("access_token") and token.get("expires_at", 0) > time.time():
             # Token is valid, using cache
             return token["access_token"]
-        # Если есть оффлайн-refresh в файле — пробуем обновить через стандартный OAuth endpoint
-        cached = self._load_token()
-        if cached and cached.get("refresh_token") and self.token_url and self.client_id and self.client_secret:
-            try:
-                # Updating token via refresh_token
-                data = {
-                    "grant_type": "refresh_token",
-                    "refresh_token": cached["refresh_token"],
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                }
-                async with session.post(self.token_url, data=data, timeout=20) as resp:
-                    text = await resp.text()
-                    # Token refresh response received
-                    if resp.status == 200:
-                        new_token = json.loads(text)
-                        expires_in = new_token.get("expires_in", 3600)
-                        new_token["expires_at"] = time.time() + int(expires_in) - 30
-                        # Сохраняем новый refresh_token, если пришёл
-                        if not new_token.get("refresh_token") and cached.get("refresh_token"):
-                            new_token["refresh_token"] = cached["refresh_token"]
-                        self._save_token(new_token)
-                        return new_token["access_token"]
-            except Exception as e:
-                # Error refreshing token
-                pass
+        # Если есть оффлайн-refresh — пробуем обновить через стандартный OAuth endpoint
+        if self._can_refresh(token):
+            return await self._refresh_token(session)
         # No valid token, authorization required
         return None
 
+    def start(self) -> None:
+        """Запускает фоновое обновление токена незадолго до expires_at."""
+        if self._refresher is None or self._refresher.done():
+            self._token_changed = asyncio.Event()
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                token = await self._get_token()
+                if self.static_token or not self._can_refresh(token):
+                    # Обновлять нечего — ждём появления нового токена
+                    delay = None
+                else:
+                    delay = token.get("expires_at", 0) - time.time() - self.refresh_ahead
+                if delay is not None and delay <= 0:
+                    await self._refresh_token(self._get_session())
+                    # После попытки (удачной или нет) пересчитываем срок не раньше чем через 30 с
+                    delay = 30
+                self._token_changed.clear()
+                try:
+                    await asyncio.wait_for(self._token_changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[Telemost] ошибка фонового обновления токена: %s", e)
+                await asyncio.sleep(30)
+
     def get_authorization_url(self) -> Optional[str]:
         if not (self.auth_url and self.client_id and self.redirect_uri):
             return None
@@ -154,24 +362,24 @@ class TelemostClient:
             "client_secret": self.client_secret,
         }
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.token_url, data=data, timeout=20) as resp:
-                    text = await resp.text()
-                    # Code exchange response received
-                    if resp.status != 200:
-                        return None
-                    token = json.loads(text)
-                    if token.get("access_token"):
-                        expires_in = token.get("expires_in", 3600)
-                        token["expires_at"] = time.time() + int(expires_in) - 30
-                        self._save_token(token)
-                        return token["access_token"]
+            session = self._get_session()
+            async with session.post(self.token_url, data=data, timeout=20) as resp:
+                text = await resp.text()
+                # Code exchange response received
+                if resp.status != 200:
+                    return None
+                token = json_loads(text)
+                if token.get("access_token"):
+                    expires_in = token.get("expires_in", 3600)
+                    token["expires_at"] = time.time() + int(expires_in) - 30
+                    await self._save_token(token)
+                    return token["access_token"]
         except Exception as e:
             # Exception during code exchange
             pass
         return None
 
-    def set_access_token(self, access_token: str, expires_in: int = 31536000, refresh_token: Optional[str] = None) -> None:
+    async def set_access_token(self, access_token: str, expires_in: int = 31536000, refresh_token: Optional[str] = None) -> None:
         """Сохранить заранее полученный access_token (например, отладочный)."""
         token: Dict[str, Any] = {
             "access_token": access_token,
@@ -180,68 +388,172 @@ class TelemostClient:
         }
         if refresh_token:
             token["refresh_token"] = refresh_token
-        self._save_token(token)
+        await self._save_token(token)
+
+    async def _send(self, method: str, url: str, idempotent: bool, **kwargs: Any) -> Tuple[int, str]:
+        """
+        Запрос к API встреч через автомат защиты.
+
+        Повторяются 429/503 и ошибки соединения (запрос не дошёл до сервера);
+        для идемпотентных запросов — ещё таймауты и прочие 5xx. Таймаут каждой
+        попытки ограничен остатком дедлайна запроса (utils/resilience.py).
+        Бросает CircuitOpenError, если автомат открыт.
+        """
+        session = self._get_session()
+        attempt = 0
+        while True:
+            self.breaker.check()
+            timeout = time_left(self.request_timeout)
+            if timeout <= 0:
+                raise asyncio.TimeoutError("request deadline exceeded")
+
+            retry_after: Optional[float] = None
+            started = time.monotonic()
+            try:
+                async with session.request(
+                    method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+                ) as resp:
+                    status, text = resp.status, await resp.text()
+                    if status == 429:
+                        try:
+                            retry_after = float(resp.headers.get("Retry-After", ""))
+                        except ValueError:
+                            retry_after = None
+                TELEMOST_LATENCY.labels(method, status).observe(time.monotonic() - started)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                TELEMOST_LATENCY.labels(method, outcome).observe(time.monotonic() - started)
+                self.breaker.record_failure()
+                retryable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+                if not retryable or attempt >= self.retry_attempts:
+                    raise
+                delay = retry_delay(attempt, self.retry_base_delay, self.request_timeout)
+                if not await sleep_within_deadline(delay):
+                    raise
+                attempt += 1
+                continue
+
+            if status >= 500 or status == 429:
+                self.breaker.record_failure()
+                retryable = idempotent or status in _RETRYABLE_STATUSES
+                if retryable and attempt < self.retry_attempts:
+                    delay = retry_after if retry_after is not None else retry_delay(
+                        attempt, self.retry_base_delay, self.request_timeout
+                    )
+                    if await sleep_within_deadline(delay):
+                        attempt += 1
+                        continue
+            else:
+                self.breaker.record_success()
+            return status, text
 
     async def create_conference(self, title: str = "Встреча", settings: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """
         Создаёт конференцию и возвращает join_url (ссылку на вход).
         Если не удаётся — вернёт None.
         """
+        meeting = await self.create_meeting(title=title, settings=settings)
+        return meeting.join_url if meeting else None
+
+    async def create_meeting(self, title: str = "Встреча", settings: Optional[Dict[str, Any]] = None) -> Optional[Meeting]:
+        """
+        Создаёт конференцию и возвращает Meeting (id, join_url, итоговые настройки).
+        Если не удаётся — вернёт None.
+        """
+        self.in_flight += 1
+        try:
+            return await self._create_meeting(title, settings)
+        finally:
+            self.in_flight -= 1
+
+    async def _create_meeting(self, title: str, settings: Optional[Dict[str, Any]]) -> Optional[Meeting]:
         if not self.meetings_url:
             logger.error("TELEMOST_MEETINGS_URL не настроен")
             return None
 
-        async with aiohttp.ClientSession() as session:
-            access_token = await self._ensure_token(session)
-            if not access_token:
-                logger.error("[Telemost] Нет access_token. Проверьте OAuth настройки/доступы.")
-                return None
-
-            payload: Dict[str, Any] = {"title": title}
-            # Настройки по умолчанию: мгновенный вход без комнаты ожидания и без подтверждения
-            default_settings: Dict[str, Any] = {
-                "immediateJoin": True,
-                "waitingRoom": False,
-                "joinWithoutConfirmation": True
-            }
-            # Поддерживаем как формат settings={...}, так и settings={"settings": {...}}
-            if settings:
-                nested = settings.get("settings") if isinstance(settings, dict) else None
-                if isinstance(nested, dict):
-                    default_settings.update(nested)
-                elif isinstance(settings, dict):
-                    default_settings.update(settings)
-            payload["settings"] = default_settings
-            payload["waiting_room_level"] = "PUBLIC"
-
-            headers = {
-                # Согласно инструкции OAuth Яндекса для отладочного токена используется схема OAuth
-                "Authorization": f"OAuth {access_token}",
-                "Content-Type": "application/json",
-            }
-            try:
-                # Creating meeting
-                async with session.post(self.meetings_url, headers=headers, json=payload, timeout=20) as resp:
-                    text = await resp.text()
-                    # Meeting creation response received
-                    if resp.status not in (200, 201):
-                        logger.error("[Telemost] ошибка создания встречи %s", resp.status)
-                        return None
-                    data = json.loads(text)
-                    # предполагаем, что ссылка в одном из полей
-                    join_url = (
-                        data.get("join_url")
-                        or data.get("joinUrl")
-                        or data.get("url")
-                        or data.get("link")
-                    )
-                    if not join_url:
-                        logger.warning("[Telemost] не нашли ссылку на встречу в ответе: %s", data)
-                        return None
-                    # Meeting link generated
-                    return join_url
-            except Exception as e:
-                # Exception during meeting creation
-                return None
+        session = self._get_session()
+        access_token = await self._ensure_token(session)
+        if not access_token:
+            logger.error("[Telemost] Нет access_token. Проверьте OAuth настройки/доступы.")
+            return None
 
+        payload: Dict[str, Any] = {"title": title}
+        # Настройки по умолчанию: мгновенный вход без комнаты ожидания и без подтверждения
+        default_settings: Dict[str, Any] = {
+            "immediateJoin": True,
+            "waitingRoom": False,
+            "joinWithoutConfirmation": True
+        }
+        # Поддерживаем как формат settings={...}, так и settings={"settings": {...}}
+        if settings:
+            nested = settings.get("settings") if isinstance(settings, dict) else None
+            if isinstance(nested, dict):
+                default_settings.update(nested)
+            elif isinstance(settings, dict):
+                default_settings.update(settings)
+        payload["settings"] = default_settings
+        payload["waiting_room_level"] = "PUBLIC"
 
+        headers = {
+            # Согласно инструкции OAuth Яндекса для отладочного токена используется схема OAuth
+            "Authorization": f"OAuth {access_token}",
+            "Content-Type": "application/json",
+        }
+        try:
+            # Creating meeting (POST не идемпотентен: повторяем только заведомо не выполненные)
+            status, text = await self._send("POST", self.meetings_url, idempotent=False, headers=headers, json=payload)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("[Telemost] ошибка запроса создания встречи: %r", e)
+            return None
+        # Meeting creation response received
+        if status not in (200, 201):
+            logger.error("[Telemost] ошибка создания встречи %s", status)
+            return None
+        try:
+            data = json_loads(text)
+        except ValueError:
+            logger.error("[Telemost] некорректный JSON в ответе на создание встречи")
+            return None
+        # предполагаем, что ссылка в одном из полей
+        join_url = (
+            data.get("join_url")
+            or data.get("joinUrl")
+            or data.get("url")
+            or data.get("link")
+        )
+        if not join_url:
+            logger.warning("[Telemost] не нашли ссылку на встречу в ответе: %s", data)
+            return None
+        # Meeting link generated
+        meeting_id = data.get("id") or data.get("meeting_id")
+        return Meeting(
+            join_url=join_url,
+            id=str(meeting_id) if meeting_id is not None else None,
+            title=title,
+            settings=default_settings,
+        )
+
+    async def delete_meeting(self, meeting_id: str) -> bool:
+        """
+        Удаляет конференцию по id. Возвращает True, если встречи больше нет
+        (в том числе если она уже была удалена ранее).
+        """
+        if not self.meetings_url:
+            return False
+
+        session = self._get_session()
+        access_token = await self._ensure_token(session)
+        if not access_token:
+            return False
+
+        url = f"{self.meetings_url.rstrip('/')}/{meeting_id}"
+        headers = {"Authorization": f"OAuth {access_token}"}
+        try:
+            status, _ = await self._send("DELETE", url, idempotent=True, headers=headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("[Telemost] ошибка удаления встречи %s: %r", meeting_id, e)
+            return False
+        if status in (200, 202, 204, 404):
+            return True
+        logger.warning("[Telemost] ошибка удаления встречи %s: %s", meeting_id, status)
+        return False
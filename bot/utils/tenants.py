@@ -0,0 +1,175 @@
+"""
+🏢 НЕСКОЛЬКО ОРГАНИЗАЦИЙ ЯНДЕКС 360 В ОДНОМ БОТЕ
+
+TenantRegistry связывает чаты и пользователей с организациями (tenant) и
+выдаёт TelemostClient нужной организации.
+
+Файл организаций (TELEMOST_TENANTS_FILE, JSON):
+    {
+      "tenants": {
+        "acme": {"client_id": "...", "client_secret": "...", "max_connections": 5}
+      },
+      "chats": {"-1001234567890": "acme"},
+      "users": {"123456789": "acme"}
+    }
+Незаданные поля организации (адреса OAuth и API, redirect_uri, scope)
+берутся из TELEMOST_*. Чат, не найденный ни в chats, ни по пользователю в
+users, обслуживает организация по умолчанию (DEFAULT_TENANT) — клиент из
+create_app, настроенный через TELEMOST_*.
+
+Принцип работы:
+- привязки читаются один раз при старте в словари: resolve() — O(1) в памяти
+- токен каждой организации хранится в TokenStore под её ключом
+  (utils/token_store.py: отдельный JSON-файл или строка в SQLite)
+- клиенты организаций создаются лениво и живут в LRU на max_clients
+  записей; при создании запускается фоновое обновление токена (start()),
+  вытесненный клиент останавливает его и закрывает свою HTTP-сессию
+- у каждой организации свой автомат защиты (utils/telemost.py,
+  breaker_for): истёкший токен или 429 одной организации не закрывают
+  /call остальным
+- у каждой организации свой пул соединений (max_connections), чтобы одна
+  организация не выбирала соединения остальных
+- клиент организации по умолчанию не вытесняется
+
+Регистрация: TenantMiddleware подставляет в хендлеры `telemost` нужной
+организации и `tenant_id` (см. utils/middleware.py).
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any, Dict, Optional
+
+from config import (
+    TELEMOST_TENANTS_FILE,
+    TELEMOST_TENANT_CACHE_SIZE,
+    TELEMOST_TENANT_POOL_LIMIT,
+)
+from utils.telemost import DEFAULT_TENANT, TelemostClient, TelemostCredentials
+
+
+logger = logging.getLogger(__name__)
+
+_CREDENTIAL_FIELDS = {f.name for f in fields(TelemostCredentials)}
+
+
+class TenantRegistry:
+    """Привязки чатов/пользователей к организациям и LRU клиентов Telemost."""
+
+    def __init__(
+        self,
+        default_client: TelemostClient,
+        path: str = TELEMOST_TENANTS_FILE,
+        max_clients: int = TELEMOST_TENANT_CACHE_SIZE,
+        pool_limit: int = TELEMOST_TENANT_POOL_LIMIT,
+    ) -> None:
+        self.default_client = default_client
+        self.path = path
+        self.max_clients = max(max_clients, 1)
+        self.pool_limit = max(pool_limit, 1)
+        self._tenants: Dict[str, TelemostCredentials] = {}
+        self._max_connections: Dict[str, int] = {}
+        self._chats: Dict[int, str] = {}
+        self._users: Dict[int, str] = {}
+        self._clients: "OrderedDict[str, TelemostClient]" = OrderedDict()
+        # Фоновое закрытие вытесненных клиентов: задача -> клиент
+        self._closing: Dict[asyncio.Task, TelemostClient] = {}
+        # 📊 Счётчики
+        self.created = 0
+        self.evicted = 0
+        if path:
+            self.load(path)
+
+    def load(self, path: str) -> None:
+        """Читает файл организаций и привязок (вызывается при старте)."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        defaults = TelemostCredentials.from_env()
+        for tenant_id, config in (data.get("tenants") or {}).items():
+            if tenant_id == DEFAULT_TENANT:
+                raise ValueError(f"Tenant id {DEFAULT_TENANT!r} is reserved for TELEMOST_* settings")
+            values: Dict[str, Any] = {name: getattr(defaults, name) for name in _CREDENTIAL_FIELDS}
+            # Статический токен организации по умолчанию другим организациям не подходит
+            values["oauth_token"] = ""
+            values.update({k: str(v) for k, v in config.items() if k in _CREDENTIAL_FIELDS})
+            self._tenants[tenant_id] = TelemostCredentials(**values)
+            self._max_connections[tenant_id] = int(config.get("max_connections", self.pool_limit))
+        for bindings, target in ((data.get("chats") or {}, self._chats), (data.get("users") or {}, self._users)):
+            for key, tenant_id in bindings.items():
+                if tenant_id != DEFAULT_TENANT and tenant_id not in self._tenants:
+                    raise ValueError(f"Unknown tenant {tenant_id!r} bound to {key}")
+                target[int(key)] = tenant_id
+        logger.info(
+            "[Tenants] организаций: %s, чатов: %s, пользователей: %s",
+            len(self._tenants), len(self._chats), len(self._users),
+        )
+
+    def resolve(self, chat_id: Optional[int], user_id: Optional[int]) -> str:
+        """Организация чата или пользователя: привязка чата главнее привязки пользователя."""
+        if chat_id is not None:
+            tenant_id = self._chats.get(chat_id)
+            if tenant_id is not None:
+                return tenant_id
+        if user_id is not None:
+            tenant_id = self._users.get(user_id)
+            if tenant_id is not None:
+                return tenant_id
+        return DEFAULT_TENANT
+
+    def client(self, tenant_id: str) -> TelemostClient:
+        """Клиент Telemost организации (из LRU или новый)."""
+        if tenant_id == DEFAULT_TENANT or tenant_id not in self._tenants:
+            return self.default_client
+        client = self._clients.get(tenant_id)
+        if client is not None:
+            self._clients.move_to_end(tenant_id)
+            return client
+        limit = self._max_connections[tenant_id]
+        client = TelemostClient(
+            pool_limit=limit,
+            pool_limit_per_host=limit,
+            credentials=self._tenants[tenant_id],
+            tenant_id=tenant_id,
+        )
+        # client() вызывается из хендлеров, event loop уже запущен
+        client.start()
+        self._clients[tenant_id] = client
+        self.created += 1
+        while len(self._clients) > self.max_clients:
+            _, evicted = self._clients.popitem(last=False)
+            self.evicted += 1
+            self._close_later(evicted)
+        return client
+
+    def client_for(self, chat_id: Optional[int], user_id: Optional[int]) -> TelemostClient:
+        return self.client(self.resolve(chat_id, user_id))
+
+    async def _close_after_grace(self, client: TelemostClient) -> None:
+        # Запросы, уже получившие этого клиента, успевают доработать
+        await asyncio.sleep(client.request_timeout)
+        await client.close()
+
+    def _close_later(self, client: TelemostClient) -> None:
+        task = asyncio.create_task(self._close_after_grace(client))
+        self._closing[task] = client
+        task.add_done_callback(lambda done: self._closing.pop(done, None))
+
+    async def close(self) -> None:
+        """Закрывает клиентов всех организаций, кроме клиента по умолчанию."""
+        clients = [*self._clients.values(), *self._closing.values()]
+        self._clients.clear()
+        for task in list(self._closing):
+            task.cancel()
+        await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tenants": len(self._tenants),
+            "bound_chats": len(self._chats),
+            "bound_users": len(self._users),
+            "clients": len(self._clients),
+            "max_clients": self.max_clients,
+            "created": self.created,
+            "evicted": self.evicted,
+        }
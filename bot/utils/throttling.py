@@ -0,0 +1,248 @@
+"""
+🚦 ОГРАНИЧЕНИЕ ЧАСТОТЫ ДОРОГИХ КОМАНД
+
+/call, send_command из Mini App и POST /api/telemost/create создают встречу
+в Telemost и отправляют видео. Без лимита один пользователь может выбрать
+квоту Telemost и бюджет отправок Telegram. CommandThrottle ограничивает
+частоту этих действий отдельно для каждого пользователя и каждого чата.
+
+Принцип работы:
+- для каждого ключа (user_id или chat_id) — token bucket (utils/outbound.py):
+  rate действий в секунду, не больше burst подряд; память O(1) на ключ
+- все лимиты действия (пользователь и чат) сначала проверяются и только
+  потом списываются: отказ по одному лимиту не тратит токен другого
+- ключи хранятся в OrderedDict по времени последнего обращения; ключ,
+  бакет которого снова полон, ничем не отличается от нового и удаляется
+  (idle-вытеснение за O(1) амортизированно), общее число ключей
+  ограничено max_keys
+- отказ не трогает Telemost и Telegram: хендлер не вызывается, а
+  «помедленнее» отправляется один раз за серию отказов по ключу
+- stats() отдаёт число пропущенных и отклонённых действий
+
+Подключение:
+- ThrottlingMiddleware (utils/middleware.py) — inner-middleware для
+  dp.message; проверяются только хендлеры с флагом throttle:
+  @router.message(..., flags={"throttle": True})
+- команды из Mini App (web_app_data) проверяются в хендлере: дорогая только
+  send_command, остальные действия лимитом не ограничиваются
+- throttle_middleware() — aiohttp-middleware для путей HTTP API. user_id
+  в теле запроса ничем не подтверждён, поэтому ключ — адрес клиента
+  (X-Real-IP от nginx, если запрос пришёл с внутреннего адреса прокси).
+  Повтор запроса, ответ на который уже сохранён по ключу идемпотентности
+  (utils/idempotency.py), лимит не тратит и получает сохранённый ответ
+
+Настройки (config.py): THROTTLE_USER_RATE/BURST, THROTTLE_CHAT_RATE/BURST
+(rate 0 — лимит выключен), THROTTLE_MAX_KEYS.
+"""
+import ipaddress
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from aiohttp import web
+from aiogram.types import Message
+
+from config import (
+    THROTTLE_USER_RATE,
+    THROTTLE_USER_BURST,
+    THROTTLE_CHAT_RATE,
+    THROTTLE_CHAT_BURST,
+    THROTTLE_MAX_KEYS,
+)
+from utils.outbound import TokenBucket
+from utils.runtime import json_response
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("bucket", "warned")
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        self.bucket = bucket
+        # Сообщили ли уже о лимите в текущей серии отказов
+        self.warned = False
+
+
+class KeyedRateLimiter:
+    """Token bucket на ключ с вытеснением простаивающих ключей."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = THROTTLE_MAX_KEYS) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max(max_keys, 1)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _evict_idle(self, now: float) -> None:
+        # В начале — ключи, к которым давно не обращались
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_keys and not entry.bucket.idle(now):
+                break
+            del self._entries[key]
+
+    def _entry(self, key: Hashable, now: float) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _Entry(TokenBucket(self.rate, self.burst, now))
+            self._entries[key] = entry
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def check(self, key: Hashable, now: float) -> Tuple[float, bool]:
+        """
+        Проверяет токен ключа, не тратя его. Возвращает (через сколько секунд
+        повторить, первый ли это отказ в серии); (0, False) — действие разрешено.
+        """
+        entry = self._entry(key, now)
+        delay = entry.bucket.delay(now)
+        if delay > 0:
+            first = not entry.warned
+            entry.warned = True
+            return delay, first
+        return 0.0, False
+
+    def take(self, key: Hashable, now: float) -> None:
+        """Тратит токен ключа (после успешной check)."""
+        entry = self._entry(key, now)
+        entry.bucket.take(now)
+        entry.warned = False
+        self._evict_idle(now)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CommandThrottle:
+    """Лимиты на пользователя и на чат для дорогих действий."""
+
+    def __init__(
+        self,
+        user_rate: float = THROTTLE_USER_RATE,
+        user_burst: float = THROTTLE_USER_BURST,
+        chat_rate: float = THROTTLE_CHAT_RATE,
+        chat_burst: float = THROTTLE_CHAT_BURST,
+        max_keys: int = THROTTLE_MAX_KEYS,
+    ) -> None:
+        self.users = KeyedRateLimiter(user_rate, user_burst, max_keys)
+        self.chats = KeyedRateLimiter(chat_rate, chat_burst, max_keys)
+        # 📊 Счётчики
+        self.allowed = 0
+        self.rejected_user = 0
+        self.rejected_chat = 0
+
+    def check(self, user_id: Optional[Hashable], chat_id: Optional[Hashable]) -> Tuple[float, bool]:
+        """
+        Проверяет лимиты пользователя и чата. Возвращает (retry_after, notify):
+        retry_after > 0 — действие отклонено, notify — стоит ли сообщить об этом.
+        """
+        now = time.monotonic()
+        check_user = self.users.enabled and user_id is not None
+        # Личный чат совпадает с пользователем — второй лимит не нужен
+        check_chat = self.chats.enabled and chat_id is not None and chat_id != user_id
+        if check_user:
+            delay, first = self.users.check(user_id, now)
+            if delay > 0:
+                self.rejected_user += 1
+                return delay, first
+        if check_chat:
+            delay, first = self.chats.check(chat_id, now)
+            if delay > 0:
+                self.rejected_chat += 1
+                return delay, first
+        # Токены списываются, только когда пропускают все лимиты
+        if check_user:
+            self.users.take(user_id, now)
+        if check_chat:
+            self.chats.take(chat_id, now)
+        self.allowed += 1
+        return 0.0, False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "rejected_user": self.rejected_user,
+            "rejected_chat": self.rejected_chat,
+            "tracked_users": len(self.users),
+            "tracked_chats": len(self.chats),
+        }
+
+
+def _retry_seconds(retry_after: float) -> int:
+    return max(int(retry_after + 0.999), 1)
+
+
+async def reject_if_throttled(message: Message, throttle: CommandThrottle) -> bool:
+    """
+    Проверяет лимиты для сообщения. Если лимит исчерпан, один раз за серию
+    отказов отвечает «помедленнее» и возвращает True — действие выполнять не нужно.
+    """
+    user_id = message.from_user.id if message.from_user else None
+    retry_after, notify = throttle.check(user_id, message.chat.id)
+    if retry_after <= 0:
+        return False
+    logger.info("[Throttle] отклонено: user=%s chat=%s", user_id, message.chat.id)
+    if notify:
+        await message.answer(
+            "⏳ <b>Slow down!</b>\n\n"
+            f"Please try again in {_retry_seconds(retry_after)} seconds.",
+            parse_mode="HTML",
+        )
+    return True
+
+
+def _is_internal(address: Optional[str]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address or "")
+    except ValueError:
+        return False
+    return ip.is_loopback or ip.is_private
+
+
+def client_address(request: web.Request) -> Optional[str]:
+    """
+    Адрес клиента. X-Real-IP учитывается, только если запрос пришёл с
+    внутреннего адреса (nginx в той же сети), иначе заголовок можно подделать.
+    """
+    real_ip = request.headers.get("X-Real-IP")
+    if real_ip and _is_internal(request.remote):
+        return real_ip.strip()
+    return request.remote
+
+
+def throttle_middleware(
+    throttle: CommandThrottle,
+    paths: Iterable[str],
+    replayed: Optional[Callable[[web.Request], Awaitable[bool]]] = None,
+) -> Callable[..., Any]:
+    """
+    aiohttp-middleware: лимит на адрес клиента для POST-запросов к paths
+    (ответ 429). replayed(request) — ответ на запрос уже сохранён, и
+    хендлер только повторит его: такие запросы лимит не тратят.
+    """
+    limited = frozenset(paths)
+
+    @web.middleware
+    async def middleware(request: web.Request, handler: Callable[[web.Request], Awaitable[web.StreamResponse]]):
+        if request.method != "POST" or request.path not in limited:
+            return await handler(request)
+        if replayed is not None and await replayed(request):
+            return await handler(request)
+        retry_after, _ = throttle.check(f"ip:{client_address(request)}", None)
+        if retry_after <= 0:
+            return await handler(request)
+        seconds = _retry_seconds(retry_after)
+        return json_response(
+            {"ok": False, "error": "rate_limited", "retry_after": seconds},
+            status=429,
+            headers={"Retry-After": str(seconds)},
+        )
+
+    return middleware
@@ -0,0 +1,432 @@
+"""
+🔐 ХРАНИЛИЩЕ OAUTH-ТОКЕНА TELEMOST
+
+Раньше токен читался и писался обычным open/json.dump прямо из корутин:
+запись не была атомарной (сбой посреди записи портил файл), а медленный
+диск останавливал event loop. TokenStore — общий асинхронный интерфейс
+хранилища с тремя реализациями:
+
+- JsonTokenStore — JSON-файл (как раньше, TELEMOST_TOKEN_STORE): запись во
+  временный файл + fsync + os.replace, межпроцессная блокировка fcntl.flock
+  на соседнем .lock-файле
+- SqliteTokenStore — таблица tokens в SQLite (TELEMOST_TOKEN_DB): запись в
+  транзакции BEGIN IMMEDIATE, у каждой записи растущий version
+- StateTokenStore — общее состояние реплик (utils/state.py, обычно Redis):
+  update(fn) — цикл compare-and-set, запись рассылается остальным репликам
+  через pub/sub, и они сбрасывают кэш сразу, не дожидаясь cache_ttl
+
+Общее для всех трёх:
+- прочитанный токен кэшируется в памяти и перечитывается не чаще раза в
+  cache_ttl секунд, поэтому запись из другого воркера видна без обращения
+  к хранилищу на каждый запрос
+- update(fn) — атомарное чтение-изменение-запись: fn получает актуальный
+  токен, и обновление из одного процесса не затирает более новую запись
+  другого (нет lost update)
+
+У файловых хранилищ (FileTokenStore: JSON и SQLite) весь дисковый
+ввод-вывод идёт в отдельном потоке (asyncio.to_thread), а кэш сверяется с
+диском по дешёвой подписи (stat файла или version).
+
+Бэкенд выбирается в config.py: TELEMOST_TOKEN_BACKEND = json | sqlite | state.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки нет, работает один процесс
+    fcntl = None  # type: ignore[assignment]
+
+from config import (
+    TELEMOST_TOKEN_BACKEND,
+    TELEMOST_TOKEN_STORE,
+    TELEMOST_TOKEN_DB,
+    TELEMOST_TOKEN_CACHE_TTL,
+)
+from utils.singleflight import SingleFlight
+from utils.state import StateBackend, StateError, get_state_backend
+
+
+logger = logging.getLogger(__name__)
+
+Token = Dict[str, Any]
+# Функция обновления: актуальный токен с диска -> новый токен (None — удалить)
+TokenUpdate = Callable[[Optional[Token]], Optional[Token]]
+
+
+class TokenStore(ABC):
+    """
+    Хранилище одного токена с кэшем в памяти.
+
+    Наследники реализуют асинхронные _fetch (прочитать токен) и _modify
+    (атомарно применить fn); кэш, single-flight загрузки и счётчики — здесь.
+    """
+
+    def __init__(self, cache_ttl: float = TELEMOST_TOKEN_CACHE_TTL) -> None:
+        self.cache_ttl = cache_ttl
+        self._cached: Optional[Token] = None
+        self._signature: Optional[Hashable] = None
+        self._checked_at: Optional[float] = None
+        self._loads = SingleFlight()
+        # 📊 Счётчики
+        self.reads = 0
+        self.writes = 0
+
+    @abstractmethod
+    async def _fetch(self) -> Optional[Token]:
+        """Читает актуальный токен из хранилища и запоминает его (_remember)."""
+
+    @abstractmethod
+    async def _modify(self, fn: TokenUpdate) -> Tuple[Optional[Token], bool]:
+        """
+        Атомарно читает токен, вызывает fn и записывает результат.
+        Возвращает (новый токен, существовал ли токен).
+        """
+
+    def _remember(self, token: Optional[Token], signature: Optional[Hashable]) -> None:
+        self._cached = token
+        self._signature = signature
+        self._checked_at = time.monotonic()
+
+    async def load(self) -> Optional[Token]:
+        """Токен из кэша; с хранилищем сверяется не чаще раза в cache_ttl секунд."""
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.cache_ttl:
+            return self._cached
+        return await self._loads.do("load", self._fetch)
+
+    async def update(self, fn: TokenUpdate) -> Optional[Token]:
+        """Атомарное чтение-изменение-запись (см. _modify)."""
+        token, _ = await self._modify(fn)
+        return token
+
+    async def save(self, token: Token) -> None:
+        await self.update(lambda _current: token)
+
+    async def delete(self) -> bool:
+        """Удаляет токен. Возвращает True, если он был сохранён."""
+        _, existed = await self._modify(lambda _current: None)
+        return existed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "cached": self._cached is not None,
+            "reads": self.reads,
+            "writes": self.writes,
+        }
+
+
+class FileTokenStore(TokenStore):
+    """
+    Токен на локальном диске. Наследники реализуют синхронные
+    _signature_now/_read/_apply, которые вызываются в отдельном потоке.
+    """
+
+    @abstractmethod
+    def _signature_now(self) -> Optional[Hashable]:
+        """Дешёвая подпись текущего состояния (меняется при каждой записи)."""
+
+    @abstractmethod
+    def _read(self) -> Tuple[Optional[Token], Optional[Hashable]]:
+        """Читает токен и его подпись."""
+
+    @abstractmethod
+    def _apply(self, fn: TokenUpdate) -> Tuple[Optional[Token], Optional[Hashable], bool]:
+        """
+        Под межпроцессной блокировкой: читает токен, вызывает fn и записывает
+        результат. Возвращает (новый токен, подпись, существовал ли токен).
+        """
+
+    def _refresh_sync(self) -> Tuple[Optional[Token], Optional[Hashable]]:
+        signature = self._signature_now()
+        if signature is not None and signature == self._signature:
+            return self._cached, signature
+        self.reads += 1
+        return self._read()
+
+    async def _fetch(self) -> Optional[Token]:
+        token, signature = await asyncio.to_thread(self._refresh_sync)
+        self._remember(token, signature)
+        return token
+
+    async def _modify(self, fn: TokenUpdate) -> Tuple[Optional[Token], bool]:
+        token, signature, existed = await asyncio.to_thread(self._apply, fn)
+        self.writes += 1
+        self._remember(token, signature)
+        return token, existed
+
+
+class JsonTokenStore(FileTokenStore):
+    """Токен в JSON-файле с атомарной записью и fcntl-блокировкой."""
+
+    def __init__(self, path: str = TELEMOST_TOKEN_STORE, cache_ttl: float = TELEMOST_TOKEN_CACHE_TTL) -> None:
+        super().__init__(cache_ttl)
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        # Блокировка между потоками одного процесса (flock — между процессами)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _signature_now(self) -> Optional[Hashable]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # os.replace создаёт новый inode, поэтому подпись меняется при каждой записи
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read(self) -> Tuple[Optional[Token], Optional[Hashable]]:
+        signature = self._signature_now()
+        if signature is None:
+            return None, None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            logger.warning("[TokenStore] не удалось прочитать %s: %s", self.path, e)
+            return None, signature
+        return (data if isinstance(data, dict) else None), signature
+
+    def _write(self, token: Token) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".token-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(token, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _apply(self, fn: TokenUpdate) -> Tuple[Optional[Token], Optional[Hashable], bool]:
+        with self._locked():
+            current, _ = self._read()
+            token = fn(current)
+            if token is None:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+            elif token is not current:
+                self._write(token)
+            return token, self._signature_now(), current is not None
+
+
+class SqliteTokenStore(FileTokenStore):
+    """Токен в SQLite: транзакции BEGIN IMMEDIATE и счётчик версий."""
+
+    def __init__(
+        self,
+        path: str = TELEMOST_TOKEN_DB,
+        key: str = "default",
+        cache_ttl: float = TELEMOST_TOKEN_CACHE_TTL,
+    ) -> None:
+        super().__init__(cache_ttl)
+        self.path = path
+        self.key = key
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # timeout — сколько ждать блокировку, которую держит другой процесс
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                " key TEXT PRIMARY KEY, data TEXT, version INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _signature_now(self) -> Optional[Hashable]:
+        with self._lock:
+            row = self._connect().execute("SELECT version FROM tokens WHERE key = ?", (self.key,)).fetchone()
+        return row[0] if row else None
+
+    def _read(self) -> Tuple[Optional[Token], Optional[Hashable]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT data, version FROM tokens WHERE key = ?", (self.key,)
+            ).fetchone()
+        if not row:
+            return None, None
+        data, version = row
+        return (json.loads(data) if data else None), version
+
+    def _apply(self, fn: TokenUpdate) -> Tuple[Optional[Token], Optional[Hashable], bool]:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data, version FROM tokens WHERE key = ?", (self.key,)).fetchone()
+                current = json.loads(row[0]) if row and row[0] else None
+                token = fn(current)
+                if token is current:
+                    # fn оставил токен как есть — без записи и без новой версии,
+                    # иначе кэши других процессов сбрасывались бы на каждой проверке
+                    conn.execute("ROLLBACK")
+                    return token, (row[1] if row else None), current is not None
+                version = (row[1] if row else 0) + 1
+                conn.execute(
+                    "INSERT INTO tokens (key, data, version) VALUES (?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET data = excluded.data, version = excluded.version",
+                    (self.key, json.dumps(token, ensure_ascii=False) if token is not None else None, version),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return token, version, current is not None
+
+
+# Сколько раз повторять compare-and-set при одновременной записи с другой реплики
+_CAS_ATTEMPTS = 10
+
+
+class StateTokenStore(TokenStore):
+    """Токен в общем состоянии реплик: compare-and-set и инвалидация через pub/sub."""
+
+    def __init__(
+        self,
+        state: StateBackend,
+        key: str = "default",
+        cache_ttl: float = TELEMOST_TOKEN_CACHE_TTL,
+    ) -> None:
+        super().__init__(cache_ttl)
+        self.state = state
+        self.key = key
+        self.state_key = f"telemost_token:{key}"
+        self.channel = f"invalidate:telemost_token:{key}"
+        # Свои сообщения об инвалидации пропускаются
+        self._origin = uuid.uuid4().hex
+        state.subscribe(self.channel, self._on_invalidate)
+        # Запись из одного процесса — по очереди, конфликты возможны только между репликами
+        self._update_lock: Optional[asyncio.Lock] = None
+        # 📊 Счётчики
+        self.conflicts = 0
+        self.invalidations = 0
+
+    def _on_invalidate(self, message: str) -> None:
+        if message != self._origin:
+            self.invalidations += 1
+            self._checked_at = None
+
+    async def _fetch(self) -> Optional[Token]:
+        # Кэш сбрасывается по pub/sub (_on_invalidate), cache_ttl — на случай потерянного сообщения
+        raw = await self.state.get(self.state_key)
+        self.reads += 1
+        token = json.loads(raw) if raw else None
+        self._remember(token, raw)
+        return token
+
+    async def _modify(self, fn: TokenUpdate) -> Tuple[Optional[Token], bool]:
+        """Цикл compare-and-set: повтор, если токен изменила другая реплика."""
+        if self._update_lock is None:
+            self._update_lock = asyncio.Lock()
+        async with self._update_lock:
+            return await self._compare_and_set_loop(fn)
+
+    async def _compare_and_set_loop(self, fn: TokenUpdate) -> Tuple[Optional[Token], bool]:
+        for attempt in range(_CAS_ATTEMPTS):
+            raw = await self.state.get(self.state_key)
+            current = json.loads(raw) if raw else None
+            token = fn(current)
+            if token is current:
+                # fn оставил токен как есть — записывать нечего
+                self._remember(token, raw)
+                return token, current is not None
+            new_raw = json.dumps(token, ensure_ascii=False) if token is not None else None
+            if await self.state.compare_and_set(self.state_key, raw, new_raw):
+                self.writes += 1
+                self._remember(token, new_raw)
+                try:
+                    await self.state.publish(self.channel, self._origin)
+                except StateError as e:
+                    logger.warning("[TokenStore] не удалось оповестить реплики: %s", e)
+                return token, current is not None
+            # Другая реплика записала токен между get и compare_and_set
+            self.conflicts += 1
+            await asyncio.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        raise StateError(f"token {self.key!r}: too many concurrent updates")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "conflicts": self.conflicts, "invalidations": self.invalidations}
+
+
+# Хранилища на процесс: (бэкенд, путь, ключ) -> TokenStore.
+# Все клиенты Telemost в процессе делят один кэш токена
+_stores: Dict[Tuple[str, str, str], TokenStore] = {}
+
+
+def get_token_store(
+    backend: str = TELEMOST_TOKEN_BACKEND,
+    path: Optional[str] = None,
+    key: str = "default",
+) -> TokenStore:
+    """
+    Возвращает общее для процесса хранилище токена выбранного бэкенда.
+    key — организация (utils/tenants.py): в SQLite и общем состоянии это ключ
+    записи, для JSON у каждой организации кроме default свой файл рядом с
+    TELEMOST_TOKEN_STORE.
+    """
+    backend = backend.lower()
+    if backend == "state":
+        state = get_state_backend()
+        if not state.shared:
+            # Токен в памяти процесса потерялся бы при перезапуске
+            raise ValueError("TELEMOST_TOKEN_BACKEND=state requires a shared STATE_BACKEND (redis)")
+        path = ""
+    elif backend == "sqlite":
+        path = path or TELEMOST_TOKEN_DB
+    elif backend == "json":
+        if path is None:
+            root, ext = os.path.splitext(TELEMOST_TOKEN_STORE)
+            path = TELEMOST_TOKEN_STORE if key == "default" else f"{root}.{key}{ext or '.json'}"
+    else:
+        raise ValueError(f"Unknown TELEMOST_TOKEN_BACKEND: {backend!r} (expected json, sqlite or state)")
+    store_key = (backend, path, key)
+    store = _stores.get(store_key)
+    if store is None:
+        if backend == "state":
+            store = StateTokenStore(get_state_backend(), key=key)
+        elif backend == "sqlite":
+            store = SqliteTokenStore(path, key=key)
+        else:
+            store = JsonTokenStore(path)
+        _stores[store_key] = store
+    return store
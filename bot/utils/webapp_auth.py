@@ -0,0 +1,63 @@
+"""
+🔏 ПРОВЕРКА ПОДЛИННОСТИ ЗАПРОСОВ ИЗ MINI APP
+
+user_id в параметрах или теле запроса Mini App ничем не подтверждён: его
+может подставить кто угодно. Подтверждённый пользователь есть только в
+initData — строке, которую Telegram передаёт Mini App вместе с подписью
+HMAC-SHA256 на ключе из токена бота.
+
+Принцип работы:
+- Mini App отправляет initData в заголовке Authorization: tma <initData>
+  (или X-Telegram-Init-Data)
+- подпись проверяется по алгоритму Telegram
+  (aiogram.utils.web_app.safe_parse_webapp_init_data)
+- initData старше WEBAPP_INIT_DATA_TTL секунд отклоняется: перехваченная
+  строка не действует бесконечно
+- webapp_user_id() возвращает id пользователя из initData или None
+
+Пример:
+    user_id = webapp_user_id(request, BOT_TOKEN)
+    if user_id is None:
+        return json_response({"ok": False, "error": "unauthorized"}, status=401)
+"""
+import logging
+import time
+from typing import Optional
+
+from aiohttp import web
+from aiogram.utils.web_app import safe_parse_webapp_init_data
+
+from config import WEBAPP_INIT_DATA_TTL
+from utils.runtime import json_loads
+
+
+logger = logging.getLogger(__name__)
+
+_AUTH_SCHEME = "tma "
+
+
+def request_init_data(request: web.Request) -> Optional[str]:
+    """Сырая строка initData из заголовков запроса."""
+    authorization = request.headers.get("Authorization", "")
+    if authorization[:len(_AUTH_SCHEME)].lower() == _AUTH_SCHEME:
+        return authorization[len(_AUTH_SCHEME):].strip() or None
+    return request.headers.get("X-Telegram-Init-Data") or None
+
+
+def webapp_user_id(
+    request: web.Request,
+    bot_token: str,
+    max_age: float = WEBAPP_INIT_DATA_TTL,
+) -> Optional[int]:
+    """id пользователя из подписанной initData; None — initData нет, подпись неверна или устарела."""
+    init_data = request_init_data(request)
+    if not init_data:
+        return None
+    try:
+        data = safe_parse_webapp_init_data(bot_token, init_data, loads=json_loads)
+    except ValueError:
+        logger.info("[WebAppAuth] неверная подпись initData от %s", request.remote)
+        return None
+    if max_age > 0 and time.time() - data.auth_date.timestamp() > max_age:
+        return None
+    return data.user.id if data.user is not None else None
@@ -1,13 +1,25 @@
 import asyncio
 import logging
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
 from aiohttp import web
 from aiogram import Bot, Dispatcher
-
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InlineQueryResultVideo, FSInputFile
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from aiogram.types import (
+    InlineKeyboardMarkup,
+    InlineKeyboardButton,
+    InlineQueryResultVideo,
+    InlineQueryResultCachedVideo,
+    PreparedInlineMessage,
+)
 from urllib.parse import quote_plus
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramRetryAfter
 from pathlib import Path
 
 # Импортируем конфигурацию и обработчики
@@ -17,15 +29,78 @@ from config import (
     WEBHOOK_PATH,
     WEBAPP_HOST,
     WEBAPP_PORT,
+    WEBHOOK_INGEST_MODE,
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    PREPARED_MESSAGE_TTL,
+    PREPARED_MESSAGE_CACHE_SIZE,
+    PREPARED_MESSAGE_EXPIRY_MARGIN,
+    MEETING_RECENT_LIMIT,
+    API_DEADLINE,
+    WEB_PROCESSES,
+    WEB_SHUTDOWN_TIMEOUT,
+    FAST_RUNTIME,
 )
 from handlers import start, common
-from utils.telemost import TelemostClient
+from handlers.common import REPLY_TEXT_FALLBACK, REPLY_VIDEO, build_video_call_reply
+from utils.telemost import TelemostClient, breaker_stats
+from utils.meeting_pool import MeetingPool
+from utils.call_coalescing import ChatCallCoalescer
+from utils.meeting_registry import MeetingRegistry
+from utils.meeting_gc import MeetingGarbageCollector
+from utils.assets import AssetRegistry
+from utils.delivery import DeliveryQueue
+from utils.outbound import OutboundScheduler, bulk_priority
+from utils.singleflight import SingleFlight
+from utils.ingestion import QueuedRequestHandler
+from utils.middleware import (
+    DeadlineMiddleware,
+    MetricsMiddleware,
+    TenantMiddleware,
+    ThrottlingMiddleware,
+    UpdateDedupMiddleware,
+)
+from utils.throttling import CommandThrottle, throttle_middleware
+from utils.webapp_auth import webapp_user_id
+from utils.metrics import REGISTRY, http_metrics_middleware
+from utils.supervisor import WorkerSupervisor, exit_with_parent, is_leader, reuseport_socket, worker_index
+from utils.diagnostics import (
+    LoopLagMonitor,
+    MemoryDiagnostics,
+    MemorySampler,
+    ProfilerBusyError,
+    SamplingProfiler,
+    admin_only,
+)
+from utils.tenants import TenantRegistry
+from utils.resilience import CircuitOpenError, deadline
+from utils.idempotency import IdempotencyStore, StoredResponse
+from utils.state import SharedCache, StateBackend, get_state_backend
+from utils.runtime import enable_fast_runtime, json_dumps, json_loads, json_response
+from utils import runtime
 
 # 🌐 Настройки webhook для продакшена (из переменных окружения)
 WEBHOOK_URL = f"{WEBHOOK_HOST}{WEBHOOK_PATH}" if WEBHOOK_HOST else ""
 
-# 💾 Словарь для хранения подготовленных сообщений по пользователям
-prepared_messages = {}
+# 🔑 Ключи общих объектов в web.Application
+TELEMOST_KEY = web.AppKey("telemost", TelemostClient)
+TENANTS_KEY = web.AppKey("tenants", TenantRegistry)
+MEETING_POOL_KEY = web.AppKey("meeting_pool", MeetingPool)
+CALL_COALESCER_KEY = web.AppKey("call_coalescer", ChatCallCoalescer)
+MEETING_REGISTRY_KEY = web.AppKey("meeting_registry", MeetingRegistry)
+MEETING_GC_KEY = web.AppKey("meeting_gc", MeetingGarbageCollector)
+DELIVERY_KEY = web.AppKey("delivery", DeliveryQueue)
+OUTBOUND_KEY = web.AppKey("outbound", OutboundScheduler)
+PREPARED_CACHE_KEY = web.AppKey("prepared_cache", SharedCache)
+PREPARED_FLIGHTS_KEY = web.AppKey("prepared_flights", SingleFlight)
+INGESTION_KEY = web.AppKey("ingestion", QueuedRequestHandler)
+DEDUP_KEY = web.AppKey("dedup", UpdateDedupMiddleware)
+IDEMPOTENCY_KEY = web.AppKey("idempotency", IdempotencyStore)
+THROTTLE_KEY = web.AppKey("throttle", CommandThrottle)
+PROFILER_KEY = web.AppKey("profiler", SamplingProfiler)
+LOOP_LAG_KEY = web.AppKey("loop_lag", LoopLagMonitor)
+MEMORY_KEY = web.AppKey("memory", MemoryDiagnostics)
+MEMORY_SAMPLER_KEY = web.AppKey("memory_sampler", MemorySampler)
+STATE_KEY = web.AppKey("shared_state", StateBackend)
 
 # 📝 Настройка логирования
 logging.basicConfig(
@@ -35,7 +110,9 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def create_prepared_message_for_user(user_id: int, bot: Bot, video_call_url: str = ""):
+async def create_prepared_message_for_user(
+    user_id: int, bot: Bot, assets: AssetRegistry, video_call_url: str = ""
+) -> Optional[PreparedInlineMessage]:
     """Создает шаблонное сообщение для конкретного пользователя"""
     try:
         # Создаем inline-результат с шаблонным сообщением
@@ -55,20 +132,32 @@ async def create_prepared_message_for_user(user_id: int, bot: Bot, video_call_ur
         video_url = f"https://telemosts.com/bot/telemost/app/friends.mp4"
         thumbnail_url = f"https://telemosts.com/bot/telemost/app/assets/friends-thumb.jpg"  # Если есть превью
 
-        inline_result = InlineQueryResultVideo(
-            id=f"video_call_invitation_{user_id}",
-            video_url=video_url,  # Публичный URL (обязательно)
-            thumbnail_url=thumbnail_url,  # Превью URL (обязательно)
-            mime_type="video/mp4",
-            title="🎥 Video Call Invitation",
-            caption=text,
-            parse_mode="HTML",
-            reply_markup=keyboard_rows,
-            video_width=640,  # Укажите реальные размеры вашего видео
-            video_height=480,
-            video_duration=10,  # Длительность в секундах
-        )
-        print(1)
+        # Если friends.mp4 уже загружен в Telegram — отправляем по file_id,
+        # иначе Telegram сам скачает видео и превью по публичным URL
+        friends_file_id = await assets.file_id("friends.mp4")
+        if friends_file_id:
+            inline_result = InlineQueryResultCachedVideo(
+                id=f"video_call_invitation_{user_id}",
+                video_file_id=friends_file_id,
+                title="🎥 Video Call Invitation",
+                caption=text,
+                parse_mode="HTML",
+                reply_markup=keyboard_rows,
+            )
+        else:
+            inline_result = InlineQueryResultVideo(
+                id=f"video_call_invitation_{user_id}",
+                video_url=video_url,  # Публичный URL (обязательно)
+                thumbnail_url=thumbnail_url,  # Превью URL (обязательно)
+                mime_type="video/mp4",
+                title="🎥 Video Call Invitation",
+                caption=text,
+                parse_mode="HTML",
+                reply_markup=keyboard_rows,
+                video_width=640,  # Укажите реальные размеры вашего видео
+                video_height=480,
+                video_duration=10,  # Длительность в секундах
+            )
         # Сохраняем подготовленное сообщение для конкретного пользователя
         result = await bot.save_prepared_inline_message(
             user_id=user_id,
@@ -78,20 +167,126 @@ async def create_prepared_message_for_user(user_id: int, bot: Bot, video_call_ur
  
         )
         
-        prepared_messages[user_id] = result.id
         logger.info(f"[OK] Подготовленное сообщение создано для пользователя {user_id} с ID: {result.id}")
-        return result.id
+        return result
         
     except Exception as e:
         logger.error(f"[ERROR] Ошибка создания подготовленного сообщения для пользователя {user_id}: {e}")
         return None
 
 
-async def on_startup(bot: Bot) -> None:
+async def get_prepared_message_id(
+    user_id: int,
+    bot: Bot,
+    assets: AssetRegistry,
+    cache: SharedCache,
+    flights: SingleFlight,
+    video_call_url: str = "",
+) -> Optional[str]:
+    """
+    Возвращает ID подготовленного сообщения для (user_id, video_call_url):
+    из кэша без обращения к Bot API, а при промахе — создаёт новое.
+    Одновременные запросы с одним ключом ждут одного вызова Bot API.
+    Запись живёт не дольше срока, выданного Telegram (expiration_date).
+    С общим состоянием сообщение, созданное одной репликой, берут и остальные.
+    """
+    key = f"{user_id}:{video_call_url}"
+    message_id = await cache.get(key)
+    if message_id:
+        return message_id
+
+    async def _create() -> Optional[str]:
+        result = await create_prepared_message_for_user(user_id, bot, assets, video_call_url)
+        if result is None:
+            return None
+        ttl = result.expiration_date.timestamp() - time.time() - PREPARED_MESSAGE_EXPIRY_MARGIN
+        await cache.set(key, result.id, ttl=ttl)
+        return result.id
+
+    return await flights.do(key, _create)
+
+
+async def notify_call_ready(bot: Bot, assets: AssetRegistry, chat_id: int, url: str) -> None:
+    """
+    📬 ФОНОВАЯ ЗАДАЧА ДОСТАВКИ
+
+    Отправляет пользователю сообщение о готовой встрече (видео с кнопками,
+    при ошибке видео — текст). Выполняется воркерами DeliveryQueue, поэтому
+    отправки идут с фоновым приоритетом и уступают ответам на команды.
+    """
+    text, keyboard_inline = build_video_call_reply(url)
+    with bulk_priority():
+        try:
+            # Видео отправляется по сохранённому file_id, загрузка — только в первый раз
+            await assets.send_video(
+                "call.mp4",
+                lambda video: bot.send_video(
+                    chat_id=chat_id,
+                    video=video,
+                    caption=text,
+                    supports_streaming=True,
+                    reply_markup=keyboard_inline,
+                    parse_mode=ParseMode.HTML,
+                ),
+            )
+            REPLY_VIDEO.inc()
+        except TelegramRetryAfter:
+            # Пусть DeliveryQueue повторит задачу позже, а не шлёт текст в тот же лимит
+            raise
+        except Exception as video_err:
+            logger.warning("Failed to send video, fallback to text: %s", video_err)
+            # Fallback на текстовое сообщение
+            await bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                reply_markup=keyboard_inline,
+                parse_mode=ParseMode.HTML,
+                disable_web_page_preview=True,
+            )
+            REPLY_TEXT_FALLBACK.inc()
+
+
+async def _json_object(request: web.Request) -> Dict[str, Any]:
+    """JSON-объект из тела запроса; {} — если тело не JSON-объект (aiohttp кэширует тело)."""
+    try:
+        payload = await request.json(loads=json_loads)
+    except Exception:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+async def on_startup(
+    bot: Bot,
+    telemost: TelemostClient,
+    meeting_pool: MeetingPool,
+    meeting_gc: MeetingGarbageCollector,
+    assets: AssetRegistry,
+    delivery: DeliveryQueue,
+    loop_lag: LoopLagMonitor,
+    memory_sampler: MemorySampler,
+    shared_state: StateBackend,
+) -> None:
     """
     🚀 ФУНКЦИЯ ЗАПУСКА WEBHOOK
-    Устанавливает webhook URL в Telegram при старте приложения.
+    Устанавливает webhook URL в Telegram при старте приложения,
+    запускает фоновое обновление токена Telemost, наполнение пула встреч,
+    воркеры фоновой доставки, очистку старых встреч, сторож event loop,
+    замеры памяти, подписки общего состояния и предзагрузку видео в Telegram.
+
+    При нескольких процессах (WEB_PROCESSES) webhook, очистку встреч и
+    предзагрузку видео выполняет только ведущий воркер.
     """
+    loop_lag.start()
+    memory_sampler.start()
+    shared_state.start()
+    telemost.start()
+    meeting_pool.start()
+    delivery.start()
+    if not is_leader():
+        logger.info("Worker %s started (webhook is managed by worker 0)", worker_index())
+        return
+    meeting_gc.start()
+    asyncio.create_task(assets.warmup(bot))
     try:
         # Устанавливаем webhook, если указан хост
         if not WEBHOOK_URL:
@@ -130,17 +325,42 @@ async def on_startup(bot: Bot) -> None:
         asyncio.create_task(_retry_set_webhook())
 
 
-async def on_shutdown(bot: Bot) -> None:
+async def on_shutdown(
+    bot: Bot,
+    telemost: TelemostClient,
+    meeting_pool: MeetingPool,
+    meeting_registry: MeetingRegistry,
+    meeting_gc: MeetingGarbageCollector,
+    tenants: TenantRegistry,
+    delivery: DeliveryQueue,
+    outbound: OutboundScheduler,
+    loop_lag: LoopLagMonitor,
+    memory_sampler: MemorySampler,
+    shared_state: StateBackend,
+) -> None:
     """
     🛑 ФУНКЦИЯ ОСТАНОВКИ WEBHOOK
     
-    Удаляет webhook из Telegram при остановке приложения.
+    Удаляет webhook из Telegram при остановке приложения, досылает фоновую
+    очередь доставки, останавливает пул встреч и закрывает общую
+    HTTP-сессию клиента Telemost.
     """
-    try:
-        await bot.delete_webhook()
-        # Webhook removed
-    except Exception as e:
-        logger.error(f"❌ Error removing webhook: {e}")
+    if is_leader():
+        try:
+            await bot.delete_webhook()
+            # Webhook removed
+        except Exception as e:
+            logger.error(f"❌ Error removing webhook: {e}")
+    await delivery.stop()
+    await outbound.close()
+    await meeting_gc.stop()
+    await meeting_pool.stop()
+    await tenants.close()
+    await telemost.close()
+    await asyncio.to_thread(meeting_registry.close)
+    await loop_lag.stop()
+    await memory_sampler.stop()
+    await shared_state.close()
 
 
 async def health_check(request):
@@ -149,13 +369,118 @@ async def health_check(request):
     
     Проверка состояния сервиса для мониторинга.
     """
-    return web.json_response({
-        "status": "ok",
+    ingestion = request.app.get(INGESTION_KEY)
+    breaker = request.app[TELEMOST_KEY].breaker.stats()
+    return json_response({
+        # degraded — Telemost недоступен, /call отвечает без создания встречи
+        "status": "ok" if breaker["state"] == "closed" else "degraded",
         "service": "telegram-bot",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "worker": worker_index(),
+        "runtime": runtime.stats(),
+        "telemost_breaker": breaker,
+        # Все автоматы процесса: "организация/роль" (interactive, background)
+        "telemost_breakers": breaker_stats(),
+        "tenants": request.app[TENANTS_KEY].stats(),
+        "meeting_pool": request.app[MEETING_POOL_KEY].stats(),
+        "call_coalescing": request.app[CALL_COALESCER_KEY].stats(),
+        "meeting_registry": request.app[MEETING_REGISTRY_KEY].stats(),
+        "meeting_gc": request.app[MEETING_GC_KEY].stats(),
+        "delivery": request.app[DELIVERY_KEY].stats(),
+        "outbound": request.app[OUTBOUND_KEY].stats(),
+        "prepared_messages": {
+            **request.app[PREPARED_CACHE_KEY].stats(),
+            "coalesced": request.app[PREPARED_FLIGHTS_KEY].collapsed,
+        },
+        "ingestion": ingestion.stats() if ingestion else None,
+        "dedup": request.app[DEDUP_KEY].stats(),
+        "idempotency": request.app[IDEMPOTENCY_KEY].stats(),
+        "throttling": request.app[THROTTLE_KEY].stats(),
+        "loop_lag": request.app[LOOP_LAG_KEY].stats(),
+        "memory": request.app[MEMORY_SAMPLER_KEY].stats(),
+        "shared_state": request.app[STATE_KEY].stats(),
     })
 
 
+async def metrics_handler(request):
+    """
+    📈 PROMETHEUS METRICS
+
+    Гистограммы и счётчики горячих путей плюс числовые поля stats()
+    компонентов (см. utils/metrics.py).
+    """
+    return web.Response(
+        body=REGISTRY.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+@admin_only
+async def admin_profile(request):
+    """
+    🔥 ПРОФИЛИРОВАНИЕ ПО ЗАПРОСУ
+
+    GET /admin/profile?seconds=10[&thread=loop] — снимает стеки seconds секунд
+    и возвращает collapsed stacks для flamegraph. thread=loop — только поток
+    event loop.
+    """
+    profiler = request.app[PROFILER_KEY]
+    try:
+        seconds = float(request.query.get("seconds", "10"))
+    except ValueError:
+        return json_response({"ok": False, "error": "invalid_seconds"}, status=400)
+    # Хендлер выполняется в потоке event loop
+    thread_ident = threading.get_ident() if request.query.get("thread") == "loop" else None
+    try:
+        stacks = await asyncio.to_thread(profiler.profile, seconds, thread_ident)
+    except ProfilerBusyError:
+        return json_response({"ok": False, "error": "profiler_busy"}, status=409)
+    return web.Response(text=profiler.collapse(stacks), content_type="text/plain")
+
+
+@admin_only
+async def admin_loop_lag(request):
+    """🐢 Последние блокировки event loop со стеками."""
+    monitor = request.app[LOOP_LAG_KEY]
+    return json_response({**monitor.stats(), "events": list(monitor.events)})
+
+
+@admin_only
+async def admin_memory(request):
+    """
+    🧠 ДИАГНОСТИКА ПАМЯТИ
+
+    GET    /admin/memory            — последний замер (?sample=1 — замерить сейчас)
+    POST   /admin/memory/snapshot   — включить tracemalloc и запомнить базовый снимок
+    GET    /admin/memory/diff       — рост по местам выделения с базового снимка
+                                      (?limit=20&group_by=lineno|filename|traceback)
+    DELETE /admin/memory/snapshot   — выключить tracemalloc
+    """
+    memory = request.app[MEMORY_KEY]
+    sampler = request.app[MEMORY_SAMPLER_KEY]
+    action = request.match_info.get("action", "")
+    if action == "snapshot" and request.method == "POST":
+        return json_response(await asyncio.to_thread(memory.snapshot))
+    if action == "snapshot" and request.method == "DELETE":
+        await asyncio.to_thread(memory.stop)
+        return json_response(memory.stats())
+    if action == "diff":
+        group_by = request.query.get("group_by", "lineno")
+        if group_by not in ("lineno", "filename", "traceback"):
+            return json_response({"ok": False, "error": "invalid_group_by"}, status=400)
+        try:
+            limit = int(request.query.get("limit", "20"))
+            return json_response(await asyncio.to_thread(memory.diff, limit, group_by))
+        except ValueError:
+            return json_response({"ok": False, "error": "invalid_limit"}, status=400)
+        except LookupError:
+            return json_response({"ok": False, "error": "no_baseline"}, status=409)
+    if action:
+        raise web.HTTPNotFound()
+    last = await sampler.sample() if request.query.get("sample") == "1" else sampler.last
+    return json_response({"sample": last, "tracemalloc": memory.stats()})
+
+
 def create_app() -> web.Application:
     """
     🏗️ СОЗДАНИЕ WEB-ПРИЛОЖЕНИЯ
@@ -168,11 +493,77 @@ def create_app() -> web.Application:
     # Создаем бота
     bot = Bot(
         token=BOT_TOKEN,
+        # Кодек JSON профиля рантайма: ответы Bot API и тела обновлений webhook
+        session=AiohttpSession(json_loads=json_loads, json_dumps=json_dumps),
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    # Все вызовы Bot API идут через планировщик с лимитами Telegram
+    outbound = OutboundScheduler()
+    bot.session.middleware(outbound)
     
-    # Создаем диспетчер
+    # Общий клиент Telemost с пулом соединений (один на всё приложение)
+    telemost = TelemostClient()
+    # Организации Яндекс 360 по чатам/пользователям (TELEMOST_TENANTS_FILE пуст — одна)
+    tenants = TenantRegistry(telemost)
+    # Реестр выданных встреч (SQLite): повторное использование и список комнат для Mini App
+    meeting_registry = MeetingRegistry()
+    # Пул заранее созданных встреч (TELEMOST_MEETING_POOL_SIZE=0 — выключен);
+    # устаревшие встречи, которые не удалось удалить, уходят в реестр для очистки
+    meeting_pool = MeetingPool(telemost, registry=meeting_registry)
+    # /call в одном групповом чате в пределах окна получают одну встречу
+    call_coalescer = ChatCallCoalescer(meeting_pool, meeting_registry)
+    # Очистка старых встреч: своя маленькая сессия, уступает запросам /call
+    meeting_gc = MeetingGarbageCollector(meeting_registry, telemost)
+    # Реестр file_id для видео из assets (загрузка в Telegram один раз)
+    assets = AssetRegistry(Path(__file__).parent / "assets")
+    # Фоновая доставка сообщений из HTTP API
+    delivery = DeliveryQueue()
+    # Общее состояние реплик (STATE_BACKEND): кэши, дедупликация, идемпотентность
+    shared_state = get_state_backend()
+    # Кэш подготовленных inline-сообщений: (user_id, video_call_url) -> id
+    prepared_cache = SharedCache(
+        shared_state, "prepared_message", maxsize=PREPARED_MESSAGE_CACHE_SIZE, ttl=PREPARED_MESSAGE_TTL
+    )
+    # Одновременные промахи по одному ключу объединяются в один вызов Bot API
+    prepared_flights = SingleFlight()
+    # Ответы /api/telemost/create по ключам идемпотентности
+    idempotency = IdempotencyStore(state=shared_state)
+    # Лимиты частоты /call и создания встреч: общие для бота и HTTP API
+    throttle = CommandThrottle()
+    # Диагностика: профилировщик по запросу и сторож блокировок event loop
+    profiler = SamplingProfiler()
+    loop_lag = LoopLagMonitor()
+    memory = MemoryDiagnostics()
+    memory_sampler = MemorySampler()
+
+    # Создаем диспетчер; зависимости попадают в хендлеры как одноимённые аргументы
     dp = Dispatcher()
+    dp["telemost"] = telemost
+    dp["tenants"] = tenants
+    dp["meeting_pool"] = meeting_pool
+    dp["call_coalescer"] = call_coalescer
+    dp["meeting_registry"] = meeting_registry
+    dp["meeting_gc"] = meeting_gc
+    dp["assets"] = assets
+    dp["delivery"] = delivery
+    dp["outbound"] = outbound
+    dp["throttle"] = throttle
+    dp["loop_lag"] = loop_lag
+    dp["memory_sampler"] = memory_sampler
+    # Не "state": это имя aiogram занимает под FSMContext
+    dp["shared_state"] = shared_state
+
+    # Общий дедлайн на обработку обновления (видят вызовы Telemost внутри хендлеров)
+    dp.update.outer_middleware(DeadlineMiddleware())
+    # telemost в хендлерах — клиент организации чата
+    dp.update.outer_middleware(TenantMiddleware(tenants))
+    # Повторные доставки одного и того же update_id до хендлеров не доходят
+    dedup = UpdateDedupMiddleware(state=shared_state)
+    dp.update.outer_middleware(dedup)
+    # Лимит частоты для хендлеров с флагом throttle (/call); отказ не трогает Telemost
+    dp.message.middleware(ThrottlingMiddleware(throttle))
+    # Время работы каждого хендлера и обновления в обработке (/metrics)
+    MetricsMiddleware().register(dp)
     
     # Регистрируем роутеры
     dp.include_router(start.router)
@@ -182,99 +573,194 @@ def create_app() -> web.Application:
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
     
+    async def is_idempotent_replay(request: web.Request) -> bool:
+        """Повтор /api/telemost/create, ответ на который уже сохранён по ключу идемпотентности."""
+        payload = await _json_object(request)
+        idempotency_key = request.headers.get("Idempotency-Key") or payload.get("idempotency_key")
+        if not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+            return False
+        return await idempotency.has_response((str(payload.get("user_id")), idempotency_key))
+
     # Создаем веб-приложение
-    app = web.Application()
+    app = web.Application(middlewares=[
+        # Первым: в латентность попадают и отказы по лимиту
+        http_metrics_middleware,
+        throttle_middleware(throttle, ["/api/telemost/create"], replayed=is_idempotent_replay),
+    ])
+    app[TELEMOST_KEY] = telemost
+    app[TENANTS_KEY] = tenants
+    app[MEETING_POOL_KEY] = meeting_pool
+    app[CALL_COALESCER_KEY] = call_coalescer
+    app[MEETING_REGISTRY_KEY] = meeting_registry
+    app[MEETING_GC_KEY] = meeting_gc
+    app[DELIVERY_KEY] = delivery
+    app[OUTBOUND_KEY] = outbound
+    app[PREPARED_CACHE_KEY] = prepared_cache
+    app[PREPARED_FLIGHTS_KEY] = prepared_flights
+    app[DEDUP_KEY] = dedup
+    app[IDEMPOTENCY_KEY] = idempotency
+    app[THROTTLE_KEY] = throttle
+    app[PROFILER_KEY] = profiler
+    app[LOOP_LAG_KEY] = loop_lag
+    app[MEMORY_KEY] = memory
+    app[MEMORY_SAMPLER_KEY] = memory_sampler
+    app[STATE_KEY] = shared_state
     
     # Настраиваем webhook handler
-    SimpleRequestHandler(
-        dispatcher=dp,
-        bot=bot
-    ).register(app, path=WEBHOOK_PATH)
+    if WEBHOOK_INGEST_MODE == "queue":
+        # Сразу отвечаем Telegram, обновления обрабатывают воркеры (порядок по чатам сохраняется)
+        ingestion = QueuedRequestHandler(dispatcher=dp, bot=bot)
+        ingestion.register(app, path=WEBHOOK_PATH)
+        app[INGESTION_KEY] = ingestion
+    else:
+        SimpleRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            handle_in_background=WEBHOOK_INGEST_MODE == "background",
+        ).register(app, path=WEBHOOK_PATH)
     
     # Добавляем health check
     app.router.add_get("/health", health_check)
+
+    # Метрики Prometheus: stats() компонентов собираются в момент опроса
+    REGISTRY.add_collector("telemost", lambda: {
+        "in_flight": telemost.in_flight,
+        "breakers": breaker_stats(),
+    })
+    for prefix, component in (
+        ("tenants", tenants),
+        ("meeting_pool", meeting_pool),
+        ("call_coalescing", call_coalescer),
+        ("meeting_registry", meeting_registry),
+        ("meeting_gc", meeting_gc),
+        ("delivery", delivery),
+        ("outbound", outbound),
+        ("prepared_messages", prepared_cache),
+        ("dedup", dedup),
+        ("idempotency", idempotency),
+        ("throttling", throttle),
+        ("shared_state", shared_state),
+    ):
+        REGISTRY.add_collector(prefix, component.stats)
+    if INGESTION_KEY in app:
+        REGISTRY.add_collector("ingestion", app[INGESTION_KEY].stats)
+    app.router.add_get("/metrics", metrics_handler)
+
+    # Диагностика для администратора (Authorization: Bearer ADMIN_TOKEN)
+    app.router.add_get("/admin/profile", admin_profile)
+    app.router.add_get("/admin/loop-lag", admin_loop_lag)
+    app.router.add_get("/admin/memory", admin_memory)
+    app.router.add_route("POST", "/admin/memory/{action:snapshot}", admin_memory)
+    app.router.add_route("DELETE", "/admin/memory/{action:snapshot}", admin_memory)
+    app.router.add_get("/admin/memory/{action:diff}", admin_memory)
     
     # Раздача статических файлов
     assets_path = Path(__file__).parent / "assets"
     app.router.add_static("/assets/", assets_path, name="assets")
 
     # API: создание встречи Telemost
+    async def create_telemost_for_user(user_id: Any) -> StoredResponse:
+        """Создаёт встречу и ставит в очередь сообщение пользователю."""
+        try:
+            chat_id: Optional[int] = int(user_id) if user_id else None
+        except (TypeError, ValueError):
+            logger.warning("Invalid user_id in /api/telemost/create: %r", user_id)
+            chat_id = None
+
+        # Очередь доставки переполнена — не создаём встречу, о которой не сможем сообщить
+        if chat_id is not None and not delivery.accepting():
+            logger.warning("Delivery queue is full, /api/telemost/create rejected for chat %s", chat_id)
+            return 503, {"ok": False, "error": "delivery_overloaded", "retry_after": round(delivery.retry_after(), 1)}
+
+        # Встреча записывается в реестр как созданная в личном чате пользователя
+        try:
+            url = await call_coalescer.acquire(
+                chat_id,
+                title="Meeting without confirmation",
+                user_id=chat_id,
+                client=tenants.client_for(chat_id, chat_id),
+            )
+        except CircuitOpenError as e:
+            # Не сохраняется по ключу идемпотентности: повтор после паузы создаст встречу
+            return 503, {"ok": False, "error": "telemost_unavailable", "retry_after": round(e.retry_in, 1)}
+        if not url:
+            logger.error("❌ Telemost did not return meeting URL")
+            return 500, {"ok": False, "error": "create_failed"}
+
+        # Если знаем пользователя, продублируем сообщение в чат с кнопками.
+        # Доставка идёт в фоне: Mini App получает ссылку, не дожидаясь Telegram
+        if chat_id is not None and not delivery.submit(
+            f"notify_call_ready:{chat_id}",
+            lambda: notify_call_ready(bot, assets, chat_id, url),
+        ):
+            # Очередь заполнилась, пока создавалась встреча: ссылка уже есть, отдаём её без сообщения в чат
+            logger.warning("Call-ready message for chat %s dropped: delivery queue is full", chat_id)
+            return 200, {"ok": True, "url": url, "notified": False}
+
+        return 200, {"ok": True, "url": url}
+
     async def api_create_telemost(request: web.Request) -> web.Response:
         try:
             # Читаем user_id из JSON тела (передаётся из Mini App)
-            try:
-                payload = await request.json()
-            except Exception:
-                payload = {}
+            payload = await _json_object(request)
             user_id = payload.get("user_id")
 
-            client = TelemostClient()
-            url = await client.create_conference(title="Meeting without confirmation")
-            if not url:
-                logger.error("❌ Telemost did not return meeting URL")
-                return web.json_response({"ok": False, "error": "create_failed"}, status=500)
-
-            # Если знаем пользователя, продублируем сообщение в чат с кнопками
-            if user_id:
-                try:
-         
-                    share_text = quote_plus(f"👋 Join my video call!")
-                    share_url = f"https://t.me/share/url?text={share_text}&url={quote_plus(url)}"
-                    keyboard_inline = InlineKeyboardMarkup(
-                        inline_keyboard=[[
-                            InlineKeyboardButton(text="▶️ Open Call", url=url),],[
-                            InlineKeyboardButton(text="➕ Invite Friends", url=share_url),
-                        ]]
-                    )
-                    video_path = Path(__file__).parent / "assets" / "call.mp4"
-                    logger.info(f"Video path: {video_path}")
-                    text=(
-                            f"✅ Your video call is <a href='{url}'>ready!</a>\n"
-                            f"📢 <a href='{share_url}'>Invite your</a> friends to join.\n"
+            # Ключ идемпотентности: повтор с тем же ключом не создаёт вторую встречу
+            idempotency_key = request.headers.get("Idempotency-Key") or payload.get("idempotency_key")
+            if idempotency_key and (
+                not isinstance(idempotency_key, str) or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH
+            ):
+                return json_response({"ok": False, "error": "invalid_idempotency_key"}, status=400)
+
+            # Бюджет времени на весь запрос: вызовы Telemost не ждут дольше остатка
+            with deadline(API_DEADLINE):
+                if idempotency_key:
+                    status, body = await idempotency.run(
+                        (str(user_id), idempotency_key),
+                        lambda: create_telemost_for_user(user_id),
                     )
-          
-
-                    # Проверяем, что видео существует и не пустое
-                    if video_path.exists() and video_path.stat().st_size > 0:
-                        try:
-                            await bot.send_video(
-                                chat_id=int(user_id),
-                                video=FSInputFile(video_path),
-                                caption=text,
-                                supports_streaming=True,
-                                reply_markup=keyboard_inline,
-                                parse_mode=ParseMode.HTML,
-    
-                            )
-                        except Exception as video_err:
-                            logger.warning("Failed to send video, fallback to text: %s", video_err)
-                            # Fallback на текстовое сообщение
-                            await bot.send_message(
-                                chat_id=int(user_id),
-                                text=text,
-                                reply_markup=keyboard_inline,
-                                parse_mode=ParseMode.HTML,
-                                disable_web_page_preview=True,
-                            )
-                    else:
-                        logger.warning("Video not found, sending text message")
-                        await bot.send_message(
-                            chat_id=int(user_id),
-                            text=text,
-                            reply_markup=keyboard_inline,
-                            parse_mode=ParseMode.HTML,
-                            disable_web_page_preview=True,
-                        )
-                except Exception as send_err:
-                    logger.warning("Failed to send message to user %s: %s", user_id, send_err)
-
-            return web.json_response({"ok": True, "url": url})
+                else:
+                    status, body = await create_telemost_for_user(user_id)
+            headers = {"Retry-After": str(max(int(body["retry_after"]), 1))} if "retry_after" in body else None
+            return json_response(body, status=status, headers=headers)
         except Exception as e:
             logger.error(f"❌ API error /api/telemost/create: {e}")
-            return web.json_response({"ok": False, "error": str(e)}, status=500)
+            return json_response({"ok": False, "error": str(e)}, status=500)
 
     app.router.add_post("/api/telemost/create", api_create_telemost)
 
+    # API: последние комнаты пользователя из реестра встреч (Authorization: tma <initData>)
+    async def api_get_recent_rooms(request: web.Request) -> web.Response:
+        # Ссылки на встречи отдаются только их владельцу: пользователь — из подписанной initData
+        user_id = webapp_user_id(request, BOT_TOKEN)
+        if user_id is None:
+            return json_response({"ok": False, "error": "unauthorized"}, status=401)
+        try:
+            limit = min(int(request.query.get("limit", MEETING_RECENT_LIMIT)), MEETING_RECENT_LIMIT)
+        except ValueError:
+            limit = MEETING_RECENT_LIMIT
+        try:
+            meetings = await meeting_registry.recent_for_user(user_id, limit=limit)
+        except Exception as e:
+            logger.error(f"❌ API error /api/telemost/rooms: {e}")
+            return json_response({"ok": False, "error": str(e)}, status=500)
+        return json_response({
+            "ok": True,
+            "rooms": [
+                {
+                    "id": meeting["meeting_id"],
+                    "url": meeting["join_url"],
+                    "title": meeting["title"],
+                    "chat_id": meeting["chat_id"],
+                    "created_at": meeting["created_at"],
+                    "last_used_at": meeting["last_used_at"],
+                }
+                for meeting in meetings
+            ],
+        })
+
+    app.router.add_get("/api/telemost/rooms", api_get_recent_rooms)
+
     # API: получение ID подготовленного сообщения
     async def api_get_prepared_message_id(request: web.Request) -> web.Response:
         """API endpoint для получения ID подготовленного сообщения"""
@@ -283,24 +769,26 @@ def create_app() -> web.Application:
             user_id = request.query.get("user_id")
             
             if not user_id:
-                return web.json_response({"ok": False, "error": "User ID is required"}, status=400)
+                return json_response({"ok": False, "error": "User ID is required"}, status=400)
             
             try:
                 user_id = int(user_id)
             except ValueError:
-                return web.json_response({"ok": False, "error": "Invalid user ID format"}, status=400)
+                return json_response({"ok": False, "error": "Invalid user ID format"}, status=400)
             
             # Получаем video_call_url из query параметров (опционально)
             video_call_url = request.query.get("video_call_url", "")
             
-            # Создаем новое подготовленное сообщение для пользователя каждый раз
-            message_id = await create_prepared_message_for_user(user_id, bot, video_call_url)
+            # Повторный запрос того же пользователя с той же ссылкой отдаётся из кэша
+            message_id = await get_prepared_message_id(
+                user_id, bot, assets, prepared_cache, prepared_flights, video_call_url
+            )
             if not message_id:
-                return web.json_response({"ok": False, "error": "Failed to create prepared message"}, status=500)
+                return json_response({"ok": False, "error": "Failed to create prepared message"}, status=500)
 
             logger.info(f"[DEBUG] Prepared message ID for user {user_id}: {message_id}")
 
-            return web.json_response({
+            return json_response({
                 "ok": True,
                 "id": message_id,
                 "status": "ready"
@@ -308,7 +796,7 @@ def create_app() -> web.Application:
             
         except Exception as e:
             logger.error(f"❌ API error /api/prepared-message-id: {e}")
-            return web.json_response({"ok": False, "error": str(e)}, status=500)
+            return json_response({"ok": False, "error": str(e)}, status=500)
 
     app.router.add_get("/api/prepared-message-id", api_get_prepared_message_id)
     
@@ -317,7 +805,26 @@ def create_app() -> web.Application:
     return app
 
 
+def run_worker(index: int) -> None:
+    """Воркер супервизора: своё приложение на общем порту (SO_REUSEPORT)."""
+    app = create_app()
+    exit_with_parent(app)
+    web.run_app(
+        app,
+        sock=reuseport_socket(WEBAPP_HOST, WEBAPP_PORT),
+        shutdown_timeout=WEB_SHUTDOWN_TIMEOUT,
+        access_log=logger,
+        print=None,
+    )
+
+
 def main():
+    # До создания event loop; воркеры супервизора наследуют настройку через fork
+    enable_fast_runtime(FAST_RUNTIME)
+    if WEB_PROCESSES > 1:
+        # Несколько процессов на одном порту; этот процесс только следит за ними
+        sys.exit(WorkerSupervisor(run_worker).run())
+
     app = create_app()
     if WEBHOOK_URL:
         pass
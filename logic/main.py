@@ -1,34 +1,82 @@
 import asyncio
+import hmac
+import logging
+import os
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional
 
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.filters import CommandStart
 from aiogram import Router
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo, InlineQueryResultArticle, InputTextMessageContent
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo, InlineQueryResultArticle, InputTextMessageContent, PreparedInlineMessage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler
 from fastapi import FastAPI, Request, HTTPException
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, Response, JSONResponse
 from starlette.responses import JSONResponse
 from starlette.staticfiles import StaticFiles
 
 from .config import settings
+from ..bot.utils.cache import TTLCache
+from ..bot.utils.singleflight import SingleFlight
+from ..bot.utils.runtime import enable_fast_runtime, json_dumps, json_dumps_bytes, json_loads
+from ..bot.utils import runtime
 
 
-# Логирование конфигурации при старте
-print(f"[CONFIG] Загружена конфигурация:\n{settings}")
+# 📝 Уровень логов: LOG_LEVEL=DEBUG включает подробности по каждому запросу
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Логирование конфигурации при старте: только несекретные поля (bot_token и secret_token не пишутся)
+logger.info(
+    "[Config] host=%s bot_port=%s app_base_url=%s app_port=%s webhook_path=%s skip_auto_webhook=%s ssl=%s",
+    settings.host,
+    settings.bot_port,
+    settings.app_base_url,
+    settings.app_port,
+    settings.webhook_path,
+    settings.skip_auto_webhook,
+    bool(settings.ssl_certfile and settings.ssl_keyfile),
+)
+
+# 📥 Приём webhook: обновление больше этого размера отклоняется без разбора (байты)
+WEBHOOK_MAX_BODY_SIZE = int(os.getenv("WEBHOOK_MAX_BODY_SIZE", str(1024 * 1024)))
+# Заголовки, которые не попадают в отладочный лог
+_SECRET_HEADERS = frozenset({"x-telegram-bot-api-secret-token", "authorization", "cookie"})
+
+# ⚡ Быстрый профиль: uvloop и orjson, если установлены (см. bot/utils/runtime.py)
+FAST_RUNTIME = os.getenv("FAST_RUNTIME", "false").lower() in ("1", "true", "yes")
+enable_fast_runtime(FAST_RUNTIME)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse с кодеком профиля рантайма (orjson, если включён)."""
+
+    def render(self, content) -> bytes:
+        return json_dumps_bytes(content)
+
 
 # Импортируем бота для создания подготовленных сообщений
-bot = Bot(token=settings.bot_token)
+bot = Bot(token=settings.bot_token, session=AiohttpSession(json_loads=json_loads, json_dumps=json_dumps))
 dp = Dispatcher()
 router = Router()
 
-# Словарь для хранения подготовленных сообщений по пользователям
-prepared_messages = {}
+# Кэш подготовленных сообщений: user_id -> id.
+# Размер ограничен, запись живёт не дольше expiration_date от Telegram
+PREPARED_MESSAGE_TTL = 86400
+PREPARED_MESSAGE_EXPIRY_MARGIN = 60
+prepared_cache: TTLCache[str] = TTLCache(maxsize=10000, ttl=PREPARED_MESSAGE_TTL)
+# Одновременные запросы одного пользователя — один вызов Bot API
+prepared_flights = SingleFlight()
 
-async def create_prepared_message_for_user(user_id: int):
+async def create_prepared_message_for_user(user_id: int) -> Optional[PreparedInlineMessage]:
     """Создает шаблонное сообщение для конкретного пользователя"""
     try:
         # Создаем inline-результат с шаблонным сообщением
@@ -54,14 +102,31 @@ async def create_prepared_message_for_user(user_id: int):
             allow_group_chats=True
         )
         
-        prepared_messages[user_id] = result.id
-        print(f"[OK] Подготовленное сообщение создано для пользователя {user_id} с ID: {result.id}")
-        return result.id
+        logger.info("[PreparedMessage] создано user_id=%s id=%s", user_id, result.id)
+        return result
         
     except Exception as e:
-        print(f"[ERROR] Ошибка создания подготовленного сообщения для пользователя {user_id}: {e}")
+        logger.error("[PreparedMessage] ошибка создания user_id=%s: %s", user_id, e)
         return None
 
+async def get_cached_prepared_message_id(user_id: int) -> Optional[str]:
+    """Возвращает ID подготовленного сообщения из кэша или создаёт новое"""
+    # Шаблон не зависит от ссылки на звонок, поэтому ключ — только user_id
+    key = user_id
+    message_id = prepared_cache.get(key)
+    if message_id:
+        return message_id
+
+    async def _create() -> Optional[str]:
+        result = await create_prepared_message_for_user(user_id)
+        if result is None:
+            return None
+        ttl = result.expiration_date.timestamp() - time.time() - PREPARED_MESSAGE_EXPIRY_MARGIN
+        prepared_cache.set(key, result.id, ttl=ttl)
+        return result.id
+
+    return await prepared_flights.do(key, _create)
+
 @router.message(CommandStart())
 async def on_start_command(message: types.Message):
     # Создаем кнопку для открытия Mini App
@@ -110,7 +175,7 @@ async def lifespan(_: FastAPI):
                 try:
                     info = await bot.get_webhook_info()
                     if info.url == public_url:
-                        print(f"[OK] Webhook уже установлен: {public_url}")
+                        logger.info("[Webhook] уже установлен url=%s", public_url)
                         last_error = None
                         break
                 except Exception:
@@ -121,27 +186,27 @@ async def lifespan(_: FastAPI):
                     drop_pending_updates=True,
                     allowed_updates=["message", "callback_query", "inline_query"],
                 )
-                print(
-                    f"[OK] Webhook установлен: {public_url} (порт бота: {settings.bot_port}), попытка {attempt}"
+                logger.info(
+                    "[Webhook] установлен url=%s bot_port=%s attempt=%s", public_url, settings.bot_port, attempt
                 )
                 last_error = None
                 break
             except Exception as e:
                 last_error = e
                 wait_seconds = min(30, attempt * 2)
-                print(f"[WARN] set_webhook failed (try {attempt}/5): {e}. Retry in {wait_seconds}s...")
+                logger.warning("[Webhook] set_webhook не удался attempt=%s/5 retry_in=%ss: %s", attempt, wait_seconds, e)
                 await asyncio.sleep(wait_seconds)
         if last_error:
-            print(f"[ERROR] Не удалось установить webhook после 5 попыток: {last_error}")
+            logger.error("[Webhook] не удалось установить webhook после 5 попыток: %s", last_error)
     try:
-        print("[OK] Bot процесс стартует. Ожидание обновлений...")
+        logger.info("[Bot] процесс стартует, ожидание обновлений")
         yield
     finally:
         await bot.delete_webhook(drop_pending_updates=True)
         await bot.session.close()
 
 
-app = FastAPI(title="TelegramBot", lifespan=lifespan)
+app = FastAPI(title="TelegramBot", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Настройка CORS для Mini App
 app.add_middleware(
@@ -175,15 +240,20 @@ async def healthz():
 @app.options("/api/prepared-message-id")
 async def options_prepared_message_id():
     """Обработка preflight запросов для CORS"""
-    return JSONResponse({"status": "ok"})
+    return FastJSONResponse({"status": "ok"})
 
 
 @app.get("/api/prepared-message-id")
 async def get_prepared_message_id(request: Request):
-    print(f"[DEBUG] Request: {request}")
-    print(f"[DEBUG] Headers: {dict(request.headers)}")
-    print(f"[DEBUG] Origin: {request.headers.get('origin')}")
     """API endpoint для получения ID подготовленного сообщения"""
+    # Словарь заголовков собирается, только если DEBUG действительно включён
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "[PreparedMessage] request path=%s origin=%s headers=%s",
+            request.url.path,
+            request.headers.get("origin"),
+            {k: v for k, v in request.headers.items() if k.lower() not in _SECRET_HEADERS},
+        )
     # Получаем user_id из заголовков или параметров запроса
     user_id = request.headers.get("X-User-ID")
     if not user_id:
@@ -198,39 +268,74 @@ async def get_prepared_message_id(request: Request):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user ID format")
     
-    # Создаем новое подготовленное сообщение для пользователя каждый раз
-    message_id = await create_prepared_message_for_user(user_id)
+    # Повторный запрос того же пользователя отдаётся из кэша без вызова Bot API
+    message_id = await get_cached_prepared_message_id(user_id)
     if not message_id:
         raise HTTPException(status_code=500, detail="Failed to create prepared message")
 
-    print(f"[DEBUG] Prepared message ID for user {user_id}: {message_id}")
+    logger.debug("[PreparedMessage] user_id=%s id=%s", user_id, message_id)
     
-    return JSONResponse({
+    return FastJSONResponse({
         "id": message_id,
         "status": "ready"
     })
 
 
+def _secret_token_valid(header_token: Optional[str]) -> bool:
+    """Сравнение секрета за постоянное время (не зависит от совпавшего префикса)."""
+    if not settings.secret_token:
+        return True
+    return hmac.compare_digest((header_token or "").encode(), settings.secret_token.encode())
+
+
+async def _read_limited_body(request: Request, limit: int) -> bytes:
+    """Тело запроса не больше limit байт; больше — 413 (и по Content-Length, и при chunked)."""
+    try:
+        declared = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if declared > limit:
+        raise HTTPException(status_code=413, detail="Update too large")
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Update too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
 @app.post(settings.webhook_path)
 async def telegram_webhook(request: Request):
-    # Validate Telegram secret token header if configured
-    if settings.secret_token:
-        header_token = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
-        if not header_token or header_token != settings.secret_token:
-            print("[WARN] Invalid or missing secret token header")
-            raise HTTPException(status_code=401, detail="Invalid secret token")
-    update = await request.json()
-    aiogram_update = types.Update.model_validate(update)
-    print(f"[OK] Update received: {aiogram_update.event_type}")
+    """
+    Быстрый приём обновления: секрет проверяется до чтения тела, размер
+    тела ограничен, а Update собирается прямо из байтов (model_validate_json)
+    без промежуточного dict. context={"bot": bot} привязывает обновление к
+    боту сразу — иначе feed_update пересобрал бы его ещё раз через model_dump.
+    """
+    if not _secret_token_valid(request.headers.get("X-Telegram-Bot-Api-Secret-Token")):
+        logger.warning(
+            "[Webhook] неверный или отсутствующий секрет client=%s", request.client.host if request.client else None
+        )
+        raise HTTPException(status_code=401, detail="Invalid secret token")
+    body = await _read_limited_body(request, WEBHOOK_MAX_BODY_SIZE)
+    try:
+        aiogram_update = types.Update.model_validate_json(body, context={"bot": bot})
+    except ValidationError as e:
+        logger.warning("[Webhook] некорректное обновление size=%s errors=%s", len(body), e.error_count())
+        raise HTTPException(status_code=400, detail="Invalid update")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[Webhook] update_id=%s type=%s", aiogram_update.update_id, aiogram_update.event_type)
     await dp.feed_update(bot, aiogram_update)
-    return JSONResponse({"ok": True})
+    return FastJSONResponse({"ok": True})
 
 
 @app.post("/api/send-message")
 async def send_message_from_mini_app(request: Request):
     """API endpoint для получения сообщений от Mini App"""
     try:
-        data = await request.json()
+        data = json_loads(await request.body())
         user_id = data.get("user_id")
         message = data.get("message")
         username = data.get("username")
@@ -252,11 +357,11 @@ async def send_message_from_mini_app(request: Request):
             parse_mode="HTML"
         )
         
-        print(f"[OK] Message sent to user {user_id} from Mini App")
-        return JSONResponse({"ok": True, "message": "Message sent successfully"})
+        logger.info("[MiniApp] сообщение отправлено user_id=%s", user_id)
+        return FastJSONResponse({"ok": True, "message": "Message sent successfully"})
         
     except Exception as e:
-        print(f"[ERROR] Failed to send message from Mini App: {e}")
+        logger.error("[MiniApp] не удалось отправить сообщение: %s", e)
         raise HTTPException(status_code=500, detail="Failed to send message")
 
 
@@ -281,6 +386,8 @@ def run():
         host=settings.host,
         port=settings.bot_port,
         reload=False,
+        # Профиль уже выбран при импорте; "auto" включил бы uvloop и без FAST_RUNTIME
+        loop="uvloop" if runtime.stats()["uvloop"] else "asyncio",
         **get_ssl_params(),
     )
 
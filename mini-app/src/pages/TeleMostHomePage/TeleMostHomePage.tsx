@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Cell } from '@telegram-apps/telegram-ui';
 import { Page } from '@/components/Page';
@@ -12,6 +12,8 @@ export const TeleMostHomePage: React.FC = () => {
   const [isLoading, setIsLoading] = useState(false);
   const navigate = useNavigate();
   const { showNotification } = useNotification();
+  // Ключ идемпотентности живёт до успешного создания: повторы не создают вторую встречу
+  const idempotencyKeyRef = useRef<string | null>(null);
 
   const handleCreateRoom = async () => {
     if (isLoading) return;
@@ -19,8 +21,12 @@ export const TeleMostHomePage: React.FC = () => {
     setIsLoading(true);
     try {
       const userId = telegramService.getUserId(); // Получаем ID пользователя из Telegram
-      const response = await teleMostAPI.createRoom(userId);  // Создаем комнату через API
+      if (!idempotencyKeyRef.current) {
+        idempotencyKeyRef.current = crypto.randomUUID();
+      }
+      const response = await teleMostAPI.createRoom(userId, idempotencyKeyRef.current);  // Создаем комнату через API
       if (response.ok && response.url) {
+        idempotencyKeyRef.current = null;
         showNotification('Meeting created', 'success');  // Показываем уведомление об успехе
                 // Отправляем данные боту
         telegramService.sendDataToBot({
@@ -1,6 +1,8 @@
 import { 
   TeleMostCreateRoomRequest, 
   TeleMostCreateRoomResponse, 
+  TeleMostRecentRoomsResponse,
+  TeleMostRoom,
   API_ENDPOINTS 
 } from '@/types/telemost';
 
@@ -9,17 +11,23 @@ class TeleMostAPIService {
     // Используем относительные пути, так как приложение будет на том же домене
   }
 
-  async createRoom(userId: number | null): Promise<TeleMostCreateRoomResponse> {
+  async createRoom(userId: number | null, idempotencyKey?: string): Promise<TeleMostCreateRoomResponse> {
     try {
       const request: TeleMostCreateRoomRequest = {
         user_id: userId
       };
 
+      const headers: Record<string, string> = {
+        'Content-Type': 'application/json',
+      };
+      // Повтор с тем же ключом вернёт уже созданную встречу, а не новую
+      if (idempotencyKey) {
+        headers['Idempotency-Key'] = idempotencyKey;
+      }
+
       const response = await fetch(API_ENDPOINTS.CREATE_ROOM, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
+        headers,
         body: JSON.stringify(request)
       });
 
@@ -39,6 +47,28 @@ class TeleMostAPIService {
       throw error;
     }
   }
+
+  async getRecentRooms(limit?: number): Promise<TeleMostRoom[]> {
+    const params = new URLSearchParams();
+    if (limit) {
+      params.set('limit', String(limit));
+    }
+
+    // Пользователя бэкенд берёт из подписанной initData, а не из параметров
+    const initData = window.Telegram?.WebApp?.initData || '';
+    const response = await fetch(`${API_ENDPOINTS.RECENT_ROOMS}?${params}`, {
+      headers: { Authorization: `tma ${initData}` },
+    });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const data: TeleMostRecentRoomsResponse = await response.json();
+    if (!data.ok) {
+      throw new Error(data.error || 'Backend did not return rooms');
+    }
+    return data.rooms || [];
+  }
 }
 
 export const teleMostAPI = new TeleMostAPIService();
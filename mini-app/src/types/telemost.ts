@@ -10,6 +10,21 @@ export interface TeleMostCreateRoomResponse {
   error?: string;
 }
 
+export interface TeleMostRoom {
+  id: string | null;
+  url: string;
+  title: string;
+  chat_id: number | null;
+  created_at: number;
+  last_used_at: number;
+}
+
+export interface TeleMostRecentRoomsResponse {
+  ok: boolean;
+  rooms?: TeleMostRoom[];
+  error?: string;
+}
+
 export interface VideoCallData {
   url: string;
   created_at: string;
@@ -30,4 +45,5 @@ export const BUILD_VERSION = "1.1.0";
 
 export const API_ENDPOINTS = {
   CREATE_ROOM: '/bot/telemost/api/telemost/create',
+  RECENT_ROOMS: '/bot/telemost/api/telemost/rooms',
 } as const;